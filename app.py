@@ -1,6 +1,17 @@
+import argparse
 import csv
+import json
+import time
 import traceback
 import os
+import sys
+from datetime import datetime
+
+import record_stream
+
+# --ndjson - 時 stdout 只放資料，所有訊息（包括下面匯入模組的訊息）都改印到 stderr
+if __name__ == "__main__" and record_stream.stdout_requested(sys.argv[1:]):
+    sys.stdout = sys.stderr
 
 print("app.py 開始執行")
 
@@ -17,6 +28,20 @@ try:
     from fubon import fetch_fubon_exhibitions
     from tfam import fetch_tfam_exhibitions
     from ntnu import fetch_ntnu_exhibitions
+    import calendar_view
+    import change_feed
+    import checkpoint
+    import crawl_queue
+    import event_log
+    import http_client
+    import image_pipeline
+    import parse_stage
+    import postprocess
+    import profiler
+    import resources
+    import search_index
+    import snapshot_archive
+    import static_export
     print("模組匯入成功")
 except Exception as e:
     print("匯入模組時發生錯誤：")
@@ -28,7 +53,8 @@ except Exception as e:
 # --------------------
 # CSV 欄位（已移除 展覽類別、備註）
 # --------------------
-FIELDNAMES = [
+# 展覽內容欄位（content_hash 由這些欄位計算）
+CONTENT_FIELDS = [
     "館別",
     "展覽名稱",
     "展覽日期",
@@ -42,6 +68,9 @@ FIELDNAMES = [
     "展覽時間",
 ]
 
+# 實際輸出：固定 ID + 內容欄位 + 內容雜湊
+FIELDNAMES = [change_feed.ID_FIELD] + CONTENT_FIELDS + [change_feed.HASH_FIELD]
+
 
 # --------------------
 # 統一欄位格式
@@ -62,40 +91,147 @@ def normalize(ex):
     }
 
 
+# --------------------
+# 七個館：(代號, 顯示名稱, 簡稱, 爬蟲函式)
+# --------------------
+MUSEUMS = [
+    ("songshan", "松山文創園區", "松山", fetch_songshan_exhibitions),
+    ("npm", "國立故宮博物院", "故宮", fetch_npm_exhibitions),
+    ("moca", "當代藝術館", "當代", fetch_moca_exhibitions),
+    ("huashan", "華山1914文創園區", "華山", fetch_huashan_exhibitions),
+    ("fubon", "富邦美術館", "富邦", fetch_fubon_exhibitions),
+    ("tfam", "臺北市立美術館", "北美館", fetch_tfam_exhibitions),
+    ("ntnu", "師大美術館", "師大", fetch_ntnu_exhibitions),
+]
+
+
+# --------------------
+# 每個館爬完就推送變動事件（push_server.py 讀 events.ndjson 推給客戶端）
+# 比對的基準是 event_log 自己存的「已發出」狀態，當掉重跑不會重發
+# --------------------
+def emit_museum_events(events, rows, complete=True):
+    if events is None or not rows:
+        return 0
+    written = events.emit(rows, CONTENT_FIELDS, complete=complete)
+    if written:
+        print(f"   📣 推送 {len(written)} 個變動事件")
+    return len(written)
+
+
+def museum_finished(results, stats, events=None, stream=None):
+    """一個館的結果出來了：寫進 NDJSON 串流、推送變動事件；館別與事件數記在 stats"""
+    stats["venues"] = []
+    stats["events"] = 0
+    if not results:
+        return
+    rows = change_feed.assign_ids([normalize(ex) for ex in results], CONTENT_FIELDS)
+    stats["venues"] = sorted({row["館別"] for row in rows})
+    if stream is not None:
+        stream.write(rows)
+    # partial 的館只推新增 / 變更，沒抓到的展覽不當成下架
+    stats["events"] = emit_museum_events(events, rows, complete=stats.get("status") in COMPLETE_STATUSES)
+
+
+# 這些狀態的館，這次的結果就是它完整的展覽清單
+COMPLETE_STATUSES = ("ok", "resumed", "queue")
+
+
+def complete_venues(report) -> set:
+    """
+    這次結果完整的館別。其他館（失敗、略過、時間用完或有頁面被略過的 partial）
+    在封存 / 靜態分片裡沿用上一次的資料，不當成整館下架。
+    """
+    return {
+        venue
+        for stats in report.get("museums", {}).values()
+        if stats.get("status") in COMPLETE_STATUSES
+        for venue in stats.get("venues", [])
+    }
+
+
 # --------------------
 # 抓全部爬蟲結果
 # --------------------
-def collect_all_exhibitions():
+def collect_all_exhibitions(profile_dir=None, report=None, events=None, stream=None):
     all_exhibitions = []
+    profile_summaries = {}
+    if report is None:
+        report = {}
+    report.setdefault("museums", {})
 
-    print("抓取 松山文創園區...")
-    all_exhibitions.extend(fetch_songshan_exhibitions())
-    print(f"   松山累積筆數：{len(all_exhibitions)}")
+    for key, name, short, fetch in MUSEUMS:
+        stats = report["museums"].setdefault(key, {})
+        if http_client.deadline_exceeded():
+            print(f"⏰ 時間預算已用完，略過 {name}")
+            stats["status"] = "skipped"
+            continue
 
-    print("抓取 國立故宮博物院...")
-    all_exhibitions.extend(fetch_npm_exhibitions())
-    print(f"   故宮累積筆數：{len(all_exhibitions)}")
+        cached = checkpoint.load_museum(key)
+        if cached is not None:
+            print(f"♻️ {name} 沿用存檔結果（{len(cached)} 筆）")
+            stats["status"] = "resumed"
+            stats["records"] = len(cached)
+            museum_finished(cached, stats, events, stream)
+            all_exhibitions.extend(cached)
+            continue
 
-    print("抓取 當代藝術館...")
-    all_exhibitions.extend(fetch_moca_exhibitions())
-    print(f"   當代累積筆數：{len(all_exhibitions)}")
+        print(f"抓取 {name}...")
+        start = time.perf_counter()
+        results = []
+        checkpoint.take_skipped()
+        try:
+            with resources.track(stats):
+                if profile_dir:
+                    results, profile_summaries[key] = profiler.profile_fetch(key, fetch, profile_dir)
+                else:
+                    results = fetch()
+            # 時間用完或有內頁 / 分頁被略過：結果不完整，不存檔
+            skipped = checkpoint.take_skipped()
+            stats["skipped"] = len(skipped)
+            stats["status"] = "partial" if http_client.deadline_exceeded() or skipped else "ok"
+        except Exception as e:
+            # 單一館失敗不影響其他館，保留已抓到的結果
+            print(f"❌ {name} 抓取失敗：{e!r}")
+            stats["status"] = "failed"
+            stats["error"] = repr(e)
+        finally:
+            stats["seconds"] = round(time.perf_counter() - start, 2)
+        stats["records"] = len(results)
+        # 0 筆多半是 Chrome 沒開起來，不存檔，下次 --resume 會重抓
+        if stats["status"] == "ok" and results:
+            checkpoint.save_museum(key, results)
+        museum_finished(results, stats, events, stream)
+        all_exhibitions.extend(results)
+        print(f"   {short}累積筆數：{len(all_exhibitions)}")
+        print(
+            f"   記憶體峰值：Python {stats['peak_python_rss_mb']} MB，"
+            f"Chrome {stats['peak_browser_rss_mb']} MB（{stats['peak_browser_procs']} 個行程）"
+        )
 
-    print("抓取 華山1914文創園區...")
-    all_exhibitions.extend(fetch_huashan_exhibitions())
-    print(f"   華山累積筆數：{len(all_exhibitions)}")
+    if profile_dir:
+        profiler.write_summary(profile_dir, profile_summaries)
 
-    print("抓取 富邦美術館...")
-    all_exhibitions.extend(fetch_fubon_exhibitions())
-    print(f"   富邦累積筆數：{len(all_exhibitions)}")
+    return all_exhibitions
 
-    print("抓取 臺北市立美術館...")
-    all_exhibitions.extend(fetch_tfam_exhibitions())
-    print(f"   北美館累積筆數：{len(all_exhibitions)}")
 
-    print("抓取 師大美術館...")
-    all_exhibitions.extend(fetch_ntnu_exhibitions())
-    print(f"   師大累積筆數：{len(all_exhibitions)}")
+# --------------------
+# 分散式爬取：從佇列合併 worker 的結果（crawl_queue.py）
+# --------------------
+def collect_from_queue(queue_url, report=None, events=None, stream=None):
+    if report is None:
+        report = {}
+    report.setdefault("museums", {})
+    merged = crawl_queue.merged_results(crawl_queue.open_queue(queue_url))
 
+    all_exhibitions = []
+    for key, name, short, _ in MUSEUMS:
+        results = merged.get(key, [])
+        stats = report["museums"].setdefault(key, {})
+        stats["status"] = "queue" if results else "missing"
+        stats["records"] = len(results)
+        museum_finished(results, stats, events, stream)
+        all_exhibitions.extend(results)
+        print(f"   {short}：{len(results)} 筆")
     return all_exhibitions
 
 
@@ -103,30 +239,148 @@ def collect_all_exhibitions():
 # 寫入 CSV
 # --------------------
 def save_to_csv(filename, exhibitions):
+    """寫出 CSV，回傳寫進去的列（已正規化、帶 exhibition_id / content_hash）"""
     print(f"準備寫入 CSV：{filename}（共 {len(exhibitions)} 筆）")
+    rows = change_feed.assign_ids([normalize(ex) for ex in exhibitions], CONTENT_FIELDS)
     with open(filename, "w", newline="", encoding="utf-8-sig") as f:
         writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()
-        for ex in exhibitions:
-            writer.writerow(normalize(ex))
+        writer.writerows(rows)
     print("CSV 寫入完成")
+    return rows
+
+
+# --------------------
+# 執行報告（每館耗時、筆數、記憶體峰值）
+# --------------------
+def save_run_report(filename, report):
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📁 執行報告：{filename}")
 
 
 # --------------------
 # Main
 # --------------------
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="抓取雙北各館展覽資訊")
+    parser.add_argument(
+        "--profile", nargs="?", const="profiles", default=None, metavar="DIR",
+        help="每個館都在分析器下執行，輸出 .prof 與 flame graph 用的 .collapsed（預設 profiles/）",
+    )
+    parser.add_argument("--record", metavar="DIR", help="把所有 HTTP 回應錄下來，之後可離線重播")
+    parser.add_argument("--replay", metavar="DIR", help="不連網，從錄製資料夾讀回應")
+    parser.add_argument(
+        "--memory-limit", type=int, metavar="MB",
+        help="Python + Chrome 記憶體上限，超過就強制關閉瀏覽器",
+    )
+    parser.add_argument(
+        "--deadline", type=float, metavar="SECONDS",
+        help="整次爬取的時間預算，用完就回傳目前已抓到的結果",
+    )
+    parser.add_argument("--rate", type=float, metavar="RPS", help="每個網站每秒最多幾個請求（預設 2）")
+    parser.add_argument("--burst", type=int, metavar="N", help="每個網站可以一次連發幾個請求（預設 4）")
+    parser.add_argument(
+        "--parse-workers", type=int, default=parse_stage.WORKERS, metavar="N",
+        help=f"解析內頁的行程數（預設 {parse_stage.WORKERS}，0 = 在主行程解析；--profile 時固定為 0）",
+    )
+    parser.add_argument("--resume", action="store_true", help="沿用上次存檔中已完成的館與內頁")
+    parser.add_argument(
+        "--max-age", type=float, default=checkpoint.DEFAULT_MAX_AGE_HOURS, metavar="HOURS",
+        help="--resume 時只採用幾小時內的存檔（預設 12）",
+    )
+    parser.add_argument("--checkpoint", default=checkpoint.DEFAULT_PATH, help="存檔位置")
+    parser.add_argument("--report", default="run_report.json", help="執行報告輸出位置")
+    parser.add_argument(
+        "--from-queue", metavar="URL",
+        help="不自己爬，改用分散式佇列裡 worker 的結果（例如 sqlite:///crawl_queue.sqlite）",
+    )
+    parser.add_argument(
+        "--events", default=event_log.EVENTS_PATH, metavar="PATH",
+        help="變動事件記錄檔（push_server.py 從這裡推播）",
+    )
+    parser.add_argument("--no-events", action="store_true", help="不產生變動事件")
+    parser.add_argument("--images", action="store_true", help="下載展覽圖片並產生縮圖（images/）")
+    parser.add_argument(
+        "--ndjson", metavar="PATH",
+        help="邊爬邊輸出 NDJSON（每個館爬完就寫出）；- 表示 stdout，訊息改印到 stderr",
+    )
+    parser.add_argument("--gzip", action="store_true", help="--ndjson 的輸出用 gzip 壓縮")
+    parser.add_argument(
+        "--archive", default=snapshot_archive.ARCHIVE_DIR, metavar="DIR",
+        help="歷史封存位置（每次爬取都存一份，可查某天的資料）",
+    )
+    parser.add_argument("--no-archive", action="store_true", help="不寫入歷史封存")
+    parser.add_argument(
+        "--archive-raw", action="store_true",
+        help="連同 --record 錄下來的原始 HTML 一起封存",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.ndjson == record_stream.STDOUT and sys.stdout is not sys.stderr:
+        sys.stdout = sys.stderr
     print("進入 main()")
+    if args.record and args.replay:
+        raise SystemExit("--record 與 --replay 不能同時使用")
+    if args.record:
+        http_client.enable_record(args.record)
+    if args.replay:
+        http_client.enable_replay(args.replay)
+    resources.set_memory_limit(args.memory_limit)
+    http_client.set_deadline(args.deadline)
+    checkpoint.configure(args.checkpoint, resume=args.resume, max_age_hours=args.max_age)
+    # --profile 時在主行程解析，cProfile / 取樣 / CPU 時間才看得到解析的部分
+    parse_stage.configure(0 if args.profile else args.parse_workers)
+    if args.rate or args.burst:
+        default_rate, default_burst = http_client.HOST_RATES["default"]
+        http_client.set_rate("default", args.rate or default_rate, args.burst or default_burst)
+
+    report = {"started_at": datetime.now().isoformat(timespec="seconds")}
+    stream = None
     try:
-        exhibitions = collect_all_exhibitions()
+        report["orphans_reaped_at_start"] = resources.reap_orphans()
+        events = None if args.no_events else event_log.EventLog(args.events)
+        if args.ndjson:
+            stream = record_stream.RecordStream(args.ndjson, compress=args.gzip, fields=FIELDNAMES)
+        if args.from_queue:
+            exhibitions = collect_from_queue(args.from_queue, report=report, events=events, stream=stream)
+        else:
+            exhibitions = collect_all_exhibitions(
+                profile_dir=args.profile, report=report, events=events, stream=stream
+            )
+        if stream is not None:
+            stream.close()
         print(f"全部抓完，共 {len(exhibitions)} 筆")
-        save_to_csv("all_museums_exhibitions.csv", exhibitions)
+        rows = save_to_csv("all_museums_exhibitions.csv", exhibitions)
+        postprocess.run(rows)
+        # 失敗 / partial 的館在封存與靜態分片裡沿用上一次的資料
+        complete = complete_venues(report)
+        if not args.no_archive:
+            raw_dir = (args.record or args.replay) if args.archive_raw else None
+            snapshot_archive.archive_run(rows, args.archive, raw_dir=raw_dir, complete=complete)
+        static_export.export(rows, FIELDNAMES, complete=complete)
+        if args.images:
+            image_pipeline.process(row["展覽圖片"] for row in rows)
+        delta = change_feed.publish(rows, CONTENT_FIELDS)
+        calendar_view.refresh(delta, rows)
+        search_index.refresh(rows)
         print("程式執行完畢")
     except Exception as e:
         print(" main() 執行過程中發生錯誤：")
         traceback.print_exc()
         input("按 Enter 結束")
         raise
+    finally:
+        if stream is not None:
+            stream.close()
+        parse_stage.shutdown()
+        report["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        report["hosts"] = http_client.host_stats()
+        report["memo"] = http_client.memo_stats()
+        save_run_report(args.report, report)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,400 @@
+"""
+爬完之後那一段流程（日期解析 -> normalize -> CSV -> 索引 / 匯出）的大量資料 benchmark。
+
+資料是合成的，但每個館的原始日期字串都照真實格式產生：
+    松山  2025-11-01 - 2025-11-30 / 2025-12-11
+    故宮  2025-10-10~2026-01-07 / 2023-12-01~ / 常設展
+    當代  10 / 04Sat. - 01 / 11Sun.
+    華山  202510.03(五) - 202511.30(日)
+    富邦  2025.10.23 - 2026.4.20
+    北美館 2025/10/04 - 2026/01/11
+    師大  2025/09/23 Tue.－ / 2024/7/1（二）起 / 2025/09/23 - 2025/12/31
+
+每個階段量：秒數、每秒幾筆、tracemalloc 的記憶體峰值，最後印出各規模的比較（scaling）。
+- 串流階段（產生、日期解析、normalize、分批寫 CSV）每個規模都跑，資料不會整份放在記憶體
+- 空間索引（spatial_index.nearest_batch）的查詢也是分批串流，每個規模都跑
+- 需要整份資料的階段（app.save_to_csv、衍生欄位、變動比對、搜尋索引、靜態分片、館別對應、
+  日曆、歷史封存）只跑到 --max-in-memory 筆；更大的規模會先印出哪些階段不跑，
+  結果 JSON 的 skipped 也會列出來，scaling 表用前面的曲線推估
+- 每次計時前都清掉上一次留下的快取 / 輸出（館別對應快取、靜態分片、封存），
+  量到的是從頭做的時間，不是讀快取
+
+用法：
+    python benchmark.py                                  # 10k、1M、10M
+    python benchmark.py --sizes 10000 100000 --max-in-memory 100000
+"""
+import argparse
+import csv
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+
+import change_feed
+import postprocess
+import search_index
+import static_export
+import venue_join
+from calendar_view import CalendarView
+from snapshot_archive import SnapshotArchive
+from spatial_index import VenueIndex
+from fubon import parse_fubon_date
+from huashan import parse_huashan_date
+from moca import parse_moca_date
+from npm_museum import parse_npm_date
+from ntnu import parse_ntnu_date
+from songshan import parse_songshan_date
+from tfam import parse_tfam_date
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+MAX_IN_MEMORY = 1_000_000
+# 記憶體量測（tracemalloc）會讓程式慢 2~3 倍，只在這個筆數以內另外跑一次量記憶體
+TRACE_LIMIT = 1_000_000
+CHUNK = 50_000
+RESULTS_PATH = "benchmark_results.json"
+# 使用者位置（空間索引的查詢點）的範圍：雙北
+TAIPEI_BBOX = (24.95, 121.40, 25.20, 121.65)
+NEAREST_K = 5
+
+# 需要整份資料放在記憶體的階段；超過 --max-in-memory 就不跑
+IN_MEMORY_STAGES = [
+    "app.save_to_csv", "postprocess.derive", "change_feed delta", "search_index.update",
+    "static_export.export", "venue_join.attach_venues", "calendar_view.build",
+    "calendar_view.apply_delta", "snapshot_archive keyframe", "snapshot_archive delta",
+]
+
+WEEKDAYS = "一二三四五六日"
+EN_WEEKDAYS = ["Mon.", "Tue.", "Wed.", "Thu.", "Fri.", "Sat.", "Sun."]
+
+# 館別 -> (爬蟲用的館名, 日期解析函式)
+MUSEUMS = {
+    "songshan": ("松山文創園區", parse_songshan_date),
+    "npm": ("國立故宮博物院", parse_npm_date),
+    "moca": ("台北當代藝術館", parse_moca_date),
+    "huashan": ("華山1914文化創意產業園區", parse_huashan_date),
+    "fubon": ("富邦美術館", parse_fubon_date),
+    "tfam": ("臺北市立美術館", parse_tfam_date),
+    "ntnu": ("國立臺灣師範大學-師大美術館", parse_ntnu_date),
+}
+
+TITLE_WORDS = ["印象派", "當代", "攝影", "書畫", "器物", "設計", "建築", "錄像", "版畫", "雕塑",
+               "Monet", "Light", "城市", "記憶", "海洋", "島嶼", "身體", "聲音", "未來", "典藏"]
+
+
+# --------------------
+# 資料產生
+# --------------------
+def _raw_date(key: str, rng: random.Random, start: date, end: date) -> str:
+    r = rng.random()
+    if key == "songshan":
+        return f"{start:%Y-%m-%d}" if r < 0.1 else f"{start:%Y-%m-%d} - {end:%Y-%m-%d}"
+    if key == "npm":
+        if r < 0.1:
+            return "常設展"
+        return f"{start:%Y-%m-%d}~" if r < 0.25 else f"{start:%Y-%m-%d}~{end:%Y-%m-%d}"
+    if key == "moca":
+        return (f"{start.month:02d} / {start.day:02d}{EN_WEEKDAYS[start.weekday()]} - "
+                f"{end.month:02d} / {end.day:02d}{EN_WEEKDAYS[end.weekday()]}")
+    if key == "huashan":
+        return (f"{start:%Y%m}.{start:%d}({WEEKDAYS[start.weekday()]}) - "
+                f"{end:%Y%m}.{end:%d}({WEEKDAYS[end.weekday()]})")
+    if key == "fubon":
+        return f"{start.year}.{start.month}.{start.day} - {end.year}.{end.month}.{end.day}"
+    if key == "tfam":
+        return f"{start:%Y/%m/%d} - {end:%Y/%m/%d}"
+    # ntnu
+    if r < 0.4:
+        return f"{start:%Y/%m/%d} {EN_WEEKDAYS[start.weekday()]}－"
+    if r < 0.6:
+        return f"{start.year}/{start.month}/{start.day}（{WEEKDAYS[start.weekday()]}）起"
+    return f"{start:%Y/%m/%d} - {end:%Y/%m/%d}"
+
+
+def generate(n: int, seed: int = 0):
+    """
+    產生 n 筆跟 fetch_* 回傳格式一樣的原始展覽資料（generator，不佔記憶體）。
+    另外帶 "_key"（館代號），start_date 等欄位留空給日期解析階段填。
+    """
+    rng = random.Random(seed)
+    keys = list(MUSEUMS)
+    base = date(2023, 1, 1)
+    for i in range(n):
+        key = keys[i % len(keys)]
+        museum = MUSEUMS[key][0]
+        start = base + timedelta(days=rng.randrange(1200))
+        end = start + timedelta(days=rng.randrange(3, 200))
+        title = "".join(rng.sample(TITLE_WORDS, 3)) + f" {i}"
+        yield {
+            "_key": key,
+            "museum": museum,
+            "title": title,
+            "date": _raw_date(key, rng, start, end),
+            "start_date": None,
+            "end_date": None,
+            "is_permanent": 0,
+            "topic": rng.choice(TITLE_WORDS),
+            "url": f"https://example.org/{key}/exhibition/{i}",
+            "image_url": f"https://example.org/{key}/img/{i % 5000}.jpg",
+            "location": f"{rng.choice('ABCDE')} 展廳",
+            "time": "10:00-18:00",
+            "category": "",
+            "extra": "",
+        }
+
+
+def parse_dates(records):
+    """日期解析階段：依館別呼叫各自的 parse_*_date"""
+    for ex in records:
+        ex["start_date"], ex["end_date"], ex["is_permanent"] = MUSEUMS[ex["_key"]][1](ex["date"])
+        yield ex
+
+
+def positions(n: int, seed: int = 0, size=CHUNK):
+    """n 個隨機的使用者位置，每次 size 個：(緯度陣列, 經度陣列)"""
+    rng = np.random.default_rng(seed)
+    lat_lo, lng_lo, lat_hi, lng_hi = TAIPEI_BBOX
+    for s in range(0, n, size):
+        m = min(size, n - s)
+        yield rng.uniform(lat_lo, lat_hi, m), rng.uniform(lng_lo, lng_hi, m)
+
+
+def _chunks(iterable, size=CHUNK):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --------------------
+# 量測
+# --------------------
+def _measure(fn, trace: bool):
+    """回傳 (秒數, 記憶體峰值 MB 或 None, fn 的回傳值)"""
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run_stage(name: str, n: int, fn, results: list, trace_limit=TRACE_LIMIT, setup=None):
+    """
+    計時跑一次；n 在 trace_limit 以內再開 tracemalloc 跑一次量記憶體峰值。
+    fn 每次呼叫都要從頭做（自己產生資料）；setup 在每次量測前呼叫（不計時），
+    用來清掉上一次留下的快取 / 輸出。
+    """
+    setup = setup or (lambda: None)
+    setup()
+    seconds, _, _ = _measure(fn, trace=False)
+    peak = None
+    if n <= trace_limit:
+        setup()
+        peak = _measure(fn, trace=True)[1]
+    rate = n / seconds if seconds else 0.0
+    row = {"stage": name, "rows": n, "seconds": round(seconds, 3),
+           "rows_per_second": round(rate), "peak_mb": round(peak, 1) if peak is not None else None}
+    results.append(row)
+    mem = f"{peak:9.1f} MB" if peak is not None else "      n/a   "
+    print(f"   {name:<28}{seconds:9.2f}s {rate:12,.0f} 筆/秒 {mem}")
+    return row
+
+
+def _skip(name: str, n: int, results: list, reason: str):
+    results.append({"stage": name, "rows": n, "skipped": reason})
+    print(f"   {name:<28}   skipped（{reason}）")
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def benchmark_size(n: int, app, out_dir: str, max_in_memory=MAX_IN_MEMORY, trace_limit=TRACE_LIMIT):
+    print(f"\n📏 {n:,} 筆")
+    results = []
+    stage = lambda name, fn, setup=None: run_stage(name, n, fn, results, trace_limit, setup)  # noqa: E731
+    has_venues = os.path.exists(venue_join.VENUES_PATH)
+    no_venues = f"沒有 {venue_join.VENUES_PATH}"
+
+    # 串流階段
+    stage("generate", lambda: sum(1 for _ in generate(n)))
+    stage("parse_*_date", lambda: sum(1 for _ in parse_dates(generate(n))))
+    stage("normalize", lambda: sum(1 for _ in map(app.normalize, parse_dates(generate(n)))))
+
+    def stream_csv():
+        path = os.path.join(out_dir, "stream.csv")
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=app.FIELDNAMES)
+            writer.writeheader()
+            for chunk in _chunks(parse_dates(generate(n))):
+                rows = change_feed.assign_ids([app.normalize(ex) for ex in chunk], app.CONTENT_FIELDS)
+                writer.writerows(rows)
+        return os.path.getsize(path)
+
+    stage("csv (streaming, chunked)", stream_csv)
+
+    def nearest_stream():
+        index = VenueIndex.from_csv(venue_join.VENUES_PATH)
+        return sum(len(index.nearest_batch(lats, lngs, k=NEAREST_K)[0]) for lats, lngs in positions(n))
+
+    if has_venues:
+        stage("spatial_index.nearest_batch", nearest_stream)
+    else:
+        _skip("spatial_index.nearest_batch", n, results, no_venues)
+
+    # 整份放在記憶體的階段
+    if n > max_in_memory:
+        reason = f"> --max-in-memory {max_in_memory:,}"
+        print(f"   ⚠️ 超過 --max-in-memory，以下 {len(IN_MEMORY_STAGES)} 個需要整份資料的階段不跑（scaling 表只列推估）")
+        for name in IN_MEMORY_STAGES:
+            _skip(name, n, results, reason)
+        return results
+
+    exhibitions = list(parse_dates(generate(n)))
+    csv_path = os.path.join(out_dir, "all.csv")
+    stage("app.save_to_csv", lambda: app.save_to_csv(csv_path, exhibitions))
+    rows = app.save_to_csv(csv_path, exhibitions)
+
+    # 館別對應的快取每次都換新的，不然第二次量到的只是讀快取
+    venue_cache = os.path.join(out_dir, "venue_cache.json")
+    clear_venue_cache = lambda: _remove(venue_cache)  # noqa: E731
+
+    def derive_fresh():
+        df = postprocess.to_frame(rows)
+        place_ids = {}
+        if has_venues:
+            place_ids = venue_join.resolve_mapping(df["館別"].unique(), cache_path=venue_cache)
+        return len(postprocess.derive(df, place_ids=place_ids))
+
+    stage("postprocess.derive", derive_fresh, clear_venue_cache)
+
+    # 上一次的狀態：同樣資料但 5% 改了日期、1% 消失
+    prev = {}
+    for i, row in enumerate(rows):
+        if i % 100 == 0:
+            continue
+        old = dict(row)
+        if i % 20 == 0:
+            old[change_feed.HASH_FIELD] = "changed"
+            old["end_date"] = "2099-01-01"
+        prev[row[change_feed.ID_FIELD]] = old
+    stage("change_feed delta", lambda: change_feed.compute_delta(prev, rows, app.CONTENT_FIELDS))
+    stage("search_index.update", lambda: search_index.SearchIndex().update(rows))
+
+    static_dir = os.path.join(out_dir, "static")
+    stage("static_export.export", lambda: static_export.export(rows, app.FIELDNAMES, out_dir=static_dir),
+          lambda: _remove(static_dir))
+
+    if has_venues:
+        stage("venue_join.attach_venues",
+              lambda: venue_join.attach_venues([dict(r) for r in rows], cache_path=venue_cache),
+              clear_venue_cache)
+    else:
+        _skip("venue_join.attach_venues", n, results, no_venues)
+
+    stage("calendar_view.build", lambda: len(CalendarView.build(rows).intervals))
+    delta = change_feed.compute_delta(prev, rows, app.CONTENT_FIELDS)
+    views = []
+    stage("calendar_view.apply_delta", lambda: views[-1].apply_delta(delta, rows),
+          lambda: views.append(CalendarView.build(prev.values())))
+    views.clear()
+
+    # 封存：空的封存存一份 keyframe；已有上一次（prev）的封存再存一次 delta
+    archive_dir = os.path.join(out_dir, "archive")
+    stage("snapshot_archive keyframe", lambda: SnapshotArchive(archive_dir).append(rows)["bytes"],
+          lambda: _remove(archive_dir))
+
+    def archive_with_prev():
+        _remove(archive_dir)
+        SnapshotArchive(archive_dir).append(list(prev.values()))
+
+    stage("snapshot_archive delta", lambda: SnapshotArchive(archive_dir).append(rows)["bytes"],
+          archive_with_prev)
+    _remove(archive_dir)
+
+    del exhibitions, rows, prev, delta
+    return results
+
+
+def print_scaling(all_results: list):
+    """每個階段在不同規模下的每秒筆數，以最小規模為 1.00x"""
+    stages = list(dict.fromkeys(r["stage"] for r in all_results))
+    sizes = sorted({r["rows"] for r in all_results})
+    print("\n📈 scaling（每秒筆數，括號內 = 相對最小規模）")
+    print(f"   {'stage':<28}" + "".join(f"{s:>22,}" for s in sizes))
+    for name in stages:
+        by_size = {r["rows"]: r for r in all_results if r["stage"] == name}
+        base = next((by_size[s]["rows_per_second"] for s in sizes
+                     if s in by_size and by_size[s].get("rows_per_second")), None)
+        cells = []
+        for s in sizes:
+            r = by_size.get(s, {})
+            if r.get("rows_per_second"):
+                cells.append(f"{r['rows_per_second']:>13,} ({r['rows_per_second'] / base:4.2f}x)")
+            elif r.get("skipped") and base:
+                # 用目前量到最大規模的速度推估
+                measured = [by_size[x] for x in sizes if x in by_size and by_size[x].get("rows_per_second")]
+                est = s / measured[-1]["rows_per_second"]
+                cells.append(f"{'~' + format(est, ',.0f') + 's 推估':>22}")
+            else:
+                cells.append(f"{'-':>22}")
+        print(f"   {name:<28}" + "".join(cells))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="爬取後處理流程的大量資料 benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--max-in-memory", type=int, default=MAX_IN_MEMORY,
+                        help="超過這個筆數就不跑需要整份資料的階段")
+    parser.add_argument("--trace-limit", type=int, default=TRACE_LIMIT,
+                        help="超過這個筆數就不量記憶體（tracemalloc 很慢）")
+    parser.add_argument("--out", default=RESULTS_PATH, help="結果 JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import app  # app 匯入時會印訊息、載入各爬蟲模組，只在真的要跑時才匯入
+
+    all_results = []
+    work_dir = tempfile.mkdtemp(prefix="exhibitions-bench-")
+    try:
+        for n in sorted(args.sizes):
+            all_results += benchmark_size(n, app, work_dir, args.max_in_memory, args.trace_limit)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_scaling(all_results)
+    skipped = [{"stage": r["stage"], "rows": r["rows"], "reason": r["skipped"]}
+               for r in all_results if r.get("skipped")]
+    if skipped:
+        print(f"\n⚠️ 有 {len(skipped)} 個階段沒有實際量測（scaling 表中的「推估」）：")
+        for r in skipped:
+            print(f"   {r['rows']:>12,} 筆  {r['stage']:<28}{r['reason']}")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"sizes": sorted(args.sizes), "results": all_results, "skipped": skipped},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n📁 結果：{args.out}")
+
+
+if __name__ == "__main__":
+    main()
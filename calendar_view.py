@@ -0,0 +1,302 @@
+"""
+每日展覽數的預先計算結果（日 × 館），儀表板的圖表直接切陣列，不用每次逐筆掃 start_date / end_date。
+
+- 每個展覽是一段日期區間 [start, end]，用差分陣列記錄：diff[start] += 1、diff[end + 1] -= 1，
+  累加（cumsum）就是每天每館的展覽數
+- 每次爬完只依 change_feed 的 delta 更新有變動的展覽（先減掉舊區間、再加上新區間），
+  不用整份重算；狀態檔不見或跨年（日曆範圍改變）才從 change_feed 的狀態重建
+- 每天有哪些展覽：依日期排序的 CSR（day_offsets + day_members），某天 = 一段連續的切片
+
+輸出：
+  calendar_view.npz           差分陣列、各展覽區間、每日展覽數、每天的展覽清單
+  all_museums_calendar.csv    日期 × 各館展覽數 + 合計（跟展覽 CSV 放在一起）
+
+用法：
+    view = CalendarView.load()
+    view.counts("2026-03-01", "2026-03-31")                      # (31, 館數) 的陣列
+    view.totals("2026-03-01", "2026-03-31", "國立故宮博物院")   # 某館每天幾個展覽（館別要完整）
+    view.ids_on("2026-03-08")                                    # 那天在展的 exhibition_id
+"""
+import csv
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+import change_feed
+
+NPZ_PATH = "calendar_view.npz"
+CSV_PATH = "all_museums_calendar.csv"
+# 沒有結束日期（又不是常設展）的展覽，從開始日起最多算幾天
+OPEN_ENDED_DAYS = 365
+# 日曆範圍：去年 1/1 ~ 明年 12/31
+YEARS_BEFORE = 1
+YEARS_AFTER = 1
+
+
+def default_window(today=None):
+    today = today or date.today()
+    return date(today.year - YEARS_BEFORE, 1, 1), date(today.year + YEARS_AFTER, 12, 31)
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value or "")[:10])
+    except ValueError:
+        return None
+
+
+def exhibition_span(row: dict):
+    """
+    這筆展覽在哪些日期開放：(start, end)，都含；沒有日期的回傳 None。
+    常設展沒有結束日期時，算到日曆最後一天（end = None 代表「無限期」）。
+    """
+    start = _parse_date(row.get("start_date"))
+    end = _parse_date(row.get("end_date"))
+    permanent = str(row.get("is_permanent", "")) in ("1", "True", "true")
+    if start is None and end is None:
+        return None
+    if start is None:
+        start = end
+    if end is None and not permanent:
+        end = start + timedelta(days=OPEN_ENDED_DAYS - 1)
+    if end is not None and end < start:
+        start, end = end, start
+    return start, end
+
+
+class CalendarView:
+    def __init__(self, window_start: date, window_end: date, museums=()):
+        self.start = window_start
+        self.end = window_end
+        self.days = (window_end - window_start).days + 1
+        self.museums = list(museums)
+        self._museum_index = {m: i for i, m in enumerate(self.museums)}
+        # exhibition_id -> (館的欄位, 起, 訖)，起訖是日曆中的第幾天（已截到日曆範圍內）
+        self.intervals = {}
+        # 多一列給 end + 1 = days 的情況
+        self.diff = np.zeros((self.days + 1, len(self.museums)), dtype=np.int32)
+        self._counts = None
+        self._csr = None
+
+    # ---------- 建立 / 更新 ----------
+    def _column(self, museum: str) -> int:
+        col = self._museum_index.get(museum)
+        if col is None:
+            col = len(self.museums)
+            self.museums.append(museum)
+            self._museum_index[museum] = col
+            self.diff = np.hstack([self.diff, np.zeros((self.days + 1, 1), dtype=np.int32)])
+        return col
+
+    def _clip(self, span):
+        """日期區間 -> 日曆中的 (起, 訖)；完全在日曆外就回傳 None"""
+        if span is None:
+            return None
+        start, end = span
+        s = (start - self.start).days
+        e = self.days - 1 if end is None else (end - self.start).days
+        if e < 0 or s >= self.days:
+            return None
+        return max(s, 0), min(e, self.days - 1)
+
+    def _apply(self, interval, sign):
+        col, s, e = interval
+        self.diff[s, col] += sign
+        self.diff[e + 1, col] -= sign
+
+    def add(self, row: dict):
+        eid = row[change_feed.ID_FIELD]
+        self.remove(eid)
+        clipped = self._clip(exhibition_span(row))
+        if clipped is None:
+            return
+        interval = (self._column(row.get("館別", "")), *clipped)
+        self.intervals[eid] = interval
+        self._apply(interval, +1)
+        self._counts = self._csr = None
+
+    def remove(self, eid: str):
+        interval = self.intervals.pop(eid, None)
+        if interval is not None:
+            self._apply(interval, -1)
+            self._counts = self._csr = None
+
+    def apply_delta(self, delta: dict, rows):
+        """
+        change_feed.publish 的回傳值 -> 只更新有動到的展覽。
+        changed 只記錄了哪些欄位變了，新的日期 / 館別從 rows 取。
+        """
+        by_id = {row[change_feed.ID_FIELD]: row for row in rows}
+        for item in delta.get("removed", []):
+            self.remove(item[change_feed.ID_FIELD])
+        for row in delta.get("added", []):
+            self.add(row)
+        for item in delta.get("changed", []):
+            row = by_id.get(item[change_feed.ID_FIELD])
+            if row is not None:
+                self.add(row)
+
+    @classmethod
+    def build(cls, rows, window=None):
+        """整份重建：所有區間一次用 np.add.at 寫進差分陣列"""
+        view = cls(*(window or default_window()))
+        cols, starts, ends = [], [], []
+        for row in rows:
+            clipped = view._clip(exhibition_span(row))
+            if clipped is None:
+                continue
+            col = view._column(row.get("館別", ""))
+            view.intervals[row[change_feed.ID_FIELD]] = (col, *clipped)
+            cols.append(col)
+            starts.append(clipped[0])
+            ends.append(clipped[1])
+        cols = np.asarray(cols, dtype=np.intp)
+        np.add.at(view.diff, (np.asarray(starts, dtype=np.intp), cols), 1)
+        np.add.at(view.diff, (np.asarray(ends, dtype=np.intp) + 1, cols), -1)
+        return view
+
+    # ---------- 查詢 ----------
+    @property
+    def count_matrix(self) -> np.ndarray:
+        """(天數, 館數)：每天每館在展的展覽數"""
+        if self._counts is None:
+            self._counts = np.cumsum(self.diff[:-1], axis=0, dtype=np.int32)
+        return self._counts
+
+    def _day(self, value) -> int:
+        d = value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+        return (d - self.start).days
+
+    def _range(self, start, end):
+        s = 0 if start is None else max(self._day(start), 0)
+        e = self.days if end is None else min(self._day(end) + 1, self.days)
+        return s, max(e, s)
+
+    def counts(self, start=None, end=None) -> np.ndarray:
+        """start ~ end（含）每天每館的展覽數，欄位順序 = self.museums"""
+        s, e = self._range(start, end)
+        return self.count_matrix[s:e]
+
+    def totals(self, start=None, end=None, museum=None) -> np.ndarray:
+        """start ~ end 每天的展覽數（全部館合計，或只看某館）"""
+        block = self.counts(start, end)
+        if museum is None:
+            return block.sum(axis=1)
+        col = self._museum_index.get(museum)
+        return block[:, col] if col is not None else np.zeros(len(block), dtype=np.int32)
+
+    def dates(self, start=None, end=None):
+        s, e = self._range(start, end)
+        return [self.start + timedelta(days=i) for i in range(s, e)]
+
+    def _day_lists(self):
+        """CSR：day_offsets[d] ~ day_offsets[d + 1] 是第 d 天的展覽在 ids 裡的位置"""
+        if self._csr is None:
+            ids = np.array(sorted(self.intervals), dtype=str)
+            spans = np.array([self.intervals[i][1:] for i in ids], dtype=np.int64).reshape(-1, 2)
+            lengths = spans[:, 1] - spans[:, 0] + 1
+            members = np.repeat(np.arange(len(ids)), lengths)
+            # 每個展覽從自己的起始日開始，一天一格
+            first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+            day = np.repeat(spans[:, 0], lengths) + (np.arange(lengths.sum()) - first)
+            order = np.argsort(day, kind="stable")
+            offsets = np.searchsorted(day[order], np.arange(self.days + 1))
+            self._csr = ids, offsets.astype(np.int64), members[order].astype(np.int32)
+        return self._csr
+
+    def ids_on(self, day) -> list:
+        d = self._day(day)
+        if not 0 <= d < self.days:
+            return []
+        ids, offsets, members = self._day_lists()
+        return ids[members[offsets[d]:offsets[d + 1]]].tolist()
+
+    # ---------- 存檔 ----------
+    def save(self, path=NPZ_PATH):
+        eids = sorted(self.intervals)
+        spans = np.array([self.intervals[i] for i in eids], dtype=np.int32).reshape(-1, 3)
+        ids, offsets, members = self._day_lists()
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            window=np.array([self.start.isoformat(), self.end.isoformat()]),
+            museums=np.array(self.museums, dtype=str),
+            interval_ids=np.array(eids, dtype=str),
+            intervals=spans,
+            diff=self.diff,
+            counts=self.count_matrix,
+            day_ids=ids,
+            day_offsets=offsets,
+            day_members=members,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=NPZ_PATH):
+        with np.load(path) as data:
+            window = [date.fromisoformat(d) for d in data["window"]]
+            view = cls(*window, museums=data["museums"].tolist())
+            view.diff = data["diff"].astype(np.int32)
+            view.intervals = {
+                eid: tuple(int(x) for x in span)
+                for eid, span in zip(data["interval_ids"].tolist(), data["intervals"])
+            }
+        return view
+
+    def export_csv(self, path=CSV_PATH):
+        counts = self.count_matrix
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["日期"] + self.museums + ["合計"])
+            for d, row in zip(self.dates(), counts):
+                writer.writerow([d.isoformat()] + row.tolist() + [int(row.sum())])
+
+
+def refresh(delta: dict, rows, npz_path=NPZ_PATH, csv_path=CSV_PATH, state_path=change_feed.STATE_PATH):
+    """
+    爬完之後（change_feed.publish 之後）呼叫：有上次的日曆就只套用 delta，
+    沒有或日曆範圍已經換年，就用 change_feed 的完整狀態重建。
+    """
+    window = default_window()
+    view = None
+    if os.path.exists(npz_path):
+        view = CalendarView.load(npz_path)
+        if (view.start, view.end) != window:
+            view = None
+    if view is None:
+        view = CalendarView.build(change_feed.load_state(state_path).values(), window)
+        how = "重建"
+    else:
+        view.apply_delta(delta, rows)
+        how = "增量更新"
+    view.save(npz_path)
+    view.export_csv(csv_path)
+    today = view.totals(date.today(), date.today())
+    print(f"📅 每日展覽數{how}：{len(view.intervals)} 檔展覽，今天 {int(today.sum()) if len(today) else 0} 檔在展 -> {csv_path}")
+    return view
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查詢每日展覽數")
+    parser.add_argument("start", nargs="?", default=date.today().isoformat())
+    parser.add_argument("end", nargs="?")
+    parser.add_argument("--museum")
+    parser.add_argument("--ids", action="store_true", help="列出 start 那天在展的 exhibition_id")
+    parser.add_argument("--rebuild", action="store_true", help="從 change_feed 的狀態重建")
+    args = parser.parse_args()
+
+    if args.rebuild or not os.path.exists(NPZ_PATH):
+        view = CalendarView.build(change_feed.load_state().values())
+        view.save()
+        view.export_csv()
+    else:
+        view = CalendarView.load()
+    if args.ids:
+        print("\n".join(view.ids_on(args.start)))
+    else:
+        end = args.end or args.start
+        for d, n in zip(view.dates(args.start, end), view.totals(args.start, end, args.museum)):
+            print(d.isoformat(), int(n))
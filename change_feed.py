@@ -0,0 +1,159 @@
+"""
+展覽的固定 ID、內容雜湊，以及每次爬取的變動清單（delta）。
+
+- exhibition_id：館別 + 正規化後的展覽連結算出來的雜湊；沒有連結就用正規化後的名稱。
+  同一個展覽每次爬都會得到同一個 ID
+- content_hash：所有輸出欄位的雜湊，內容有任何變動就會不同
+- 每次爬完跟上一次的狀態（STATE_PATH）比對，只用 dict 查表，輸出：
+  added（新展覽）、removed（消失的展覽）、changed（有變動的欄位與新舊值）
+  到 changes/ 資料夾；下游只要讀 delta，不必整份 CSV 重新比對
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+STATE_PATH = "exhibitions_state.json"
+CHANGES_DIR = "changes"
+
+ID_FIELD = "exhibition_id"
+HASH_FIELD = "content_hash"
+
+# 不影響內容的追蹤參數，算 ID 時拿掉
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid)$", re.IGNORECASE)
+
+
+def canonical_url(url: str) -> str:
+    """
+    網址正規化：scheme / host 轉小寫、拿掉 #fragment 與追蹤參數、
+    query 參數排序、路徑結尾的 / 去掉
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def normalize_title(title: str) -> str:
+    s = unicodedata.normalize("NFKC", title or "").lower()
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def exhibition_id(row: dict) -> str:
+    url = canonical_url(row.get("展覽連結", ""))
+    basis = f"url:{url}" if url else f"title:{normalize_title(row.get('展覽名稱', ''))}"
+    raw = f"{row.get('館別', '')}\x1f{basis}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _text(value) -> str:
+    """None 跟空字串視為相同；數字轉字串（CSV 讀回來都是字串）"""
+    return "" if value is None else str(value)
+
+
+def content_hash(row: dict, fields) -> str:
+    values = [_text(row.get(f)) for f in fields]
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()[:16]
+
+
+def assign_ids(rows, fields):
+    """
+    幫每一列加上 exhibition_id 與 content_hash（直接改 rows）。
+    同一次爬取裡 ID 重複（同館同連結出現兩次）時，後面的加上 -2、-3...
+    """
+    seen = {}
+    for row in rows:
+        base = exhibition_id(row)
+        n = seen.get(base, 0) + 1
+        seen[base] = n
+        row[ID_FIELD] = base if n == 1 else f"{base}-{n}"
+        row[HASH_FIELD] = content_hash(row, fields)
+    return rows
+
+
+# --------------------
+# 狀態 / delta
+# --------------------
+def load_state(path=STATE_PATH) -> dict:
+    """上一次的狀態：{exhibition_id: 該列資料}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: dict, path=STATE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def compute_delta(prev: dict, rows, fields, museums=None) -> dict:
+    """
+    prev：上一次的狀態；rows：這次的結果（已經 assign_ids）。
+    museums：這次有抓到資料的館別；只有這些館底下消失的展覽才算 removed
+    （某館這次抓取失敗時，不會把它整館當成下架）。預設 = rows 裡出現的館別。
+    """
+    if museums is None:
+        museums = {r.get("館別", "") for r in rows}
+
+    added, changed = [], []
+    current = {}
+    for row in rows:
+        eid = row[ID_FIELD]
+        current[eid] = row
+        old = prev.get(eid)
+        if old is None:
+            added.append(row)
+        elif old.get(HASH_FIELD) != row[HASH_FIELD]:
+            diffs = {
+                f: [old.get(f, ""), row.get(f, "")]
+                for f in fields
+                if _text(old.get(f)) != _text(row.get(f))
+            }
+            changed.append({ID_FIELD: eid, "館別": row.get("館別", ""), "展覽名稱": row.get("展覽名稱", ""), "changes": diffs})
+
+    removed = [
+        {ID_FIELD: eid, "館別": old.get("館別", ""), "展覽名稱": old.get("展覽名稱", "")}
+        for eid, old in prev.items()
+        if eid not in current and old.get("館別", "") in museums
+    ]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def merge_state(prev: dict, rows, museums=None) -> dict:
+    """新狀態 = 這次有抓到的館用新結果，抓取失敗的館保留舊資料"""
+    if museums is None:
+        museums = {r.get("館別", "") for r in rows}
+    state = {eid: old for eid, old in prev.items() if old.get("館別", "") not in museums}
+    for row in rows:
+        state[row[ID_FIELD]] = row
+    return state
+
+
+def publish(rows, fields, state_path=STATE_PATH, changes_dir=CHANGES_DIR) -> dict:
+    """比對上一次的狀態、寫出 delta 檔、更新狀態，回傳 delta"""
+    prev = load_state(state_path)
+    delta = compute_delta(prev, rows, fields)
+    now = datetime.now()
+    delta["generated_at"] = now.isoformat(timespec="seconds")
+    delta["counts"] = {k: len(delta[k]) for k in ("added", "removed", "changed")}
+
+    os.makedirs(changes_dir, exist_ok=True)
+    for name in (f"delta-{now:%Y%m%dT%H%M%S}.json", "latest.json"):
+        with open(os.path.join(changes_dir, name), "w", encoding="utf-8") as f:
+            json.dump(delta, f, ensure_ascii=False, indent=1)
+
+    save_state(merge_state(prev, rows), state_path)
+    c = delta["counts"]
+    print(f"🧾 變動：新增 {c['added']}、移除 {c['removed']}、變更 {c['changed']}")
+    return delta
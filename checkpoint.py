@@ -0,0 +1,107 @@
+"""
+爬取進度存檔（checkpoint），讓中斷的爬取可以接著跑（app.py --resume）。
+
+存在本機 SQLite：
+- museums：每個館完整抓完的結果
+- details：每一個抓完的展覽內頁（松山、華山、師大的內頁迴圈最久，
+  中途 Chrome 當掉也不用從頭來）
+
+每次執行都會寫入；只有 --resume 時才會讀，而且只採用 max_age 小時內的資料。
+沒有呼叫 configure()（例如單獨執行某個爬蟲模組）時，所有函式都不做事。
+
+爬蟲略過某個內頁 / 分頁時呼叫 note_skipped()；app.py 每個館爬完用 take_skipped()
+取出，有略過的館標成 partial，不存成「已完成」，下次 --resume 會重抓。
+"""
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = "crawl_checkpoint.sqlite"
+DEFAULT_MAX_AGE_HOURS = 12
+
+_lock = threading.Lock()
+_conn = None
+_resume = False
+_max_age = DEFAULT_MAX_AGE_HOURS * 3600
+_skipped = []                       # 這個館這次略過的網址
+
+
+def configure(path=DEFAULT_PATH, resume=False, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    global _conn, _resume, _max_age
+    _conn = sqlite3.connect(path, check_same_thread=False)
+    _conn.execute(
+        "CREATE TABLE IF NOT EXISTS museums ("
+        " key TEXT PRIMARY KEY, saved_at REAL NOT NULL, records TEXT NOT NULL)"
+    )
+    _conn.execute(
+        "CREATE TABLE IF NOT EXISTS details ("
+        " url TEXT PRIMARY KEY, saved_at REAL NOT NULL, record TEXT NOT NULL)"
+    )
+    _conn.commit()
+    _resume = resume
+    _max_age = max_age_hours * 3600
+    if resume:
+        print(f"♻️ 接續模式：採用 {max_age_hours} 小時內的存檔（{path}）")
+
+
+def _load(table: str, key_col: str, key: str, value_col: str):
+    if _conn is None or not _resume:
+        return None
+    with _lock:
+        row = _conn.execute(
+            f"SELECT saved_at, {value_col} FROM {table} WHERE {key_col} = ?", (key,)
+        ).fetchone()
+    if row is None or time.time() - row[0] > _max_age:
+        return None
+    return json.loads(row[1])
+
+
+def _save(table: str, key: str, value):
+    if _conn is None:
+        return
+    with _lock:
+        _conn.execute(
+            f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)",
+            (key, time.time(), json.dumps(value, ensure_ascii=False)),
+        )
+        _conn.commit()
+
+
+def load_museum(key: str):
+    """--resume 時回傳該館存檔的結果（list），沒有或過期回 None"""
+    return _load("museums", "key", key, "records")
+
+
+def save_museum(key: str, records: list):
+    _save("museums", key, records)
+
+
+def load_detail(url: str):
+    """--resume 時回傳該內頁存檔的展覽資料（dict），沒有或過期回 None"""
+    return _load("details", "url", url, "record")
+
+
+def save_detail(url: str, record: dict):
+    _save("details", url, record)
+
+
+def note_skipped(url: str):
+    """內頁 / 分頁抓取失敗被略過（結果不完整）"""
+    with _lock:
+        _skipped.append(url)
+
+
+def take_skipped() -> list:
+    """取出並清空目前為止略過的網址"""
+    with _lock:
+        out = list(_skipped)
+        _skipped.clear()
+    return out
+
+
+def close():
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
@@ -0,0 +1,471 @@
+"""
+分散式爬取：把工作切成小單位放進佇列，多台機器上的 worker 各自領取執行，最後合併成一般的輸出。
+
+工作單位（unit）：
+- listing：列表頁（松山、華山、師大），執行完把找到的每個內頁加成 detail 單位
+- detail：一個展覽內頁，結果是一筆展覽
+- museum：其他館整館一次抓（故宮、當代、富邦、北美館）
+
+佇列後端：
+- sqlite:///crawl_queue.sqlite（預設）：單機多行程
+- redis://host:6379/0：多台機器共用（需要 redis 套件）；
+  本機沒有 Redis 時可以用 `python crawl_queue.py serve-redis` 開一個 fakeredis 代替
+- fakeredis://：同一個行程內的 fakeredis（測試用）
+
+worker 領到單位時取得租約（lease），執行中定時續約；worker 當掉、租約過期，
+單位會回到佇列給別的 worker。同一個單位重複執行沒有副作用（結果用單位 ID 存）。
+
+用法：
+    python crawl_queue.py enqueue --reset
+    python crawl_queue.py worker --processes 4          # 每台機器各跑一個
+    python crawl_queue.py status
+    python app.py --from-queue sqlite:///crawl_queue.sqlite   # 合併結果、照常輸出
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+import requests as req
+
+from fubon import fetch_fubon_exhibitions
+from moca import fetch_moca_exhibitions
+from npm_museum import fetch_npm_exhibitions
+from tfam import fetch_tfam_exhibitions
+import checkpoint
+import http_client
+import huashan
+import ntnu
+import songshan
+
+DEFAULT_QUEUE = "sqlite:///crawl_queue.sqlite"
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 2.0
+
+# 合併時的館順序（同 app.MUSEUMS）
+MUSEUM_ORDER = ["songshan", "npm", "moca", "huashan", "fubon", "tfam", "ntnu"]
+# 切成 listing / detail 的館
+SPLIT_MUSEUMS = {"songshan", "huashan", "ntnu"}
+# 其他館整館一次抓
+WHOLE_MUSEUMS = {
+    "npm": fetch_npm_exhibitions,
+    "moca": fetch_moca_exhibitions,
+    "fubon": fetch_fubon_exhibitions,
+    "tfam": fetch_tfam_exhibitions,
+}
+
+
+def make_unit(kind: str, museum: str, ref: str = "", seq: int = 0, payload=None) -> dict:
+    return {
+        "id": f"{kind}:{museum}:{ref}",
+        "kind": kind,
+        "museum": museum,
+        "ref": ref,
+        "seq": seq,
+        "payload": payload or {},
+    }
+
+
+def seed_units(museums=None):
+    museums = museums or MUSEUM_ORDER
+    return [
+        make_unit("listing" if key in SPLIT_MUSEUMS else "museum", key)
+        for key in museums
+    ]
+
+
+# --------------------
+# SQLite 後端
+# --------------------
+class SQLiteQueue:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " id TEXT PRIMARY KEY, museum TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_until REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT)"
+        )
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM units")
+
+    def put(self, units) -> int:
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO units (id, museum, seq, body) VALUES (?, ?, ?, ?)",
+                [(u["id"], u["museum"], u["seq"], json.dumps(u, ensure_ascii=False)) for u in units],
+            )
+            return self._conn.total_changes - before
+
+    def claim(self, worker: str, lease=LEASE_SECONDS):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 租約過期太多次的單位不再發出去
+                self._conn.execute(
+                    "UPDATE units SET state = 'failed', error = 'lease expired' "
+                    "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                    (now, MAX_ATTEMPTS),
+                )
+                row = self._conn.execute(
+                    "SELECT id, body FROM units "
+                    "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                    "ORDER BY rowid LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE units SET state = 'leased', worker = ?, lease_until = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (worker, now + lease, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return json.loads(row[1]) if row else None
+
+    def extend(self, unit_id: str, worker: str, lease=LEASE_SECONDS):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE units SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (time.time() + lease, unit_id, worker),
+            )
+
+    def complete(self, unit_id: str, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE units SET state = 'done', result = ?, error = NULL, lease_until = NULL WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), unit_id),
+            )
+
+    def fail(self, unit_id: str, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_until = NULL WHERE id = ? AND state = 'leased'",
+                (MAX_ATTEMPTS, error, unit_id),
+            )
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM units GROUP BY state").fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def results(self):
+        """[(unit, result), ...]：所有完成的單位"""
+        with self._lock:
+            rows = self._conn.execute("SELECT body, result FROM units WHERE state = 'done'").fetchall()
+        return [(json.loads(b), json.loads(r)) for b, r in rows]
+
+    def failures(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, error FROM units WHERE state = 'failed'").fetchall()
+        return dict(rows)
+
+
+# --------------------
+# Redis 後端（redis-py 或 fakeredis）
+# --------------------
+class RedisQueue:
+    """
+    key：
+      units（hash）id -> 單位、pending（list）、processing（list）、
+      leases（zset）id -> 租約到期時間、attempts（hash）、results（hash）、failed（hash）
+    """
+
+    def __init__(self, client, prefix="crawlq:"):
+        self.r = client
+        self.k = {name: prefix + name for name in
+                  ("units", "pending", "processing", "leases", "attempts", "results", "failed")}
+
+    def reset(self):
+        self.r.delete(*self.k.values())
+
+    def put(self, units) -> int:
+        added = 0
+        for u in units:
+            if self.r.hsetnx(self.k["units"], u["id"], json.dumps(u, ensure_ascii=False)):
+                self.r.rpush(self.k["pending"], u["id"])
+                added += 1
+        return added
+
+    def _requeue(self, unit_id: str):
+        self.r.lrem(self.k["processing"], 0, unit_id)
+        if int(self.r.hget(self.k["attempts"], unit_id) or 0) >= MAX_ATTEMPTS:
+            self.r.hset(self.k["failed"], unit_id, "lease expired")
+        else:
+            self.r.rpush(self.k["pending"], unit_id)
+
+    def _reap(self):
+        """租約過期的單位放回佇列；ZREM 成功的那個 worker 才處理，多台同時 reap 也不會重複"""
+        now = time.time()
+        for unit_id in self.r.zrangebyscore(self.k["leases"], "-inf", now):
+            if self.r.zrem(self.k["leases"], unit_id):
+                self._requeue(unit_id)
+        # 搬到 processing 後、設租約前就當掉的單位
+        for unit_id in self.r.lrange(self.k["processing"], 0, -1):
+            if self.r.zscore(self.k["leases"], unit_id) is None and not self.r.hexists(self.k["results"], unit_id):
+                self._requeue(unit_id)
+
+    def claim(self, worker: str, lease=LEASE_SECONDS):
+        self._reap()
+        while True:
+            unit_id = self.r.lmove(self.k["pending"], self.k["processing"], "LEFT", "RIGHT")
+            if unit_id is None:
+                return None
+            if self.r.hexists(self.k["results"], unit_id) or self.r.hexists(self.k["failed"], unit_id):
+                self.r.lrem(self.k["processing"], 0, unit_id)
+                continue
+            self.r.zadd(self.k["leases"], {unit_id: time.time() + lease})
+            self.r.hincrby(self.k["attempts"], unit_id, 1)
+            return json.loads(self.r.hget(self.k["units"], unit_id))
+
+    def extend(self, unit_id: str, worker: str, lease=LEASE_SECONDS):
+        self.r.zadd(self.k["leases"], {unit_id: time.time() + lease}, xx=True)
+
+    def complete(self, unit_id: str, result: dict):
+        pipe = self.r.pipeline()
+        pipe.hset(self.k["results"], unit_id, json.dumps(result, ensure_ascii=False))
+        pipe.zrem(self.k["leases"], unit_id)
+        pipe.lrem(self.k["processing"], 0, unit_id)
+        pipe.execute()
+
+    def fail(self, unit_id: str, error: str):
+        if self.r.zrem(self.k["leases"], unit_id):
+            self._requeue(unit_id)
+        if self.r.hexists(self.k["failed"], unit_id):
+            self.r.hset(self.k["failed"], unit_id, error)
+
+    def counts(self) -> dict:
+        return {
+            "pending": self.r.llen(self.k["pending"]),
+            "leased": self.r.zcard(self.k["leases"]),
+            "done": self.r.hlen(self.k["results"]),
+            "failed": self.r.hlen(self.k["failed"]),
+        }
+
+    def results(self):
+        units = self.r.hgetall(self.k["units"])
+        return [
+            (json.loads(units[unit_id]), json.loads(result))
+            for unit_id, result in self.r.hgetall(self.k["results"]).items()
+            if unit_id in units
+        ]
+
+    def failures(self):
+        return self.r.hgetall(self.k["failed"])
+
+
+def open_queue(url=DEFAULT_QUEUE):
+    if url.startswith("sqlite:///"):
+        return SQLiteQueue(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError:
+            raise SystemExit("Redis 佇列需要 redis 套件：pip install redis")
+        return RedisQueue(redis.Redis.from_url(url, decode_responses=True))
+    if url.startswith("fakeredis://"):
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("fakeredis:// 需要 fakeredis 套件：pip install fakeredis")
+        return RedisQueue(fakeredis.FakeRedis(decode_responses=True))
+    raise SystemExit(f"不支援的佇列網址：{url}")
+
+
+# --------------------
+# 執行單位
+# --------------------
+def run_unit(queue, unit: dict) -> dict:
+    """執行一個單位，回傳 {"records": [...]}；listing 會把找到的內頁加進佇列"""
+    kind, museum = unit["kind"], unit["museum"]
+
+    if kind == "museum":
+        return {"records": WHOLE_MUSEUMS[museum]()}
+
+    if kind == "listing":
+        if museum == "songshan":
+            details = [make_unit("detail", museum, link, i) for i, link in enumerate(songshan.list_songshan_links())]
+        elif museum == "huashan":
+            links = huashan.list_huashan_links()
+            if not links:
+                # 多半是這台機器開不了 Chrome，交給別的 worker 再試
+                raise RuntimeError("華山列表是空的（Chrome 無法啟動？）")
+            details = [make_unit("detail", museum, link, i) for i, link in enumerate(links)]
+        elif museum == "ntnu":
+            details = [
+                make_unit("detail", museum, ex.get("url") or ex.get("title") or str(i), i, payload=ex)
+                for i, ex in enumerate(ntnu.get_exhibitions(ntnu.BASE_URL))
+            ]
+        else:
+            raise ValueError(f"{museum} 沒有 listing 單位")
+        added = queue.put(details)
+        print(f"   🔗 {museum} 找到 {len(details)} 個內頁（新加入 {added}）")
+        return {"records": [], "discovered": len(details)}
+
+    if kind == "detail":
+        if museum == "songshan":
+            return {"records": [songshan.fetch_songshan_detail(unit["ref"])]}
+        if museum == "huashan":
+            return {"records": [huashan.fetch_huashan_detail(unit["ref"])]}
+        if museum == "ntnu":
+            try:
+                return {"records": [ntnu.fetch_ntnu_detail(unit["payload"])]}
+            except req.RequestException as e:
+                # 同 fetch_ntnu_exhibitions：內頁失敗就只保留列表資訊
+                print(f"⚠️ 師大展覽頁抓取失敗，只保留列表資訊：{unit['ref']}（{e!r}）")
+                return {"records": [ntnu.build_ntnu_record(unit["payload"], None, None)]}
+    raise ValueError(f"未知的單位：{unit['id']}")
+
+
+def run_worker(queue_url=DEFAULT_QUEUE, worker_id=None, lease=LEASE_SECONDS, idle_exit=True):
+    """一直領單位來做，佇列清空（沒有待做、也沒有別人正在做）就結束"""
+    queue = open_queue(queue_url)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    done = 0
+    while True:
+        unit = queue.claim(worker_id, lease)
+        if unit is None:
+            counts = queue.counts()
+            if idle_exit and counts["pending"] == 0 and counts["leased"] == 0:
+                break
+            time.sleep(POLL_SECONDS)
+            continue
+
+        # 執行中定時續約，避免慢的單位（例如開 Chrome）被當成 worker 當掉
+        stop = threading.Event()
+
+        def heartbeat(unit_id=unit["id"]):
+            while not stop.wait(lease / 3):
+                queue.extend(unit_id, worker_id, lease)
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        start = time.perf_counter()
+        try:
+            checkpoint.take_skipped()
+            result = run_unit(queue, unit)
+            # 爬蟲略過的內頁 / 分頁一起記下來，status 看得出哪些單位不完整
+            result["skipped"] = checkpoint.take_skipped()
+            queue.complete(unit["id"], result)
+            done += 1
+            note = f"，略過 {len(result['skipped'])} 頁" if result["skipped"] else ""
+            print(f"✅ [{worker_id}] {unit['id']}（{len(result['records'])} 筆{note}，{time.perf_counter() - start:.1f}s）")
+        except Exception as e:
+            queue.fail(unit["id"], repr(e))
+            print(f"❌ [{worker_id}] {unit['id']}：{e!r}")
+            traceback.print_exc()
+        finally:
+            stop.set()
+            beat.join()
+            # worker 會跑很久：記住的回應只在同一個單位內共用，不要越積越多、越放越舊
+            http_client.reset_memo()
+    print(f"🏁 [{worker_id}] 佇列已清空，共完成 {done} 個單位")
+    return done
+
+
+# --------------------
+# 合併
+# --------------------
+def merged_results(queue) -> dict:
+    """{館代號: [展覽, ...]}，依 MUSEUM_ORDER、列表順序排好"""
+    order = {key: i for i, key in enumerate(MUSEUM_ORDER)}
+    done = sorted(queue.results(), key=lambda ur: (order.get(ur[0]["museum"], len(order)), ur[0]["seq"], ur[0]["id"]))
+    merged = {}
+    for unit, result in done:
+        merged.setdefault(unit["museum"], []).extend(result.get("records", []))
+
+    counts = queue.counts()
+    if counts["pending"] or counts["leased"]:
+        print(f"⚠️ 佇列還沒做完：待做 {counts['pending']}、執行中 {counts['leased']}")
+    for unit_id, error in queue.failures().items():
+        print(f"⚠️ 失敗的單位：{unit_id}（{error}）")
+    return merged
+
+
+def serve_redis(host="127.0.0.1", port=6390):
+    """本機沒有 Redis 時，用 fakeredis 開一個相容的 TCP 伺服器"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise SystemExit("需要 fakeredis 套件：pip install fakeredis")
+    server = TcpFakeServer((host, port), server_type="redis")
+    print(f"🧪 fakeredis 伺服器：redis://{host}:{port}/0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="分散式爬取佇列")
+    parser.add_argument("--queue", default=os.environ.get("CRAWL_QUEUE", DEFAULT_QUEUE), help="佇列網址")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="放入各館的起始單位")
+    p.add_argument("--museums", nargs="+", choices=MUSEUM_ORDER)
+    p.add_argument("--reset", action="store_true", help="先清空佇列")
+
+    p = sub.add_parser("worker", help="領取並執行單位")
+    p.add_argument("--processes", type=int, default=1)
+    p.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    p.add_argument("--forever", action="store_true", help="佇列清空後繼續等新的單位")
+
+    sub.add_parser("status", help="顯示佇列狀態")
+
+    p = sub.add_parser("serve-redis", help="開一個 fakeredis 伺服器代替 Redis")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=6390)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve-redis":
+        serve_redis(args.host, args.port)
+        return
+
+    queue = open_queue(args.queue)
+    if args.command == "enqueue":
+        if args.reset:
+            queue.reset()
+        added = queue.put(seed_units(args.museums))
+        print(f"📥 加入 {added} 個單位：{queue.counts()}")
+    elif args.command == "worker":
+        idle_exit = not args.forever
+        if args.processes <= 1:
+            run_worker(args.queue, lease=args.lease, idle_exit=idle_exit)
+        else:
+            procs = [
+                multiprocessing.Process(target=run_worker, args=(args.queue, None, args.lease, idle_exit))
+                for _ in range(args.processes)
+            ]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+    elif args.command == "status":
+        print(json.dumps(queue.counts(), ensure_ascii=False))
+        for unit_id, error in queue.failures().items():
+            print(f"  ❌ {unit_id}：{error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+展覽變動事件（給 push_server.py 推播用）。
+
+每個館爬完就跟上一次的狀態比對，把變動寫成事件，附加到 EVENTS_PATH（NDJSON，一行一個事件）：
+- exhibition_added：新展覽
+- exhibition_changed：欄位有變（changes 裡有新舊值；日期有變時 date_changed = true）
+- exhibition_ended：從列表消失，而且結束日期已經過了
+- exhibition_removed：從列表消失，但還沒到結束日期（或沒有結束日期）
+
+事件 id 是遞增整數，斷線重連的客戶端帶上最後收到的 id 就能補收後面的事件。
+
+比對的基準是「已經發出事件的狀態」（EVENTS_PATH + STATE_SUFFIX），每個館發完事件就存一次，
+不是 change_feed 的狀態（那個要等整次爬完 publish 才更新）。
+爬到一半當掉、下次再跑（或 --resume 沿用存檔）時，已經發過的變動不會再發一次；
+第一次使用時從 change_feed 的狀態開始。
+"""
+import json
+import os
+import threading
+from datetime import date, datetime
+
+import change_feed
+
+EVENTS_PATH = "events.ndjson"
+STATE_SUFFIX = ".state.json"
+DATE_FIELDS = {"展覽日期", "start_date", "end_date"}
+
+_lock = threading.Lock()
+
+
+class EventLog:
+    def __init__(self, path=EVENTS_PATH):
+        self.path = path
+        self.state_path = path + STATE_SUFFIX
+        self.last_id = self._read_last_id()
+        self._emitted = None  # 第一次 emit 才讀（push_server 只讀事件，用不到）
+
+    def _read_last_id(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        last = 0
+        with open(self.path, "rb") as f:
+            # 只讀檔尾就好，不必掃整個檔案
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 65536))
+            for line in f.read().splitlines():
+                try:
+                    last = json.loads(line)["id"]
+                except (ValueError, KeyError):
+                    continue
+        return last
+
+    def append(self, events):
+        """寫入事件（自動編 id），回傳寫入的事件"""
+        if not events:
+            return []
+        now = datetime.now().isoformat(timespec="seconds")
+        with _lock:
+            lines = []
+            for ev in events:
+                self.last_id += 1
+                ev["id"] = self.last_id
+                ev["at"] = now
+                lines.append(json.dumps(ev, ensure_ascii=False))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        return events
+
+    def emitted_state(self) -> dict:
+        """已經發出事件的狀態：{exhibition_id: 該列資料}"""
+        if self._emitted is None:
+            if os.path.exists(self.state_path):
+                self._emitted = change_feed.load_state(self.state_path)
+            else:
+                self._emitted = change_feed.load_state()
+        return self._emitted
+
+    def emit(self, rows, fields, today=None, complete=True):
+        """
+        某個館的結果（已 assign_ids）-> 跟已發出的狀態比對、寫入事件，
+        並馬上把這個館併進已發出的狀態存檔。回傳寫入的事件。
+        complete=False（時間用完、有頁面被略過）：只發新增 / 變更，沒抓到的展覽不算下架，
+        也繼續留在已發出的狀態裡。
+        """
+        prev = self.emitted_state()
+        written = self.append(museum_events(prev, rows, fields, today, complete=complete))
+        self._emitted = change_feed.merge_state(prev, rows, museums=None if complete else set())
+        change_feed.save_state(self._emitted, self.state_path)
+        return written
+
+    def read_after(self, cursor: int = 0, offset: int = 0):
+        """
+        從檔案位置 offset 開始讀，回傳 (id > cursor 的事件, 新的 offset)。
+        推播伺服器用 offset 持續追新寫入的事件。
+        """
+        if not os.path.exists(self.path):
+            return [], offset
+        events = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    break  # 寫到一半的行下次再讀
+                offset = f.tell()
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue
+                if ev.get("id", 0) > cursor:
+                    events.append(ev)
+        return events, offset
+
+
+def _is_ended(row: dict, today: date) -> bool:
+    end = row.get("end_date")
+    if not end:
+        return False
+    try:
+        return date.fromisoformat(str(end)) < today
+    except ValueError:
+        return False
+
+
+def museum_events(prev_state: dict, rows, fields, today=None, complete=True):
+    """
+    某個館這次的結果（已 assign_ids）跟上一次的狀態比，產生事件。
+    只比對 rows 裡出現的館別，這次 0 筆的館不會被當成整館下架；
+    complete=False 時結果不完整，完全不產生 ended / removed。
+    """
+    today = today or date.today()
+    delta = change_feed.compute_delta(prev_state, rows, fields, museums=None if complete else set())
+
+    events = []
+    for row in delta["added"]:
+        events.append({
+            "type": "exhibition_added",
+            "museum": row.get("館別", ""),
+            "exhibition_id": row[change_feed.ID_FIELD],
+            "data": {f: row.get(f) for f in fields},
+        })
+    for ch in delta["changed"]:
+        events.append({
+            "type": "exhibition_changed",
+            "museum": ch["館別"],
+            "exhibition_id": ch[change_feed.ID_FIELD],
+            "title": ch["展覽名稱"],
+            "changes": ch["changes"],
+            "date_changed": bool(DATE_FIELDS & set(ch["changes"])),
+        })
+    for rm in delta["removed"]:
+        old = prev_state.get(rm[change_feed.ID_FIELD], {})
+        events.append({
+            "type": "exhibition_ended" if _is_ended(old, today) else "exhibition_removed",
+            "museum": rm["館別"],
+            "exhibition_id": rm[change_feed.ID_FIELD],
+            "title": rm["展覽名稱"],
+            "end_date": old.get("end_date"),
+        })
+    return events
@@ -0,0 +1,187 @@
+"""
+本機的假 Google Places searchText 伺服器，給 museums_info.py / places_tiling.py 測試用，不花 API 額度。
+
+行為照真的 API：
+- POST /v1/places:searchText，body 跟真的一樣（textQuery、includedType、pageSize、locationRestriction）
+- includedType：只回傳 types 含這個類型的地點；locationRestriction.rectangle：只回傳範圍內的
+- 一次最多 pageSize 筆（最多 20），後面還有就給 nextPageToken；整串查詢最多 MAX_RESULTS 筆
+- 帶 pageToken 的請求，其他參數要跟第一頁一樣，不然回 400（跟真的 API 一樣）
+- 每次請求都記在 server.requests，測試可以檢查打了幾次、有沒有走快取
+
+用法：
+    python fake_places_server.py --port 8080 --places 300
+    python museums_info.py --base-url http://127.0.0.1:8080/v1/places:searchText --tiles
+
+測試裡：
+    with FakePlacesServer(synthetic_places(300)) as server:
+        museums_info.BASE_URL = server.url
+"""
+import argparse
+import json
+import random
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEARCH_PATH = "/v1/places:searchText"
+MAX_PAGE_SIZE = 20
+MAX_RESULTS = 60
+
+# 雙北範圍（跟 places_tiling.BBOX 一樣）
+BBOX = (24.67, 121.28, 25.30, 122.01)
+
+
+def synthetic_places(n: int, bbox=BBOX, seed: int = 0):
+    """n 個隨機分佈在 bbox 裡的地點：一半博物館、一半美術館"""
+    rng = random.Random(seed)
+    south, west, north, east = bbox
+    places = []
+    for i in range(n):
+        kind = "museum" if i % 2 == 0 else "art_gallery"
+        places.append({
+            "id": f"fake-{i:05d}",
+            "displayName": {"text": f"{'博物館' if kind == 'museum' else '美術館'} {i}", "languageCode": "zh-TW"},
+            "formattedAddress": f"台北市測試路 {i} 號",
+            "location": {"latitude": rng.uniform(south, north), "longitude": rng.uniform(west, east)},
+            "types": [kind, "point_of_interest", "establishment"],
+            "regularOpeningHours": {"weekdayDescriptions": ["星期一: 休息", "星期二: 09:00 – 17:00"]},
+        })
+    return places
+
+
+def _in_rectangle(place: dict, restriction: dict) -> bool:
+    rect = (restriction or {}).get("rectangle")
+    if not rect:
+        return True
+    loc = place.get("location", {})
+    lat, lng = loc.get("latitude"), loc.get("longitude")
+    low, high = rect["low"], rect["high"]
+    # 南、西邊界含，北、東邊界不含：切塊時邊界上的點只屬於一塊
+    return (low["latitude"] <= lat < high["latitude"]
+            and low["longitude"] <= lng < high["longitude"])
+
+
+class FakePlacesServer:
+    def __init__(self, places, host="127.0.0.1", port=0):
+        self.places = list(places)
+        self.requests = []
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{SEARCH_PATH}"
+
+    # --------------------
+    # 查詢
+    # --------------------
+    def matches(self, body: dict):
+        included = body.get("includedType")
+        return [
+            p for p in self.places
+            if (not included or included in p.get("types", []))
+            and _in_rectangle(p, body.get("locationRestriction"))
+        ][:MAX_RESULTS]
+
+    def search(self, body: dict):
+        """回傳 (HTTP 狀態碼, 回應 body)"""
+        token = body.pop("pageToken", None)
+        query = json.dumps(body, sort_keys=True, ensure_ascii=False)
+        if token:
+            with self._lock:
+                saved = self._tokens.get(token)
+            if saved is None or saved[0] != query:
+                return 400, {"error": {"code": 400, "message": "Invalid pageToken", "status": "INVALID_ARGUMENT"}}
+            offset = saved[1]
+        else:
+            offset = 0
+
+        size = min(int(body.get("pageSize") or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        found = self.matches(body)
+        data = {}
+        page = found[offset:offset + size]
+        if page:
+            data["places"] = page
+        if offset + size < len(found):
+            next_token = uuid.uuid4().hex
+            with self._lock:
+                self._tokens[next_token] = (query, offset + size)
+            data["nextPageToken"] = next_token
+        return 200, data
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    body = None
+                with server._lock:
+                    server.requests.append(dict(body or {}))
+
+                if self.path != SEARCH_PATH:
+                    status, data = 404, {"error": {"code": 404, "message": "Not Found", "status": "NOT_FOUND"}}
+                elif body is None:
+                    status, data = 400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}}
+                else:
+                    status, data = server.search(body)
+
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):  # 不印每個請求
+                pass
+
+        return Handler
+
+    # --------------------
+    # 啟動 / 關閉
+    # --------------------
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本機的假 Places searchText 伺服器")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--places", type=int, default=300, help="隨機產生幾個地點")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FakePlacesServer(synthetic_places(args.places, seed=args.seed), port=args.port)
+    print(f"🧪 假 Places 伺服器：{server.url}（{args.places} 個地點，Ctrl+C 結束）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
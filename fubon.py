@@ -1,13 +1,9 @@
-import requests as req
 from bs4 import BeautifulSoup as bs
 from urllib.parse import urljoin
 from requests.utils import requote_uri
-import urllib3
 import re  # ⭐ 新增：用來解析日期
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+from http_client import session
 
 
 def parse_fubon_date(raw: str):
@@ -80,14 +76,14 @@ def parse_fubon_date(raw: str):
     return None, None, 0
 
 
-def fetch_fubon_exhibitions():
-    base_url = "https://www.fubonartmuseum.org"
-    exhs_url = "https://www.fubonartmuseum.org/Exhibitions"
-    museum_name = "富邦美術館"
+BASE_URL = "https://www.fubonartmuseum.org"
+EXHIBITIONS_URL = "https://www.fubonartmuseum.org/Exhibitions"
+MUSEUM_NAME = "富邦美術館"
 
-    resp = session.get(exhs_url, timeout=20)
-    resp.raise_for_status()
-    html = bs(resp.text, "html.parser")
+
+def parse_fubon_listing(text: str):
+    """列表頁 HTML -> 展覽資料（純解析，不連網）"""
+    html = bs(text, "html.parser")
     exhs = html.find_all("a", class_="fb-exhibitions-card")
 
     results = []
@@ -95,7 +91,7 @@ def fetch_fubon_exhibitions():
     for exh in exhs:
         # 展覽連結
         ex_link = exh.get("href", "")
-        link = urljoin(base_url, ex_link)
+        link = urljoin(BASE_URL, ex_link)
 
         info_group = exh.find_all("div", class_="info_group")
 
@@ -132,7 +128,7 @@ def fetch_fubon_exhibitions():
             img = requote_uri(img_tag["src"])
 
         results.append({
-            "museum": museum_name,
+            "museum": MUSEUM_NAME,
             "title": title,
             "date": ex_date,           # 原始字串
             "start_date": start_date,  # YYYY-MM-DD
@@ -150,7 +146,11 @@ def fetch_fubon_exhibitions():
     return results
 
 
+def fetch_fubon_exhibitions():
+    resp = session.get(EXHIBITIONS_URL, timeout=20)
+    resp.raise_for_status()
+    return parse_fubon_listing(resp.text)
+
+
 if __name__ == "__main__":
     print(fetch_fubon_exhibitions())
-
-print(fetch_fubon_exhibitions())
\ No newline at end of file
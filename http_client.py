@@ -0,0 +1,599 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests as req
+from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
+import urllib3
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+# --------------------
+# 錄製 / 重播（離線模式）
+# --------------------
+# record_dir：每個回應都存一份到這個資料夾
+# replay_dir：完全不連網，從這個資料夾讀回應
+_record_dir = None
+_replay_dir = None
+
+# --------------------
+# 網路等待時間統計（給 --profile 用）
+# --------------------
+_stats_lock = threading.Lock()
+# seconds 是每個請求的等待時間加總（多執行緒同時抓時可能超過總耗時）；
+# busy_seconds 是「至少有一個請求在等」的時間，不會超過總耗時
+_net_stats = {"requests": 0, "seconds": 0.0, "busy_seconds": 0.0}
+_waiting_threads = set()  # 正在等網路回應的 thread id
+_busy_since = None
+
+
+# --------------------
+# 重試 / 斷路器 / 全域期限
+# --------------------
+MAX_RETRIES = 3                     # 暫時性錯誤最多重試幾次
+BACKOFF_BASE = 0.5                  # 第一次重試前等幾秒，之後每次加倍
+BACKOFF_MAX = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+BREAKER_THRESHOLD = 5               # 同一個 host 連續失敗幾次就斷路
+BREAKER_COOLDOWN = 60.0             # 斷路後幾秒才放一個請求試探
+
+_hosts_lock = threading.Lock()
+_hosts = {}                         # host -> 狀態與統計
+_deadline = None                    # time.monotonic() 的絕對時間
+
+# --------------------
+# 每個 host 的限速（token bucket）
+# --------------------
+# (每秒請求數, burst)；沒有列出來的 host 用 "default"
+HOST_RATES = {
+    "default": (2.0, 4),
+    "www.npm.gov.tw": (2.0, 4),
+    "www.songshanculturalpark.org": (2.0, 4),
+    "www.huashan1914.com": (2.0, 4),
+    "www.artmuse.ntnu.edu.tw": (1.0, 2),
+}
+MIN_RATE = 0.2                      # 再怎麼降速也不低於每 5 秒一次
+RATE_INCREASE = 0.1                 # 每次成功回應，速率加回多少（每秒請求數）
+RATE_DECREASE = 0.5                 # 遇到 429 / 5xx，速率乘上多少
+SLOW_REPLY = 5.0                    # 回應超過幾秒視為對方吃緊
+SLOW_DECREASE = 0.8                 # 回應太慢，速率乘上多少
+
+_buckets_lock = threading.Lock()
+_buckets = {}                       # host -> TokenBucket
+
+# --------------------
+# 單次執行內的回應共用（single-flight + memo）
+# --------------------
+# 同一次執行中，同一個網址的 GET 只真正送出一次：
+# 同時有好幾個 thread 要同一個網址時，只有第一個去抓，其他等它的結果；
+# 抓完之後再要的直接拿記住的回應。解析過的文件（BeautifulSoup）也一起共用。
+MEMO_MAX_BYTES = 2 * 1024 * 1024    # 太大的回應（圖片、檔案）不記
+MEMO_CONTENT_TYPES = ("text/", "application/json", "application/xhtml")
+
+_memo_lock = threading.Lock()
+_memo = {}                          # (url, params) -> _Flight
+_documents = {}                     # (url, parser) -> 解析結果
+_memo_stats = {"fetched": 0, "hits": 0, "coalesced": 0, "documents_reused": 0}
+_memo_enabled = True
+
+# --------------------
+# 場館資訊（館名、地址、開放時間）長效快取
+# --------------------
+VENUE_CACHE_PATH = "venue_metadata_cache.json"
+VENUE_TTL_HOURS = 24 * 7
+
+
+class ReplayMissError(req.ConnectionError):
+    """重播模式下找不到對應的錄製檔"""
+
+
+class CircuitOpenError(req.ConnectionError):
+    """這個 host 連續失敗太多次，暫時不再送請求"""
+
+
+class DeadlineExceeded(req.Timeout):
+    """整次爬取的時間預算用完了"""
+
+
+def set_deadline(seconds):
+    """設定整次爬取的時間預算（秒）；None = 不限制"""
+    global _deadline
+    _deadline = None if seconds is None else time.monotonic() + seconds
+
+
+def time_left():
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic()
+
+
+def deadline_exceeded() -> bool:
+    left = time_left()
+    return left is not None and left <= 0
+
+
+class TokenBucket:
+    """
+    限速用的 token bucket，所有執行緒共用。
+
+    速率會自動調整：成功就慢慢加回設定值（加法增加），
+    遇到 429 / 5xx 或回應太慢就打折（乘法減少），
+    遇到 Retry-After 就整個 host 暫停到指定時間。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """拿一個 token；不夠就等，等待時間超過時間預算就放棄"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            _sleep_within_deadline(wait)
+
+    def on_success(self, elapsed: float):
+        with self.lock:
+            if elapsed > SLOW_REPLY:
+                self.rate = max(MIN_RATE, self.rate * SLOW_DECREASE)
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate * RATE_DECREASE)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+def set_rate(host: str, rate: float, burst: int):
+    """設定某個 host（或 "default"）的每秒請求數與 burst"""
+    HOST_RATES[host] = (rate, burst)
+    with _buckets_lock:
+        if host == "default":
+            _buckets.clear()
+        else:
+            _buckets.pop(host, None)
+
+
+def _bucket(host: str) -> TokenBucket:
+    with _buckets_lock:
+        if host not in _buckets:
+            rate, burst = HOST_RATES.get(host, HOST_RATES["default"])
+            _buckets[host] = TokenBucket(rate, burst)
+        return _buckets[host]
+
+
+def _retry_after_seconds(resp):
+    value = resp.headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else None
+
+
+def _host_state(host: str) -> dict:
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = {
+                "requests": 0,
+                "retries": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "opened_at": None,
+                "probe_started": None,  # half-open 時正在試探的請求開始時間
+                "circuit_opens": 0,
+            }
+        return _hosts[host]
+
+
+def host_stats() -> dict:
+    """每個 host 的請求 / 重試 / 失敗次數、斷路器狀態與目前限速（寫進 run report）"""
+    with _hosts_lock:
+        out = {}
+        for host, st in _hosts.items():
+            out[host] = {k: v for k, v in st.items() if k not in ("opened_at", "probe_started")}
+            out[host]["circuit_open"] = st["opened_at"] is not None
+    with _buckets_lock:
+        for host, bucket in _buckets.items():
+            if host in out:
+                out[host]["rate_per_second"] = round(bucket.rate, 2)
+    return out
+
+
+def _check_circuit(host: str):
+    st = _host_state(host)
+    with _hosts_lock:
+        if st["opened_at"] is None:
+            return
+        now = time.monotonic()
+        if now - st["opened_at"] < BREAKER_COOLDOWN:
+            raise CircuitOpenError(f"{host} 斷路中，略過請求")
+        # 冷卻時間到了：只放一個請求去試探（half-open），其他的照樣略過，
+        # 等試探結果出來才決定要不要恢復；試探的請求沒回報結果（例如被期限打斷）時，
+        # 再過一次冷卻時間可以換別的請求試探
+        probe = st["probe_started"]
+        if probe is not None and now - probe < BREAKER_COOLDOWN:
+            raise CircuitOpenError(f"{host} 斷路中（試探中），略過請求")
+        st["probe_started"] = now
+
+
+def _record_result(host: str, ok: bool):
+    st = _host_state(host)
+    with _hosts_lock:
+        probing = st["probe_started"] is not None
+        st["probe_started"] = None
+        if ok:
+            st["consecutive_failures"] = 0
+            if probing:
+                st["opened_at"] = None
+                print(f"✅ {host} 試探成功，恢復請求")
+            return
+        st["failures"] += 1
+        st["consecutive_failures"] += 1
+        if probing:
+            # 試探失敗：馬上再斷路
+            st["opened_at"] = time.monotonic()
+            st["circuit_opens"] += 1
+            print(f"⚡ {host} 試探失敗，再暫停請求 {BREAKER_COOLDOWN:.0f} 秒")
+        elif st["consecutive_failures"] >= BREAKER_THRESHOLD and st["opened_at"] is None:
+            st["opened_at"] = time.monotonic()
+            st["circuit_opens"] += 1
+            print(f"⚡ {host} 連續失敗 {st['consecutive_failures']} 次，暫停請求 {BREAKER_COOLDOWN:.0f} 秒")
+
+
+def _backoff(attempt: int, resp=None) -> float:
+    """指數退避 + 隨機抖動；伺服器有給 Retry-After 就照它的"""
+    if resp is not None:
+        retry_after = _retry_after_seconds(resp)
+        if retry_after is not None:
+            return min(retry_after, BACKOFF_MAX)
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _sleep_within_deadline(seconds: float):
+    left = time_left()
+    if left is not None and seconds >= left:
+        raise DeadlineExceeded("時間預算不足以再重試")
+    time.sleep(seconds)
+
+
+def enable_record(path: str):
+    global _record_dir
+    os.makedirs(path, exist_ok=True)
+    _record_dir = path
+    print(f"📼 錄製模式：回應會存到 {path}")
+
+
+def enable_replay(path: str):
+    global _replay_dir
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"找不到重播資料夾：{path}")
+    _replay_dir = path
+    print(f"📼 重播模式：從 {path} 讀取回應（不連網）")
+
+
+def is_offline() -> bool:
+    """重播模式下不應該啟動瀏覽器或連網"""
+    return _replay_dir is not None
+
+
+def reset_net_stats() -> dict:
+    """歸零並回傳目前為止的網路統計"""
+    global _busy_since
+    with _stats_lock:
+        now = time.perf_counter()
+        if _busy_since is not None:
+            _net_stats["busy_seconds"] += now - _busy_since
+            _busy_since = now
+        snapshot = dict(_net_stats)
+        _net_stats["requests"] = 0
+        _net_stats["seconds"] = 0.0
+        _net_stats["busy_seconds"] = 0.0
+    return snapshot
+
+
+def net_stats() -> dict:
+    with _stats_lock:
+        return dict(_net_stats)
+
+
+def is_waiting_on_network(thread_id: int) -> bool:
+    with _stats_lock:
+        return thread_id in _waiting_threads
+
+
+def _cache_key(method: str, url: str) -> str:
+    return hashlib.sha1(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+
+def _save_response(method: str, url: str, resp):
+    data = {
+        "method": method.upper(),
+        "url": url,
+        "final_url": resp.url,
+        "status": resp.status_code,
+        "reason": resp.reason,
+        "headers": dict(resp.headers),
+        "encoding": resp.encoding,
+        "body": base64.b64encode(resp.content).decode("ascii"),
+    }
+    path = os.path.join(_record_dir, _cache_key(method, url) + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def _load_response(method: str, url: str):
+    path = os.path.join(_replay_dir, _cache_key(method, url) + ".json")
+    if not os.path.exists(path):
+        raise ReplayMissError(f"重播資料沒有這個網址：{method.upper()} {url}")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    resp = req.Response()
+    resp.status_code = data["status"]
+    resp.reason = data.get("reason", "")
+    resp.headers = CaseInsensitiveDict(data.get("headers", {}))
+    resp.url = data.get("final_url") or url
+    resp.encoding = data.get("encoding")
+    resp._content = base64.b64decode(data["body"])
+    resp.request = req.Request(method.upper(), url).prepare()
+    return resp
+
+
+# --------------------
+# single-flight + memo
+# --------------------
+class _Flight:
+    """一個正在抓（或已經抓完）的請求，等它的 thread 共用結果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.resp = None
+        self.error = None
+
+
+def _memo_key(method: str, url: str, kwargs):
+    """只有單純的 GET 才共用；帶 headers / body / stream 的請求結果可能不一樣"""
+    if not _memo_enabled or method.upper() != "GET":
+        return None
+    if any(kwargs.get(k) for k in ("headers", "data", "json", "files", "stream", "auth", "cookies")):
+        return None
+    params = kwargs.get("params")
+    return url, json.dumps(params, sort_keys=True, default=str) if params else ""
+
+
+def _memoizable(resp) -> bool:
+    # 只共用成功 / 轉址與 404；其他 4xx（包含重試完還是 429）、5xx 之後再要時重抓
+    if not (200 <= resp.status_code < 400 or resp.status_code == 404):
+        return False
+    ctype = resp.headers.get("Content-Type", "")
+    return (not ctype or ctype.startswith(MEMO_CONTENT_TYPES)) and len(resp.content) <= MEMO_MAX_BYTES
+
+
+def set_memo(enabled: bool):
+    global _memo_enabled
+    _memo_enabled = enabled
+    reset_memo()
+
+
+def reset_memo() -> dict:
+    """清掉記住的回應與文件（例如 worker 換下一個工作單位時），回傳目前為止的統計"""
+    with _memo_lock:
+        _memo.clear()
+        _documents.clear()
+        snapshot = dict(_memo_stats)
+        for k in _memo_stats:
+            _memo_stats[k] = 0
+    return snapshot
+
+
+def memo_stats() -> dict:
+    with _memo_lock:
+        return dict(_memo_stats)
+
+
+def get_document(url: str, timeout=20, features="html.parser") -> BeautifulSoup:
+    """
+    同一次執行共用的 BeautifulSoup：同一頁只下載、解析一次。
+    拿到的文件是共用的，只能讀，不要修改（decompose / extract 等）。
+    """
+    key = (url, features)
+    with _memo_lock:
+        doc = _documents.get(key)
+        if doc is not None:
+            _memo_stats["documents_reused"] += 1
+            return doc
+    resp = session.get(url, timeout=timeout)
+    resp.raise_for_status()
+    doc = BeautifulSoup(resp.text, features)
+    if _memo_enabled:
+        with _memo_lock:
+            doc = _documents.setdefault(key, doc)
+    return doc
+
+
+# --------------------
+# 場館資訊長效快取
+# --------------------
+_venue_lock = threading.Lock()
+
+
+def _load_venue_cache(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def venue_metadata(key: str, fetch, ttl_hours=None, path=None):
+    """
+    場館資訊（館名、地址、開放時間）很少變，不用每次都重抓：
+    ttl_hours（預設 VENUE_TTL_HOURS）內直接用快取；
+    過期後重抓，重抓失敗就沿用舊的快取，沒有快取才把錯誤往外丟。
+    fetch() 的回傳值要能存成 JSON（tuple 讀回來會變成 list）。
+    """
+    path = path or VENUE_CACHE_PATH
+    ttl = VENUE_TTL_HOURS if ttl_hours is None else ttl_hours
+    with _venue_lock:
+        entry = _load_venue_cache(path).get(key)
+    if entry and time.time() - entry["fetched_at"] < ttl * 3600:
+        return entry["value"]
+
+    try:
+        value = fetch()
+    except req.RequestException as e:
+        if entry is None:
+            raise
+        print(f"⚠️ {key} 場館資訊更新失敗，沿用 {time.strftime('%Y-%m-%d', time.localtime(entry['fetched_at']))} 的快取：{e!r}")
+        return entry["value"]
+
+    with _venue_lock:
+        cache = _load_venue_cache(path)
+        cache[key] = {"fetched_at": time.time(), "value": value}
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    return value
+
+
+class CrawlSession(req.Session):
+    """所有爬蟲共用的 Session：加上錄製/重播、網路時間統計、同網址只抓一次"""
+
+    def request(self, method, url, *args, **kwargs):
+        key = None if args else _memo_key(method, url, kwargs)
+        if key is None:
+            return self._send(method, url, *args, **kwargs)
+
+        with _memo_lock:
+            flight = _memo.get(key)
+            owner = flight is None
+            if owner:
+                flight = _memo[key] = _Flight()
+            else:
+                _memo_stats["hits" if flight.done.is_set() else "coalesced"] += 1
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.resp
+
+        try:
+            resp = self._send(method, url, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            with _memo_lock:
+                _memo.pop(key, None)
+            flight.done.set()
+            raise
+        flight.resp = resp
+        with _memo_lock:
+            _memo_stats["fetched"] += 1
+            if not _memoizable(resp):
+                _memo.pop(key, None)
+        flight.done.set()
+        return resp
+
+    def _send(self, method, url, *args, **kwargs):
+        global _busy_since
+        tid = threading.get_ident()
+        start = time.perf_counter()
+        with _stats_lock:
+            if not _waiting_threads:
+                _busy_since = start
+            _waiting_threads.add(tid)
+        try:
+            if _replay_dir:
+                resp = _load_response(method, url)
+            else:
+                resp = self._request_with_retry(method, url, *args, **kwargs)
+                if _record_dir:
+                    _save_response(method, url, resp)
+        finally:
+            end = time.perf_counter()
+            with _stats_lock:
+                _waiting_threads.discard(tid)
+                _net_stats["requests"] += 1
+                _net_stats["seconds"] += end - start
+                if not _waiting_threads and _busy_since is not None:
+                    _net_stats["busy_seconds"] += end - _busy_since
+                    _busy_since = None
+        return resp
+
+    def _request_with_retry(self, method, url, *args, **kwargs):
+        host = urlsplit(url).hostname or ""
+        st = _host_state(host)
+        bucket = _bucket(host)
+        retries = MAX_RETRIES if method.upper() in RETRY_METHODS else 0
+        timeout = kwargs.get("timeout")
+
+        attempt = 0
+        while True:
+            if deadline_exceeded():
+                raise DeadlineExceeded(f"時間預算已用完，略過 {url}")
+            _check_circuit(host)
+            bucket.acquire()
+
+            # 單次請求的 timeout 不能超過剩下的時間預算
+            left = time_left()
+            if left is not None:
+                kwargs["timeout"] = left if timeout is None else min(timeout, left)
+
+            with _hosts_lock:
+                st["requests"] += 1
+            sent = time.monotonic()
+            try:
+                resp = super().request(method, url, *args, **kwargs)
+            except (req.ConnectionError, req.Timeout) as e:
+                _record_result(host, ok=False)
+                if isinstance(e, req.Timeout):
+                    bucket.on_throttle()
+                if attempt >= retries:
+                    raise
+                print(f"🔁 {host} 連線失敗（{e.__class__.__name__}），重試第 {attempt + 1} 次")
+                _sleep_within_deadline(_backoff(attempt))
+            else:
+                if resp.status_code not in RETRY_STATUS:
+                    _record_result(host, ok=True)
+                    bucket.on_success(time.monotonic() - sent)
+                    return resp
+                _record_result(host, ok=False)
+                bucket.on_throttle(_retry_after_seconds(resp))
+                if attempt >= retries:
+                    return resp
+                print(f"🔁 {host} 回應 {resp.status_code}，重試第 {attempt + 1} 次")
+                _sleep_within_deadline(_backoff(attempt, resp))
+
+            attempt += 1
+            with _hosts_lock:
+                st["retries"] += 1
+
+
+session = CrawlSession()
+session.verify = False
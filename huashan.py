@@ -4,19 +4,23 @@ from urllib.parse import urljoin
 import requests as req
 from bs4 import BeautifulSoup as bs
 from requests.utils import requote_uri
-import urllib3
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+from http_client import session, is_offline, DeadlineExceeded
+import checkpoint
+import pagination
+import resources
 
 
 def get_driver(headless=True):
+    if is_offline():
+        print("⚠️ 離線重播模式無法使用 Selenium，略過華山")
+        return None
+
     from selenium.webdriver.chrome.options import Options
     opts = Options()
     if headless:
@@ -27,12 +31,16 @@ def get_driver(headless=True):
     opts.add_argument("--disable-gpu")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument(resources.chrome_marker())
     try:
-        return webdriver.Chrome(options=opts)
+        driver = webdriver.Chrome(options=opts)
     except Exception as e:
         print("⚠️ 無法啟動 Selenium driver，略過華山：", repr(e))
         return None
 
+    resources.register_browser(driver)
+    return driver
+
 
 def parse_huashan_date(raw: str):
     """
@@ -94,26 +102,35 @@ def parse_huashan_date(raw: str):
     return None, None, 0
 
 
-def fetch_huashan_exhibitions():
-    base_url = "https://www.huashan1914.com"
-    exh = "https://www.huashan1914.com/w/huashan1914"
-    museum_name = "華山1914文化創意產業園區"
+BASE_URL = "https://www.huashan1914.com"
+EXHIBITIONS_URL = "https://www.huashan1914.com/w/huashan1914"
+MUSEUM_NAME = "華山1914文化創意產業園區"
 
+
+def list_huashan_links():
+    """用 Selenium 開列表頁，回傳展覽內頁連結；Chrome 開不起來回傳 []"""
     driver = get_driver(headless=True)
     if driver is None:
         return []
 
-    results = []
+    links = []
     try:
-        driver.get(exh)
+        driver.get(EXHIBITIONS_URL)
         wait = WebDriverWait(driver, 20)
-        container = wait.until(
+        active = wait.until(
             EC.presence_of_element_located(
                 (By.CSS_SELECTOR, ".swiper-slide.swiper-slide-active")
             )
         )
-        items = container.find_elements(By.XPATH, "./div")
-
+        # 輪播的每一張都已經在 DOM 裡（只是沒顯示），不用一張張翻；
+        # loop 模式複製出來頭尾相接用的 swiper-slide-duplicate 不算
+        slides = active.find_elements(
+            By.XPATH,
+            "../*[contains(concat(' ', normalize-space(@class), ' '), ' swiper-slide ')"
+            " and not(contains(concat(' ', normalize-space(@class), ' '), ' swiper-slide-duplicate '))]",
+        )
+        print(f"   🎠 華山輪播共 {len(slides)} 張")
+        items = [it for slide in slides for it in slide.find_elements(By.XPATH, "./div")]
         for it in items:
             # 展覽連結
             ex_link = ""
@@ -122,72 +139,114 @@ def fetch_huashan_exhibitions():
                 onclick = img.get_attribute("onclick") or ""
                 m = re.search(r"'(/[^']+)'", onclick)
                 if m:
-                    url_part = m.group(1)
-                    ex_link = urljoin(base_url, url_part)
+                    ex_link = urljoin(BASE_URL, m.group(1))
             except Exception:
                 pass
 
-            if not ex_link.startswith(("http://", "https://")):
-                continue
+            if ex_link.startswith(("http://", "https://")):
+                links.append(ex_link)
+    finally:
+        # 內頁用一般 HTTP 就能抓，列表拿到就先關掉 Chrome
+        resources.quit_driver(driver)
+    return pagination.unique(links)
+
+
+def parse_huashan_detail(text: str, ex_link: str):
+    """內頁 HTML -> 展覽資料（純解析，不連網）"""
+    html = bs(text, "html.parser")
+
+    # 展覽名稱
+    title = ""
+    ex_title = html.find("div", class_="article-title page")
+    if ex_title:
+        title = ex_title.get_text(strip=True)
+
+    # 展覽日期（原始字串）
+    ex_date = ""
+    dates = [d.get_text(strip=True) for d in html.find_all("div", class_="card-date")]
+    if dates:
+        ex_date = " - ".join(dates[:2])
+
+    # 解析日期
+    start_date, end_date, is_permanent = parse_huashan_date(ex_date)
+
+    # 展覽時間
+    ex_time = ""
+    node = html.find("div", class_="card-time")
+    if node:
+        raw = node.get_text(" ", strip=True)
+        if re.match(r"^\d", raw):
+            ex_time = raw
+
+    # 展覽圖片
+    ex_img = ""
+    first_img = html.select_one("span[rel] img")
+    if first_img and first_img.get("src"):
+        ex_img = requote_uri(urljoin(BASE_URL, first_img["src"]))
+
+    # 展覽地點
+    ex_place = ""
+    place = html.find("a", class_="openMap")
+    if place:
+        ex_place = place.get_text(strip=True)
+
+    return {
+        "museum": MUSEUM_NAME,
+        "title": title,
+        "date": ex_date,           # 原始日期字串
+        "start_date": start_date,  # 解析後開始日期
+        "end_date": end_date,      # 解析後結束日期
+        "is_permanent": is_permanent,  # 0: 一般展期, 1: 長期/常設
+        "topic": "",
+        "url": ex_link,
+        "image_url": ex_img,
+        "location": ex_place,
+        "time": ex_time,
+        "category": "",
+        "extra": "",
+    }
+
+
+def fetch_huashan_detail(ex_link: str):
+    """抓一個展覽內頁，回傳展覽資料（連線錯誤直接往外丟）"""
+    resp = session.get(ex_link, timeout=20)
+    resp.raise_for_status()
+    return parse_huashan_detail(resp.text, ex_link)
 
+
+def fetch_huashan_exhibitions():
+    # 循環 import：parse_stage 註冊解析器時需要這個模組
+    import parse_stage
+
+    ex_links = list_huashan_links()
+    records, pages = {}, []
+
+    # 先下載所有內頁，解析統一交給 parse_stage 的 process pool
+    for ex_link in ex_links:
+        # 上次中斷前已經抓過的內頁（--resume）
+        cached = checkpoint.load_detail(ex_link)
+        if cached is not None:
+            records[ex_link] = cached
+            continue
+
+        try:
             resp = session.get(ex_link, timeout=20)
             resp.raise_for_status()
-            html = bs(resp.text, "html.parser")
-
-            # 展覽名稱
-            title = ""
-            ex_title = html.find("div", class_="article-title page")
-            if ex_title:
-                title = ex_title.get_text(strip=True)
-
-            # 展覽日期（原始字串）
-            ex_date = ""
-            dates = [d.get_text(strip=True) for d in html.find_all("div", class_="card-date")]
-            if dates:
-                ex_date = " - ".join(dates[:2])
-
-            # 解析日期
-            start_date, end_date, is_permanent = parse_huashan_date(ex_date)
-
-            # 展覽時間
-            ex_time = ""
-            node = html.find("div", class_="card-time")
-            if node:
-                raw = node.get_text(" ", strip=True)
-                if re.match(r"^\d", raw):
-                    ex_time = raw
-
-            # 展覽圖片
-            ex_img = ""
-            first_img = html.select_one("span[rel] img")
-            if first_img and first_img.get("src"):
-                ex_img = requote_uri(urljoin(base_url, first_img["src"]))
-
-            # 展覽地點
-            ex_place = ""
-            place = html.find("a", class_="openMap")
-            if place:
-                ex_place = place.get_text(strip=True)
-
-            results.append({
-                "museum": museum_name,
-                "title": title,
-                "date": ex_date,           # 原始日期字串
-                "start_date": start_date,  # 解析後開始日期
-                "end_date": end_date,      # 解析後結束日期
-                "is_permanent": is_permanent,  # 0: 一般展期, 1: 長期/常設
-                "topic": "",
-                "url": ex_link,
-                "image_url": ex_img,
-                "location": ex_place,
-                "time": ex_time,
-                "category": "",
-                "extra": "",
-            })
-    finally:
-        driver.quit()
+        except DeadlineExceeded:
+            print("⏰ 時間預算用完，華山只回傳已抓到的部分")
+            break
+        except req.RequestException as e:
+            print(f"⚠️ 華山展覽頁抓取失敗，略過：{ex_link}（{e!r}）")
+            checkpoint.note_skipped(ex_link)
+            continue
+        pages.append((ex_link, resp.content, resp.encoding))
+
+    for ex_link, record in parse_stage.parse_pages("huashan_detail", pages):
+        checkpoint.save_detail(ex_link, record)
+        records[ex_link] = record
 
-    return results
+    return [records[link] for link in ex_links if link in records]
 
 
-print(fetch_huashan_exhibitions())
+if __name__ == "__main__":
+    print(fetch_huashan_exhibitions())
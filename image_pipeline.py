@@ -0,0 +1,236 @@
+"""
+展覽圖片下載 + 縮圖。前端不再直接連各館網站的原圖，改用這裡產生的縮圖。
+
+images/
+  index.json                    展覽圖片網址 -> 內容雜湊、ETag / Last-Modified、縮圖路徑
+  originals/ab/abcdef....jpg    原圖，用內容的 sha256 命名，同一張圖不管幾個網址都只存一份
+  thumbs/<寬度>/ab/abcdef....webp
+
+- 下載用執行緒池；同一個網站同時最多 PER_HOST_LIMIT 個連線（另外還有 http_client 的限速）
+- 已下載過的網址帶 If-None-Match / If-Modified-Since，304 就沿用原本的檔案
+- 縮圖用 process pool 平行產生；原圖雜湊沒變、縮圖已存在就不重做
+- 縮圖需要 Pillow；沒裝的話只下載原圖
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests as req
+
+from http_client import session
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 是選用的
+    Image = None
+
+IMAGE_DIR = "images"
+INDEX_NAME = "index.json"
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 3
+THUMB_WIDTHS = (320, 800)
+THUMB_QUALITY = 80
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+}
+
+_host_locks = {}
+_host_locks_lock = threading.Lock()
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _host_locks_lock:
+        if host not in _host_locks:
+            _host_locks[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_locks[host]
+
+
+def _sharded(base: str, digest: str, ext: str) -> str:
+    """內容雜湊 -> base/ab/abcdef....ext（前兩碼分資料夾，避免單一資料夾檔案太多）"""
+    return os.path.join(base, digest[:2], digest + ext)
+
+
+# --------------------
+# index.json
+# --------------------
+def load_index(image_dir=IMAGE_DIR) -> dict:
+    path = os.path.join(image_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index: dict, image_dir=IMAGE_DIR):
+    os.makedirs(image_dir, exist_ok=True)
+    path = os.path.join(image_dir, INDEX_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+# --------------------
+# 下載原圖
+# --------------------
+def download(url: str, entry: dict, image_dir=IMAGE_DIR) -> dict:
+    """
+    下載一張圖，回傳更新後的 index 項目。
+    entry 是這個網址上一次的記錄（沒有就是 {}）。
+    """
+    headers = {}
+    original = entry.get("original")
+    if original and os.path.exists(os.path.join(image_dir, original)):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with _host_semaphore(url):
+        res = session.get(url, headers=headers, timeout=30)
+    if res.status_code == 304:
+        return dict(entry, status="not_modified")
+    res.raise_for_status()
+
+    content_type = res.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if not content_type.startswith("image/"):
+        raise ValueError(f"不是圖片：{content_type or '未知類型'}")
+    data = res.content
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ValueError(f"圖片太大：{len(data)} bytes")
+
+    digest = hashlib.sha256(data).hexdigest()
+    rel = _sharded("originals", digest, EXTENSIONS.get(content_type, ".img"))
+    path = os.path.join(image_dir, rel)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + f".{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    return {
+        "sha256": digest,
+        "original": rel,
+        "content_type": content_type,
+        "bytes": len(data),
+        "etag": res.headers.get("ETag", ""),
+        "last_modified": res.headers.get("Last-Modified", ""),
+        "thumbs": entry.get("thumbs", {}) if entry.get("sha256") == digest else {},
+        "status": "downloaded" if entry.get("sha256") != digest else "unchanged",
+    }
+
+
+# --------------------
+# 縮圖（在子行程執行）
+# --------------------
+def make_thumbnail(src: str, dst: str, width: int) -> str:
+    with Image.open(src) as im:
+        im.draft("RGB", (width, width))  # JPEG 直接用較小的解碼尺寸，快很多
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+        if im.width > width:
+            height = max(1, round(im.height * width / im.width))
+            im = im.resize((width, height), Image.LANCZOS)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = dst + f".{os.getpid()}.tmp"
+        im.save(tmp, "WEBP", quality=THUMB_QUALITY, method=4)
+    os.replace(tmp, dst)
+    return dst
+
+
+def _thumbnail_jobs(index: dict, image_dir: str):
+    """還沒有縮圖的 (sha256, 寬度, 原圖, 縮圖)；同一個雜湊只做一次"""
+    jobs = {}
+    for entry in index.values():
+        digest = entry.get("sha256")
+        if not digest or entry.get("content_type") == "image/svg+xml":
+            continue
+        for width in THUMB_WIDTHS:
+            rel = _sharded(os.path.join("thumbs", str(width)), digest, ".webp")
+            entry.setdefault("thumbs", {})[str(width)] = rel
+            if (digest, width) in jobs or os.path.exists(os.path.join(image_dir, rel)):
+                continue
+            jobs[(digest, width)] = (
+                os.path.join(image_dir, entry["original"]),
+                os.path.join(image_dir, rel),
+            )
+    return jobs
+
+
+def build_thumbnails(index: dict, image_dir=IMAGE_DIR, workers=None) -> int:
+    if Image is None:
+        print("⚠️ 沒有安裝 Pillow，略過縮圖")
+        return 0
+    jobs = _thumbnail_jobs(index, image_dir)
+    if not jobs:
+        return 0
+    made = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(make_thumbnail, src, dst, width): digest
+            for (digest, width), (src, dst) in jobs.items()
+        }
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+                made += 1
+            except Exception as e:
+                print(f"⚠️ 縮圖失敗 {futures[fut][:12]}：{e!r}")
+    # 失敗的縮圖不要留在 index 裡
+    for entry in index.values():
+        for width, rel in list(entry.get("thumbs", {}).items()):
+            if not os.path.exists(os.path.join(image_dir, rel)):
+                del entry["thumbs"][width]
+    return made
+
+
+# --------------------
+# 整個流程
+# --------------------
+def process(urls, image_dir=IMAGE_DIR, workers=MAX_WORKERS) -> dict:
+    """下載所有圖片、產生縮圖、存 index，回傳 index"""
+    index = load_index(image_dir)
+    urls = sorted({u for u in urls if u and u.startswith(("http://", "https://"))})
+    counts = {"downloaded": 0, "unchanged": 0, "not_modified": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download, u, index.get(u, {}), image_dir): u for u in urls}
+        for fut in as_completed(futures):
+            url = futures[fut]
+            try:
+                index[url] = fut.result()
+                counts[index[url]["status"]] += 1
+            except (req.RequestException, ValueError, OSError) as e:
+                counts["failed"] += 1
+                print(f"⚠️ 圖片下載失敗 {url}：{e!r}")
+                if url in index:
+                    index[url]["status"] = "failed"
+
+    made = build_thumbnails(index, image_dir)
+    save_index(index, image_dir)
+    print(
+        f"🖼️ 圖片：下載 {counts['downloaded']}、未變 {counts['unchanged'] + counts['not_modified']}、"
+        f"失敗 {counts['failed']}，新縮圖 {made} 張"
+    )
+    return index
+
+
+if __name__ == "__main__":
+    import csv
+
+    with open("all_museums_exhibitions.csv", newline="", encoding="utf-8-sig") as f:
+        process(row["展覽圖片"] for row in csv.DictReader(f))
@@ -1,14 +1,10 @@
-import requests as req
 from bs4 import BeautifulSoup as bs
 from urllib.parse import urljoin
 from requests.utils import requote_uri
-import urllib3
 import re
 from datetime import datetime
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+from http_client import session
 
 
 def parse_moca_date(raw: str):
@@ -76,14 +72,14 @@ def parse_moca_date(raw: str):
     return start_date, end_date, is_permanent
 
 
-def fetch_moca_exhibitions():
-    base_url = "https://www.moca.taipei/tw"
-    exhs_url = "https://www.moca.taipei/tw/ExhibitionAndEvent"
-    museum_name = "台北當代藝術館"
+BASE_URL = "https://www.moca.taipei/tw"
+EXHIBITIONS_URL = "https://www.moca.taipei/tw/ExhibitionAndEvent"
+MUSEUM_NAME = "台北當代藝術館"
 
-    resp = session.get(exhs_url, timeout=20)
-    resp.raise_for_status()
-    html = bs(resp.text, "html.parser")
+
+def parse_moca_listing(text: str):
+    """列表頁 HTML -> 展覽資料（純解析，不連網）"""
+    html = bs(text, "html.parser")
     exhs = html.find_all("div", class_="list show")
 
     results = []
@@ -117,7 +113,7 @@ def fetch_moca_exhibitions():
         if img:
             img_src = img.get("data-src")
             if img_src:
-                ex_img = urljoin(base_url, img_src)
+                ex_img = urljoin(BASE_URL, img_src)
 
         # 展覽地點
         ex_place = ""
@@ -126,7 +122,7 @@ def fetch_moca_exhibitions():
             ex_place = place.get_text(strip=True)
 
         results.append({
-            "museum": museum_name,
+            "museum": MUSEUM_NAME,
             "title": title,
             "date": ex_date,            # 原始日期
             "start_date": start_date,   # YYYY-MM-DD
@@ -142,3 +138,9 @@ def fetch_moca_exhibitions():
         })
 
     return results
+
+
+def fetch_moca_exhibitions():
+    resp = session.get(EXHIBITIONS_URL, timeout=20)
+    resp.raise_for_status()
+    return parse_moca_listing(resp.text)
@@ -1,10 +1,19 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 import json
 import pandas as pd
 
-API_KEY = "YOUR API KEY"  # 請替換成你的 Google Places API Key
+# 請替換成你的 Google Places API Key（或設定環境變數 GOOGLE_PLACES_API_KEY）
+API_KEY = os.environ.get("GOOGLE_PLACES_API_KEY", "YOUR API KEY")
 
-BASE_URL = "https://places.googleapis.com/v1/places:searchText"
+# 可改成本機的假 Places 伺服器來測試（例如 http://127.0.0.1:8080/v1/places:searchText）
+BASE_URL = os.environ.get("PLACES_BASE_URL", "https://places.googleapis.com/v1/places:searchText")
 
 # 要回傳的欄位（注意：要保留 places.types 才能判斷是不是博物館）
 FIELD_MASK = ",".join([
@@ -55,41 +64,145 @@ KEEP_PARK_IDS = {
 # 視為博物館 / 美術館的 types
 MUSEUM_TYPES = {"museum", "art_gallery"}
 
+# 原始回應快取（每一頁都是一次付費呼叫）
+CACHE_DIR = "places_cache"
+CACHE_TTL_HOURS = 24 * 7
+LANGUAGE_CODE = "zh-TW"
+
+# 同時跑幾個關鍵字；同一個關鍵字的翻頁一定照順序
+MAX_WORKERS = 4
+
+_stats_lock = threading.Lock()
+call_stats = {"api_calls": 0, "cache_hits": 0}
+
 
 # ==========================
 #  API 呼叫與工具函式
 # ==========================
 
-def search_text_all_pages(text_query: str):
-    """用 Places API (New) 搜尋關鍵字，支援翻頁"""
-    all_places = []
+def _count(name: str):
+    with _stats_lock:
+        call_stats[name] += 1
+
+
+def _cache_path(body: dict, scope: str = "page") -> str:
+    """
+    快取 key = API 網址 + 查詢內容（含語言、範圍）+ field mask + scope
+    scope：page = 單一頁的回應；all = 整串翻頁的結果
+    """
+    key = json.dumps(
+        {"url": BASE_URL, "body": body, "fieldMask": FIELD_MASK, "scope": scope},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def _read_cache(path: str):
+    """CACHE_TTL_HOURS 內的快取；沒有或過期回傳 None"""
+    if not os.path.exists(path) or time.time() - os.path.getmtime(path) >= CACHE_TTL_HOURS * 3600:
+        return None
+    _count("cache_hits")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_cache(path: str, data: dict):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def post_search(body: dict, use_cache=True) -> dict:
+    """
+    呼叫一次 searchText；use_cache 時先看磁碟快取（CACHE_TTL_HOURS 內有效），
+    只有成功的回應才會寫進快取。
+    帶 pageToken 的請求不快取；快取裡的 nextPageToken 只能當「還有下一頁」的提示，
+    不能拿來翻頁（要整串翻頁請用 search_all_pages）
+    """
+    cacheable = use_cache and "pageToken" not in body
+    path = _cache_path(body)
+    if cacheable:
+        cached = _read_cache(path)
+        if cached is not None:
+            return cached
+
+    resp = requests.post(BASE_URL, headers=HEADERS, json=body, timeout=20)
+    _count("api_calls")
+    print(f"[searchText] {body.get('textQuery')} -> {resp.status_code}")
+    data = resp.json()
+
+    if cacheable and "error" not in data:
+        _write_cache(path, data)
+    return data
+
+
+def search_all_pages(body: dict, use_cache=True) -> dict:
+    """
+    從第一頁照順序跟 nextPageToken 翻到最後一頁，回傳 {"places": [...], "calls": API 呼叫次數}。
+    token 只在同一串查詢裡有效，所以整串結果當成一筆快取；
+    中途有任何一頁出錯就不寫快取（回傳已經拿到的部分）
+    """
+    path = _cache_path(body, scope="all")
+    if use_cache:
+        cached = _read_cache(path)
+        if cached is not None:
+            return {"places": cached["places"], "calls": 0}
+
+    places, calls = [], 0
     page_token = None
-
     while True:
-        body = {
-            "textQuery": text_query,
-            "languageCode": "zh-TW",  # 繁體中文
-            "pageSize": 20,
-        }
-        if page_token:
-            body["pageToken"] = page_token
-
-        resp = requests.post(BASE_URL, headers=HEADERS, json=body)
-        print(f"[searchText] {text_query} -> {resp.status_code}")
-        data = resp.json()
-
+        data = post_search(dict(body, pageToken=page_token) if page_token else body, use_cache=False)
+        calls += 1
         if "error" in data:
             print("❌ API 錯誤：", data["error"].get("message"))
-            break
-
-        places = data.get("places", [])
-        all_places.extend(places)
+            return {"places": places, "calls": calls}
 
+        places.extend(data.get("places", []))
         page_token = data.get("nextPageToken")
         if not page_token:
             break
 
-    return all_places
+    if use_cache:
+        _write_cache(path, {"places": places})
+    return {"places": places, "calls": calls}
+
+
+def search_text_all_pages(text_query: str, use_cache=True, extra_body=None):
+    """用 Places API (New) 搜尋關鍵字，支援翻頁（nextPageToken 一定照順序跟）"""
+    body = {
+        "textQuery": text_query,
+        "languageCode": LANGUAGE_CODE,  # 繁體中文
+        "pageSize": 20,
+    }
+    if extra_body:
+        body.update(extra_body)
+    return search_all_pages(body, use_cache=use_cache)["places"]
+
+
+def harvest(queries, workers=MAX_WORKERS, use_cache=True):
+    """
+    多個關鍵字同時查詢，回傳照 queries 順序排好的 [(query, places), ...]。
+    每個關鍵字各自的翻頁仍然是依序進行。
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda q: search_text_all_pages(q, use_cache=use_cache), queries)
+        return list(zip(queries, results))
+
+
+def dedupe_places(place_lists) -> dict:
+    """
+    依 place id 去重（保留第一次出現的順序）；
+    同一個地點在不同查詢裡欄位內容一樣，只留一份
+    """
+    all_places_by_id = {}
+    for places in place_lists:
+        for p in places:
+            pid = p.get("id")
+            if pid and pid not in all_places_by_id:
+                all_places_by_id[pid] = p
+    return all_places_by_id
 
 
 def is_museum_like(place: dict) -> bool:
@@ -130,25 +243,39 @@ def extract_row(place: dict) -> dict:
 #  主流程
 # ==========================
 
-def main():
-    all_places_by_id = {}
-
-    # 1) 抓雙北博物館、美術館
-    for kw in KEYWORDS:
-        places = search_text_all_pages(kw)
-        for p in places:
-            pid = p.get("id")
-            if pid:
-                all_places_by_id[pid] = p
-
-    # 2) 抓華山 & 松菸（避免 types 不符時被漏掉）
-    for q in EXTRA_QUERIES:
-        places = search_text_all_pages(q)
-        for p in places:
-            pid = p.get("id")
-            if pid:
-                all_places_by_id[pid] = p
-
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="用 Google Places API 抓雙北博物館 / 美術館資訊")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="同時查詢幾個關鍵字")
+    parser.add_argument("--no-cache", action="store_true", help="不讀也不寫回應快取")
+    parser.add_argument("--ttl", type=float, default=CACHE_TTL_HOURS, metavar="HOURS", help="快取有效時間")
+    parser.add_argument("--base-url", help="改用其他 searchText 端點（例如本機假伺服器）")
+    parser.add_argument("--tiles", action="store_true", help="用地理切塊取代關鍵字查詢（見 places_tiling.py）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global CACHE_TTL_HOURS, BASE_URL
+    args = parse_args(argv)
+    CACHE_TTL_HOURS = args.ttl
+    if args.base_url:
+        BASE_URL = args.base_url
+
+    use_cache = not args.no_cache
+    if args.tiles:
+        import places_tiling
+
+        # 1) 雙北切塊搜尋博物館、美術館
+        tiled = places_tiling.harvest_tiles(workers=args.workers, use_cache=use_cache)
+        # 2) 抓華山 & 松菸（避免 types 不符時被漏掉）
+        harvested = harvest(EXTRA_QUERIES, workers=args.workers, use_cache=use_cache)
+        all_places_by_id = dedupe_places([list(tiled.values())] + [places for _, places in harvested])
+    else:
+        # 1) 抓雙北博物館、美術館
+        # 2) 抓華山 & 松菸（避免 types 不符時被漏掉）
+        harvested = harvest(KEYWORDS + EXTRA_QUERIES, workers=args.workers, use_cache=use_cache)
+        all_places_by_id = dedupe_places(places for _, places in harvested)
+
+    print(f"📞 API 呼叫 {call_stats['api_calls']} 次，快取命中 {call_stats['cache_hits']} 次")
     print("🔢 抓到（去重後） place 數量：", len(all_places_by_id))
 
     # 3) 保留博物館、美術館 + 華山、松菸主園區
@@ -1,11 +1,7 @@
-import requests as req
 from bs4 import BeautifulSoup as bs
 from urllib.parse import urljoin
-import urllib3
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+import pagination
 
 
 def parse_npm_date(raw: str):
@@ -60,14 +56,14 @@ def parse_npm_date(raw: str):
     return None, None, 0
 
 
-def fetch_npm_exhibitions():
-    base_url = "https://www.npm.gov.tw"
-    exhs_url = "https://www.npm.gov.tw/Exhibition-Current.aspx?sno=03000060&l=1"
-    museum_name = "國立故宮博物院"
+BASE_URL = "https://www.npm.gov.tw"
+EXHIBITIONS_URL = "https://www.npm.gov.tw/Exhibition-Current.aspx?sno=03000060&l=1"
+MUSEUM_NAME = "國立故宮博物院"
+
 
-    resp = session.get(exhs_url, timeout=20)
-    resp.raise_for_status()
-    html = bs(resp.text, "html.parser")
+def parse_npm_listing(text: str):
+    """列表頁 HTML -> 展覽資料（純解析，不連網）"""
+    html = bs(text, "html.parser")
     exhs = html.find_all("li", class_="mb-8")
 
     results = []
@@ -110,7 +106,7 @@ def fetch_npm_exhibitions():
         ex_link = ""
         a = exh.find("a")
         if a and a.has_attr("href"):
-            ex_link = urljoin(base_url, a["href"])
+            ex_link = urljoin(BASE_URL, a["href"])
 
         # 展覽圖片
         ex_img = ""
@@ -118,10 +114,10 @@ def fetch_npm_exhibitions():
         if img_tag:
             src = img_tag.get("data-src") or img_tag.get("src")
             if src and "loader.gif" not in src:
-                ex_img = urljoin(base_url, src).split("&")[0]
+                ex_img = urljoin(BASE_URL, src).split("&")[0]
 
         results.append({
-            "museum": museum_name,
+            "museum": MUSEUM_NAME,
             "title": title,
             "date": ex_date,            # 原始日期字串
             "start_date": start_date,   # 解析後開始日期
@@ -137,3 +133,8 @@ def fetch_npm_exhibitions():
         })
 
     return results
+
+
+def fetch_npm_exhibitions():
+    # 所有分頁同時抓；同一個展覽出現在兩頁時只留一筆
+    return pagination.fetch_all(EXHIBITIONS_URL, parse_npm_listing, key=lambda r: r["url"] or r["title"])
@@ -1,14 +1,13 @@
 import re
 import requests as req
 from bs4 import BeautifulSoup as bs
-import urllib3
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+from http_client import session, get_document, venue_metadata, DeadlineExceeded
+import checkpoint
 
 
 BASE_URL = "https://www.artmuse.ntnu.edu.tw/index.php/current_exhibit/"
+MUSEUM_NAME = "國立臺灣師範大學-師大美術館"
 
 
 def parse_ntnu_date(raw: str):
@@ -75,9 +74,8 @@ def parse_ntnu_date(raw: str):
 
 
 def museum_info(base_url: str):
-    r = session.get(base_url, timeout=15)
-    r.raise_for_status()
-    html = bs(r.text, "html.parser")
+    # 跟 get_exhibitions 是同一頁：get_document 讓這次執行只下載、解析一次
+    html = get_document(base_url, timeout=15)
 
     # 館名
     NTNU = html.find("h4", class_="widget-title")
@@ -109,10 +107,13 @@ def museum_info(base_url: str):
     return ntnu_text, address_text, open_time_text, off_time_text
 
 
-def get_exhibitions(base_url: str):
-    r = session.get(base_url, timeout=15)
-    r.raise_for_status()
-    html = bs(r.text, "html.parser")
+def parse_ntnu_listing(text: str):
+    """列表頁 HTML -> [{title, url, image_url}, ...]（純解析，不連網）"""
+    return listing_from_document(bs(text, "html.parser"))
+
+
+def listing_from_document(html):
+    """已解析好的列表頁 -> [{title, url, image_url}, ...]"""
     figures = html.find_all("figure", class_="wp-caption")
 
     exhibitions = []
@@ -129,10 +130,13 @@ def get_exhibitions(base_url: str):
     return exhibitions
 
 
-def get_time_and_place(exh_url: str):
-    r = session.get(exh_url, timeout=20)
-    r.raise_for_status()
-    soup = bs(r.text, "html.parser")
+def get_exhibitions(base_url: str):
+    return listing_from_document(get_document(base_url, timeout=15))
+
+
+def parse_ntnu_detail(text: str):
+    """內頁 HTML -> (展覽時間, 展覽地點)（純解析，不連網）"""
+    soup = bs(text, "html.parser")
     entry = soup.find("div", class_="entry clr")
     if not entry:
         return None, None
@@ -152,35 +156,86 @@ def get_time_and_place(exh_url: str):
     return time_text, place_text
 
 
+def get_time_and_place(exh_url: str):
+    r = session.get(exh_url, timeout=20)
+    r.raise_for_status()
+    return parse_ntnu_detail(r.text)
+
+
+def build_ntnu_record(ex: dict, time_text, place_text, default_place=""):
+    """
+    列表頁的一筆（title / url / image_url）+ 內頁的時間、地點 -> 展覽資料。
+    default_place：內頁沒寫地點時用的展覽地點（館的地址）
+    """
+    # ⭐ 解析日期為 start_date / end_date / is_permanent
+    start_date, end_date, is_permanent = parse_ntnu_date(time_text or "")
+
+    return {
+        "museum": MUSEUM_NAME,
+        "title": ex.get("title", ""),
+        "date": time_text or "",          # 原始日期字串（例如 2025/09/23 Tue.－）
+        "start_date": start_date,         # YYYY-MM-DD 或 None
+        "end_date": end_date,             # YYYY-MM-DD 或 None
+        "is_permanent": is_permanent,     # 1 = 長期/常設, 0 = 一般展期
+        "topic": "",
+        "url": ex.get("url", ""),
+        "image_url": ex.get("image_url", ""),
+        "location": place_text or default_place,
+        "time": time_text or "",
+        "category": "",
+        "extra": "",
+    }
+
+
+def fetch_ntnu_detail(ex: dict):
+    """列表頁的一筆 -> 抓內頁補上時間、地點（連線錯誤直接往外丟）"""
+    time_text, place_text = get_time_and_place(ex["url"]) if ex.get("url") else (None, None)
+    return build_ntnu_record(ex, time_text, place_text)
+
+
 def fetch_ntnu_exhibitions():
-    museum_name, address_text, open_time, off_time = museum_info(BASE_URL)
+    default_place = ""
+    try:
+        # 館名、地址、開放時間很少變，一週內直接用快取；地址給內頁沒寫地點的展覽用
+        museum_name, address_text, _, _ = venue_metadata("ntnu", lambda: museum_info(BASE_URL))
+        default_place = address_text or museum_name or ""
+    except req.RequestException as e:
+        print(f"⚠️ 師大館別資訊抓取失敗，略過：{e!r}")
+
+    # 循環 import：parse_stage 註冊解析器時需要這個模組
+    import parse_stage
 
     exhibitions = get_exhibitions(BASE_URL)
-    results = []
+    details, pages = {}, []
 
+    # 先下載所有內頁，解析統一交給 parse_stage 的 process pool
+    deadline_hit = False
     for ex in exhibitions:
-        time_text, place_text = None, None
-        if ex.get("url"):
-            time_text, place_text = get_time_and_place(ex["url"])
-
-        # ⭐ 解析日期為 start_date / end_date / is_permanent
-        start_date, end_date, is_permanent = parse_ntnu_date(time_text or "")
-
-        results.append({
-            "museum": "國立臺灣師範大學-師大美術館",
-            "title": ex.get("title", ""),
-            "date": time_text or "",          # 原始日期字串（例如 2025/09/23 Tue.－）
-            "start_date": start_date,         # YYYY-MM-DD 或 None
-            "end_date": end_date,             # YYYY-MM-DD 或 None
-            "is_permanent": is_permanent,     # 1 = 長期/常設, 0 = 一般展期
-            "topic": "",
-            "url": ex.get("url", ""),
-            "image_url": ex.get("image_url", ""),
-            "location": place_text or "",
-            "time": time_text or "",
-            "category": "",
-            "extra": "",
-        })
-
-    return results
-print(fetch_ntnu_exhibitions())
\ No newline at end of file
+        url = ex.get("url")
+        cached = checkpoint.load_detail(url) if url else None
+        if cached is not None:
+            # 上次中斷前已經抓過的內頁（--resume）
+            details[url] = (cached["time"], cached["place"])
+        elif url and url not in details and not deadline_hit:
+            try:
+                r = session.get(url, timeout=20)
+                r.raise_for_status()
+                pages.append((url, r.content, r.encoding))
+            except DeadlineExceeded:
+                # 列表頁已經有標題 / 圖片，剩下的展覽不再抓內頁
+                print("⏰ 時間預算用完，師大其餘展覽不抓內頁")
+                deadline_hit = True
+            except req.RequestException as e:
+                print(f"⚠️ 師大展覽頁抓取失敗，只保留列表資訊：{url}（{e!r}）")
+                checkpoint.note_skipped(url)
+
+    for url, (time_text, place_text) in parse_stage.parse_pages("ntnu_detail", pages):
+        checkpoint.save_detail(url, {"time": time_text, "place": place_text})
+        details[url] = (time_text, place_text)
+
+    return [build_ntnu_record(ex, *details.get(ex.get("url"), (None, None)), default_place)
+            for ex in exhibitions]
+
+
+if __name__ == "__main__":
+    print(fetch_ntnu_exhibitions())
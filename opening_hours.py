@@ -0,0 +1,207 @@
+"""
+把營業時間字串編譯成每週分鐘 bitmap，快速查「現在有沒有開」。
+
+來源：
+- museums_info.extract_row 的 營業時間：
+  星期一: 休息|星期二: 09:30 – 17:00|...|星期日: 24 小時營業
+- ntnu.museum_info 的 open / off 時間文字，例如：
+  週二至週日 10:00-17:00、每週一及國定假日休館
+
+一週 = 7 * 1440 = 10080 分鐘，第 0 分鐘是星期一 00:00。
+每個館是一列 bool，所有館疊成 (館數, 10080) 的矩陣，
+查詢時整欄 / 整段一次算，不必逐館解析字串。
+存檔時用 np.packbits 壓成每館 1260 bytes。
+"""
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_DAY = 1440
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# 星期幾 -> 0（星期一）~ 6（星期日）
+WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+
+_DAY_LINE = re.compile(r"^\s*(?:星期|週|周)([一二三四五六日天])\s*[:：]\s*(.*)$")
+_TIME_RANGE = re.compile(
+    r"(上午|下午|中午|晚上)?\s*(\d{1,2})(?:[:：](\d{2}))?\s*(AM|PM|am|pm)?\s*"
+    r"[–—\-~～至到]\s*"
+    r"(上午|下午|中午|晚上)?\s*(\d{1,2})(?:[:：](\d{2}))?\s*(AM|PM|am|pm)?"
+)
+_DAY_SPAN = re.compile(r"(?:星期|週|周)([一二三四五六日天])\s*(?:至|到|[–—\-~～])\s*(?:星期|週|周)?([一二三四五六日天])")
+_SINGLE_DAY = re.compile(r"(?:星期|週|周)([一二三四五六日天])")
+
+
+def _to_minutes(period, hour, minute, ampm) -> int:
+    h = int(hour)
+    m = int(minute or 0)
+    if ampm:
+        ampm = ampm.lower()
+        if ampm == "pm" and h < 12:
+            h += 12
+        elif ampm == "am" and h == 12:
+            h = 0
+    elif period in ("下午", "晚上") and h < 12:
+        h += 12
+    return h * 60 + m
+
+
+def parse_time_ranges(text: str):
+    """
+    '09:30 – 17:00'、'上午9:30 – 下午5:00'、'10:00 – 12:00, 13:00 – 17:00'
+    -> [(開始分鐘, 結束分鐘), ...]（當天 0 點起算，跨夜時結束 > 1440）
+    """
+    ranges = []
+    for m in _TIME_RANGE.finditer(text):
+        start = _to_minutes(m.group(1), m.group(2), m.group(3), m.group(4))
+        end = _to_minutes(m.group(5), m.group(6), m.group(7), m.group(8))
+        if end <= start:
+            end += MINUTES_PER_DAY  # 跨夜
+        ranges.append((start, end))
+    return ranges
+
+
+def parse_weekday_descriptions(opening: str):
+    """
+    Google 的 營業時間（| 分隔）-> 一週內的分鐘區間 [(start, end), ...]
+    無法解析的行直接略過（視為沒開）
+    """
+    intervals = []
+    if not isinstance(opening, str) or not opening.strip():
+        return intervals
+
+    for line in opening.split("|"):
+        m = _DAY_LINE.match(line)
+        if not m:
+            continue
+        day = WEEKDAYS[m.group(1)]
+        rest = m.group(2).strip()
+        base = day * MINUTES_PER_DAY
+
+        if "休息" in rest or "休館" in rest or "Closed" in rest:
+            continue
+        if "24 小時" in rest or "24小時" in rest or "Open 24 hours" in rest:
+            intervals.append((base, base + MINUTES_PER_DAY))
+            continue
+        for start, end in parse_time_ranges(rest):
+            intervals.append((base + start, base + end))
+    return intervals
+
+
+def _days_in(text: str):
+    """文字裡提到的星期幾（支援「週二至週日」這種範圍）"""
+    days = set()
+    for a, b in _DAY_SPAN.findall(text):
+        start, end = WEEKDAYS[a], WEEKDAYS[b]
+        d = start
+        while True:
+            days.add(d)
+            if d == end:
+                break
+            d = (d + 1) % 7
+    text = _DAY_SPAN.sub("", text)
+    days.update(WEEKDAYS[d] for d in _SINGLE_DAY.findall(text))
+    return days
+
+
+def parse_ntnu_hours(open_text, off_text):
+    """
+    師大美術館 museum_info() 的開放 / 休館文字 -> 一週內的分鐘區間。
+    開放文字沒寫星期幾就當成每天；休館文字提到的星期幾整天不開。
+    """
+    open_text = open_text or ""
+    off_days = _days_in(off_text or "")
+
+    intervals = []
+    # 「週二至週六 10:00-17:00, 週日 10:00-18:00」這種多段寫法，逗號分開各自處理
+    for part in re.split(r"[，,；;]\s*(?=(?:星期|週|周))", open_text):
+        ranges = parse_time_ranges(part)
+        if not ranges:
+            continue
+        days = _days_in(part) or set(range(7))
+        for day in sorted(days - off_days):
+            base = day * MINUTES_PER_DAY
+            intervals.extend((base + s, base + e) for s, e in ranges)
+    return intervals
+
+
+def week_minute(when: datetime) -> int:
+    """datetime -> 一週中的第幾分鐘（星期一 00:00 = 0）"""
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+class OpeningHours:
+    """所有館的每週營業 bitmap，查詢一次回傳所有館的結果"""
+
+    def __init__(self, names, intervals_per_venue):
+        self.names = list(names)
+        self.bitmap = np.zeros((len(self.names), MINUTES_PER_WEEK), dtype=bool)
+        for row, intervals in enumerate(intervals_per_venue):
+            for start, end in intervals:
+                length = end - start
+                if length >= MINUTES_PER_WEEK:
+                    self.bitmap[row, :] = True
+                    continue
+                start %= MINUTES_PER_WEEK
+                end = start + length
+                if end <= MINUTES_PER_WEEK:
+                    self.bitmap[row, start:end] = True
+                else:
+                    # 星期日晚上跨到星期一
+                    self.bitmap[row, start:] = True
+                    self.bitmap[row, :end - MINUTES_PER_WEEK] = True
+        self._prefix = None
+
+    @classmethod
+    def from_places_csv(cls, path="taipei_museums_info.csv", key_col="place_id"):
+        df = pd.read_csv(path, encoding="utf-8-sig")
+        intervals = [parse_weekday_descriptions(s) for s in df["營業時間"]]
+        return cls(df[key_col].tolist(), intervals)
+
+    @classmethod
+    def from_packed(cls, names, packed: np.ndarray):
+        obj = cls(names, [])
+        obj.bitmap = np.unpackbits(packed, axis=1, count=MINUTES_PER_WEEK).astype(bool)
+        return obj
+
+    def packed(self) -> np.ndarray:
+        """壓縮成 (館數, 1260) 的 uint8，可以直接 np.save"""
+        return np.packbits(self.bitmap, axis=1)
+
+    def _prefix_sums(self) -> np.ndarray:
+        # prefix[:, i] = 第 0 ~ i-1 分鐘中有開的分鐘數（uint16 足夠：最多 10080）
+        if self._prefix is None:
+            self._prefix = np.zeros((len(self.names), MINUTES_PER_WEEK + 1), dtype=np.uint16)
+            np.cumsum(self.bitmap, axis=1, dtype=np.uint16, out=self._prefix[:, 1:])
+        return self._prefix
+
+    def open_at(self, when: datetime) -> np.ndarray:
+        """每個館在 when 這一分鐘有沒有開（bool 陣列，順序同 names）"""
+        return self.bitmap[:, week_minute(when)].copy()
+
+    def open_for(self, when: datetime, minutes: int) -> np.ndarray:
+        """每個館從 when 開始、接下來 minutes 分鐘是否都有開"""
+        minutes = max(1, min(int(minutes), MINUTES_PER_WEEK))
+        prefix = self._prefix_sums()
+        start = week_minute(when)
+        end = start + minutes
+        if end <= MINUTES_PER_WEEK:
+            opened = prefix[:, end].astype(np.int32) - prefix[:, start]
+        else:
+            opened = (prefix[:, MINUTES_PER_WEEK].astype(np.int32) - prefix[:, start]) + prefix[:, end - MINUTES_PER_WEEK]
+        return opened == minutes
+
+    def open_names(self, when: datetime, minutes: int = 1):
+        mask = self.open_for(when, minutes) if minutes > 1 else self.open_at(when)
+        return [n for n, ok in zip(self.names, mask) if ok]
+
+
+if __name__ == "__main__":
+    hours = OpeningHours.from_places_csv(key_col="館名")
+    now = datetime.now()
+    names = hours.open_names(now, minutes=60)
+    print(f"{now:%Y-%m-%d %H:%M} 起一小時都有開的館：{len(names)} 間")
+    for n in names:
+        print("  ", n)
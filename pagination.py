@@ -0,0 +1,131 @@
+"""
+列表頁的分頁：先從第一頁找出總共有幾頁，其餘的頁面同時抓，最後依頁序合併、去重。
+
+- 頁數從第一頁的分頁連結判斷：同一個網址、只差在頁碼參數（?page=3、&p=3 ...）
+  或路徑結尾是 /page/3 的連結（其他查詢參數都要一樣），取最大的頁碼，
+  中間缺的頁（「…」省略的）也補上
+- 第 2 頁以後交給執行緒池同時抓；各網站的限速（http_client 的 token bucket）照樣生效
+- 某一頁抓失敗只略過那一頁（記在 checkpoint.note_skipped，這個館會標成 partial）；
+  時間預算用完就回傳已經抓到的頁
+- 網站改版把同一個展覽放在兩頁（或輪播的兩張）時，用 key 去重，保留第一次出現的
+
+用法：
+    links = pagination.fetch_all(EXHIBITIONS_URL, parse_songshan_listing)
+    records = pagination.fetch_all(EXHIBITIONS_URL, parse_npm_listing, key=lambda r: r["url"] or r["title"])
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests as req
+from bs4 import BeautifulSoup as bs
+
+from http_client import session, DeadlineExceeded
+import checkpoint
+
+PAGE_PARAMS = ("page", "p", "pg", "pageindex", "pageno", "currentpage")
+MAX_PAGES = 30      # 頁碼解析錯了也不會一次送出幾百個請求
+WORKERS = 4
+
+_PATH_PAGE = re.compile(r"/page/(\d+)/?$", re.IGNORECASE)
+
+
+def unique(items, key=None):
+    """去重（保留第一次出現的順序）；key 算出來是空值的不去重"""
+    seen = set()
+    out = []
+    for item in items:
+        k = key(item) if key else item
+        if k:
+            if k in seen:
+                continue
+            seen.add(k)
+        out.append(item)
+    return out
+
+
+def _other_params(query: str, skip=None):
+    """頁碼以外的查詢參數（排序後比較，順序不同也算一樣）"""
+    return sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k != skip)
+
+
+def _page_of(url: str, first):
+    """
+    這個連結如果是 first 的某一頁，回傳 (頁碼, 參數名稱 或 None=路徑式)；不是就回傳 None。
+    頁碼以外的查詢參數要跟 first 一樣，同一個路徑下別的分類（例如故宮另一個 sno）的分頁不算。
+    """
+    parts = urlsplit(url)
+    if (parts.scheme, parts.netloc.lower()) != (first.scheme, first.netloc.lower()):
+        return None
+    m = _PATH_PAGE.search(parts.path)
+    if m and parts.path[:m.start()].rstrip("/") == first.path.rstrip("/"):
+        if _other_params(parts.query) != _other_params(first.query):
+            return None
+        return int(m.group(1)), None
+    if parts.path.rstrip("/") != first.path.rstrip("/"):
+        return None
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        if name.lower() in PAGE_PARAMS and value.isdigit():
+            if _other_params(parts.query, name) != _other_params(first.query, name):
+                return None
+            return int(value), name
+    return None
+
+
+def page_url(first_url: str, number: int, param) -> str:
+    """第一頁的網址 -> 第 number 頁（其他查詢參數照舊）"""
+    parts = urlsplit(first_url)
+    if param is None:
+        path = parts.path.rstrip("/") + f"/page/{number}"
+        return urlunsplit((parts.scheme, parts.netloc, path, parts.query, ""))
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != param]
+    query.append((param, str(number)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def discover_pages(first_url: str, text: str, max_pages=MAX_PAGES) -> list:
+    """從第一頁的 HTML 找出所有頁面的網址（含第一頁）；沒有分頁就只有第一頁"""
+    first = urlsplit(first_url)
+    last, param = 1, None
+    for a in bs(text, "html.parser").find_all("a", href=True):
+        found = _page_of(urljoin(first_url, a["href"]), first)
+        if found and found[0] > last:
+            last, param = found
+    if last > max_pages:
+        print(f"⚠️ {first.netloc} 分頁有 {last} 頁，只抓前 {max_pages} 頁")
+        last = max_pages
+    return [first_url] + [page_url(first_url, n, param) for n in range(2, last + 1)]
+
+
+def _get_text(url: str, timeout) -> str:
+    resp = session.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.text
+
+
+def fetch_all(first_url: str, parse, key=None, workers=WORKERS, timeout=20, max_pages=MAX_PAGES) -> list:
+    """
+    抓列表的所有分頁：parse(HTML 文字) 回傳該頁的 list，依頁序串起來後去重。
+    第一頁抓不到時錯誤直接往外丟（跟只抓一頁時一樣）。
+    """
+    text = _get_text(first_url, timeout)
+    urls = discover_pages(first_url, text, max_pages)
+    pages = [parse(text)]
+
+    def fetch_page(url):
+        try:
+            return parse(_get_text(url, timeout))
+        except DeadlineExceeded:
+            print(f"⏰ 時間預算用完，略過分頁 {url}")
+        except req.RequestException as e:
+            print(f"⚠️ 分頁抓取失敗，略過：{url}（{e!r}）")
+            checkpoint.note_skipped(url)
+        return []
+
+    if len(urls) > 1:
+        print(f"   📑 {urlsplit(first_url).netloc} 共 {len(urls)} 頁，同時抓取")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pages.extend(pool.map(fetch_page, urls[1:]))
+
+    merged = [item for page in pages for item in page]
+    return unique(merged, key)
@@ -0,0 +1,334 @@
+"""
+把「抓網頁」跟「解析 HTML」拆成兩個階段。
+
+BeautifulSoup 解析是純 CPU 工作，會佔住 GIL，多開執行緒抓網頁也沒辦法用到多核心。
+這裡讓 I/O 執行緒只負責下載，原始 bytes 交給 process pool 裡的解析行程，
+回傳的是一般的 dict / list（可以 pickle）。
+
+- 每個館的 parse_* 都是純函式（HTML 文字 -> 資料），在 PARSERS 註冊；
+  名稱前加 spec: 改用 selector_specs 編譯的 lxml 擷取器
+- 多筆合成一批（batch）才送進子行程，減少行程間傳資料的次數
+- 爬蟲本身：松山、華山、師大的內頁先全部下載，再用 parse_pages 一次交給共用的 pool 解析
+  （app.py --parse-workers 設定行程數，0 = 在主行程解析；--profile 時一律在主行程，
+  子行程的時間 profiler 量不到）；列表頁只有一兩頁，仍在主行程解析
+- benchmark：同一批 HTML 用不同行程數解析，印出每秒幾頁
+
+用法：
+    # 用 app.py --record 錄下來的回應做 benchmark
+    python parse_stage.py --record-dir recordings --workers 1 2 4 8
+    # 沒有錄製資料時用合成的頁面
+    python parse_stage.py --synthetic 2000
+"""
+import argparse
+import base64
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import fubon
+import huashan
+import moca
+import npm_museum
+import ntnu
+import songshan
+import checkpoint
+from http_client import session
+
+BATCH_SIZE = 16
+WORKERS = 2  # 爬蟲共用 pool 的行程數（configure 可改）
+
+# 解析器名稱 -> 純解析函式（HTML 文字, 網址）
+PARSERS = {
+    "songshan_listing": lambda text, url: songshan.parse_songshan_listing(text),
+    "songshan_detail": songshan.parse_songshan_detail,
+    "npm_listing": lambda text, url: npm_museum.parse_npm_listing(text),
+    "moca_listing": lambda text, url: moca.parse_moca_listing(text),
+    "fubon_listing": lambda text, url: fubon.parse_fubon_listing(text),
+    "huashan_detail": huashan.parse_huashan_detail,
+    "ntnu_listing": lambda text, url: ntnu.parse_ntnu_listing(text),
+    "ntnu_detail": lambda text, url: ntnu.parse_ntnu_detail(text),
+}
+
+
+def _spec_parser(name: str):
+    """selector_specs 版的解析器（名稱同 PARSERS，前面加 spec:）"""
+    import selector_specs
+
+    key, kind = name.split("_", 1)
+    return lambda text, url: selector_specs.spec_parse(key, kind, text, url)
+
+
+def get_parser(name: str):
+    if name.startswith("spec:"):
+        return _spec_parser(name[len("spec:"):])
+    return PARSERS[name]
+
+
+def classify_url(url: str):
+    """網址 -> 解析器名稱；不認得的（例如圖片、API）回傳 None"""
+    parts = urlsplit(url)
+    host, path = parts.netloc.lower(), parts.path.rstrip("/")
+    if host.endswith("songshanculturalpark.org"):
+        if path == "/exhibition":
+            return "songshan_listing"
+        if path.startswith("/exhibition/"):
+            return "songshan_detail"
+    elif host.endswith("npm.gov.tw") and path.startswith("/Exhibition-Current"):
+        return "npm_listing"
+    elif host.endswith("moca.taipei") and path.endswith("/ExhibitionAndEvent"):
+        return "moca_listing"
+    elif host.endswith("fubonartmuseum.org") and path == "/Exhibitions":
+        return "fubon_listing"
+    elif host.endswith("huashan1914.com") and "/exhibition/" in path:
+        return "huashan_detail"
+    elif host.endswith("artmuse.ntnu.edu.tw"):
+        if path == "/index.php/current_exhibit":
+            return "ntnu_listing"
+        if path.startswith("/index.php/"):
+            return "ntnu_detail"
+    return None
+
+
+# --------------------
+# 子行程執行的部分
+# --------------------
+def _decode(content: bytes, encoding) -> str:
+    return content.decode(encoding or "utf-8", errors="replace")
+
+
+def parse_batch(jobs):
+    """
+    在子行程裡解析一批 (解析器名稱, bytes, encoding, 網址)。
+    回傳 [(ok, 結果 或 錯誤訊息), ...]，一頁壞掉不影響同批其他頁。
+    """
+    out = []
+    for parser, content, encoding, url in jobs:
+        try:
+            out.append((True, get_parser(parser)(_decode(content, encoding), url)))
+        except Exception as e:
+            out.append((False, f"{parser} {url}: {e!r}"))
+    return out
+
+
+# --------------------
+# 主行程
+# --------------------
+class ParsePool:
+    """
+    把解析工作分批送進 process pool。
+        with ParsePool(workers=4) as pool:
+            results = pool.map(jobs)
+    workers=0 表示不開子行程，直接在主行程解析（比較用）。
+    """
+
+    def __init__(self, workers=None, batch_size=BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _batches(self, jobs):
+        batch = []
+        for job in jobs:
+            batch.append(job)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def submit(self, batch):
+        """送出一批，回傳 Future（結果是 parse_batch 的回傳值）"""
+        return self._pool.submit(parse_batch, batch)
+
+    def map(self, jobs):
+        """解析所有 jobs，依原本順序回傳 [(ok, 結果), ...]"""
+        if self._pool is None:
+            return parse_batch(list(jobs))
+        results = []
+        for batch_result in self._pool.map(parse_batch, self._batches(jobs)):
+            results.extend(batch_result)
+        return results
+
+
+def fetch_and_parse(urls, parser: str, pool: ParsePool, fetch_workers=4, timeout=20):
+    """
+    兩階段：執行緒池下載（I/O），下載好的 bytes 湊滿一批就送去 process pool 解析。
+    回傳 {網址: 解析結果}；下載或解析失敗的網址不在結果裡。
+    """
+    def fetch(url):
+        resp = session.get(url, timeout=timeout)
+        resp.raise_for_status()
+        return parser, resp.content, resp.encoding, url
+
+    pending, batch, results = [], [], {}
+    with ThreadPoolExecutor(max_workers=fetch_workers) as io_pool:
+        for fut in [io_pool.submit(fetch, u) for u in urls]:
+            try:
+                batch.append(fut.result())
+            except Exception as e:
+                print(f"⚠️ 下載失敗：{e!r}")
+                continue
+            if len(batch) >= pool.batch_size:
+                pending.append((batch, pool.submit(batch)))
+                batch = []
+        if batch:
+            pending.append((batch, pool.submit(batch)))
+
+    for jobs, fut in pending:
+        for job, (ok, value) in zip(jobs, fut.result()):
+            if ok:
+                results[job[3]] = value
+            else:
+                print(f"⚠️ 解析失敗：{value}")
+    return results
+
+
+# --------------------
+# 爬蟲共用的 pool
+# --------------------
+_shared = None
+_shared_pid = None
+
+
+def configure(workers):
+    """設定爬蟲共用 pool 的行程數；0 = 不開子行程"""
+    global WORKERS
+    shutdown()
+    WORKERS = workers
+
+
+def shared_pool() -> ParsePool:
+    """第一次用到才開；crawl_queue fork 出來的 worker 各自開自己的"""
+    global _shared, _shared_pid
+    if _shared is None or _shared_pid != os.getpid():
+        _shared = ParsePool(workers=WORKERS)
+        _shared_pid = os.getpid()
+    return _shared
+
+
+def shutdown():
+    global _shared, _shared_pid
+    if _shared is not None and _shared_pid == os.getpid():
+        _shared.close()
+    _shared = _shared_pid = None
+
+
+def parse_pages(parser: str, pages):
+    """
+    pages：[(網址, bytes, encoding), ...]，都用 parser 解析。
+    回傳 [(網址, 結果), ...]（順序同 pages）；解析失敗的頁記在 checkpoint.note_skipped。
+    """
+    jobs = [(parser, content, encoding, url) for url, content, encoding in pages]
+    if not jobs:
+        return []
+    out = []
+    for job, (ok, value) in zip(jobs, shared_pool().map(jobs)):
+        if ok:
+            out.append((job[3], value))
+        else:
+            print(f"⚠️ 解析失敗，略過：{value}")
+            checkpoint.note_skipped(job[3])
+    return out
+
+
+# --------------------
+# Benchmark
+# --------------------
+def load_recorded_jobs(record_dir: str):
+    """讀 http_client 錄下來的回應，挑出認得的 HTML 頁面"""
+    jobs = []
+    for name in sorted(os.listdir(record_dir)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(record_dir, name), encoding="utf-8") as f:
+            data = json.load(f)
+        parser = classify_url(data.get("final_url") or data["url"])
+        if parser and data.get("status") == 200:
+            jobs.append((parser, base64.b64decode(data["body"]), data.get("encoding"), data["url"]))
+    return jobs
+
+
+def synthetic_jobs(n: int):
+    """合成的松山內頁 + 故宮列表頁（大小接近真實頁面）"""
+    filler = "<div class='nav'>" + "".join(f"<a href='/p{i}'>選單 {i}</a>" for i in range(300)) + "</div>"
+    jobs = []
+    for i in range(n):
+        if i % 4:
+            html = (
+                f"<html><body>{filler}<p class='inner_title'>合成展覽 {i}</p>"
+                f"<p class='date montsrt'>2025-11-01 - 2025-12-{i % 28 + 1:02d}</p>"
+                f"<p class='place'>展場 {i % 5}</p><img class='big_img' src='/img/{i}.jpg'>"
+                f"{filler}</body></html>"
+            )
+            jobs.append(("songshan_detail", html.encode("utf-8"), "utf-8",
+                         f"https://www.songshanculturalpark.org/exhibition/{i}"))
+        else:
+            items = "".join(
+                f"<li class='mb-8'><a href='/x{j}'><img data-src='/i{j}.jpg&w=1'></a>"
+                f"<h3 class='font-medium'>故宮展 {j}</h3><div class='exhibition-list-date'>2025-10-10~2026-01-07</div>"
+                f"<div class='mt-2'>書畫</div><div class='card-content-bottom'>北部院區</div></li>"
+                for j in range(12)
+            )
+            html = f"<html><body>{filler}<ul>{items}</ul></body></html>"
+            jobs.append(("npm_listing", html.encode("utf-8"), "utf-8", npm_museum.EXHIBITIONS_URL))
+    return jobs
+
+
+def benchmark(jobs, worker_counts=(0, 1, 2, 4), batch_size=BATCH_SIZE):
+    """同一批頁面用不同行程數解析，回傳 [{workers, seconds, pages_per_second}, ...]"""
+    mb = sum(len(j[1]) for j in jobs) / 1e6
+    print(f"📄 {len(jobs)} 頁（{mb:.1f} MB），每批 {batch_size} 頁，CPU {os.cpu_count()} 核")
+    rows = []
+    baseline = None
+    for workers in worker_counts:
+        with ParsePool(workers=workers, batch_size=batch_size) as pool:
+            if workers:
+                pool.map(jobs[:workers])  # 先把子行程開起來，不計入時間
+            start = time.perf_counter()
+            results = pool.map(jobs)
+            seconds = time.perf_counter() - start
+        failed = sum(1 for ok, _ in results if not ok)
+        rate = len(jobs) / seconds if seconds else 0.0
+        baseline = baseline or rate
+        label = "主行程" if workers == 0 else f"{workers} 個行程"
+        print(f"   {label:>8}：{seconds:7.2f}s，{rate:8.1f} 頁/秒，{rate / baseline:4.2f}x（失敗 {failed}）")
+        rows.append({"workers": workers, "seconds": round(seconds, 3), "pages_per_second": round(rate, 1)})
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTML 解析 process pool 的 benchmark")
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--record-dir", help="app.py --record 錄下來的資料夾")
+    src.add_argument("--synthetic", type=int, default=1000, metavar="N", help="合成 N 頁（預設）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=1, help="錄製資料太少時重複幾次")
+    parser.add_argument(
+        "--engine", choices=["bs4", "spec"], default="bs4",
+        help="bs4 = 各館原本的 parse_*；spec = selector_specs 編譯的 lxml 擷取器",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    jobs = load_recorded_jobs(args.record_dir) if args.record_dir else synthetic_jobs(args.synthetic)
+    if not jobs:
+        raise SystemExit("沒有可解析的頁面")
+    if args.engine == "spec":
+        jobs = [("spec:" + parser, *rest) for parser, *rest in jobs]
+    benchmark(jobs * args.repeat, args.workers, args.batch_size)
@@ -0,0 +1,152 @@
+"""
+用地理切塊（quadtree）取代關鍵字查詢的 Places 搜尋（museums_info.py --tiles）。
+
+關鍵字查詢每次最多 60 筆、彼此大量重疊，呼叫很多次還是會漏。
+這裡把雙北的範圍切成矩形，每塊用 locationRestriction 限定範圍搜尋：
+- 第一頁沒滿（< 20 筆）：這塊已經拿完，1 次呼叫結束
+- 第一頁滿了：切成四塊往下查（不必再翻頁，子塊會涵蓋）
+- 到 MAX_DEPTH 還是滿的：照常翻頁拿到上限為止
+每個查詢（TILE_QUERIES）各自判斷：子塊只重查在父塊滿了的那幾個查詢，
+例如博物館滿了、美術館沒滿，子塊就只查博物館。
+
+同一層的所有塊同時查詢；每一塊的呼叫次數、筆數、新增地點數都寫進報告。
+"""
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+import museums_info
+
+# 臺北市 + 新北市的外框（南西 / 北東）
+BBOX = (24.67, 121.28, 25.30, 122.01)
+
+# 每塊要查的 (textQuery, includedType)
+TILE_QUERIES = [
+    ("博物館", "museum"),
+    ("美術館", "art_gallery"),
+]
+
+PAGE_SIZE = 20
+MAX_DEPTH = 6
+MAX_WORKERS = 8
+REPORT_PATH = "places_tiles_report.csv"
+
+
+def split(bbox):
+    """切成四塊：西南、東南、西北、東北"""
+    south, west, north, east = bbox
+    mid_lat = (south + north) / 2
+    mid_lng = (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lng),
+        (south, mid_lng, mid_lat, east),
+        (mid_lat, west, north, mid_lng),
+        (mid_lat, mid_lng, north, east),
+    ]
+
+
+def _rectangle(bbox) -> dict:
+    south, west, north, east = bbox
+    return {
+        "rectangle": {
+            "low": {"latitude": south, "longitude": west},
+            "high": {"latitude": north, "longitude": east},
+        }
+    }
+
+
+def search_tile(tile_id: str, bbox, depth: int, queries=None, use_cache=True) -> dict:
+    """
+    查一塊（queries 預設 = TILE_QUERIES），回傳：
+    {"tile": id, "bbox": bbox, "depth": depth, "queries": [...], "calls": n, "places": [...], "full": [...]}
+    full = 第一頁是滿的查詢（子塊只需要重查這些）
+    """
+    queries = list(queries or TILE_QUERIES)
+    places = []
+    calls = 0
+    full = []
+
+    for text_query, included_type in queries:
+        body = {
+            "textQuery": text_query,
+            "includedType": included_type,
+            "languageCode": museums_info.LANGUAGE_CODE,
+            "pageSize": PAGE_SIZE,
+            "locationRestriction": _rectangle(bbox),
+        }
+        if depth >= MAX_DEPTH:
+            # 已經切到最細：照常翻頁（整串翻頁結果一起快取）
+            res = museums_info.search_all_pages(body, use_cache=use_cache)
+            calls += res["calls"]
+            places.extend(res["places"])
+            continue
+
+        data = museums_info.post_search(body, use_cache=use_cache)
+        calls += 1
+        if "error" in data:
+            print(f"❌ 區塊 {tile_id} API 錯誤：", data["error"].get("message"))
+            continue
+
+        page = data.get("places", [])
+        places.extend(page)
+        if len(page) >= PAGE_SIZE and data.get("nextPageToken"):
+            full.append((text_query, included_type))
+
+    return {
+        "tile": tile_id, "bbox": bbox, "depth": depth, "queries": queries,
+        "calls": calls, "places": places, "full": full,
+    }
+
+
+def harvest_tiles(bbox=BBOX, workers=MAX_WORKERS, use_cache=True, report_path=REPORT_PATH):
+    """
+    從整個範圍開始，逐層往下切，回傳去重後的 {place_id: place}。
+    只有「第一頁滿了」的塊才會往下切，子塊只帶著滿了的查詢；同一層的塊平行查詢。
+    """
+    all_places_by_id = {}
+    report = []
+    level = [("r", bbox, 0, TILE_QUERIES)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while level:
+            results = list(pool.map(lambda t: search_tile(*t, use_cache=use_cache), level))
+
+            next_level = []
+            for res in results:
+                new_ids = 0
+                for p in res["places"]:
+                    pid = p.get("id")
+                    if pid and pid not in all_places_by_id:
+                        all_places_by_id[pid] = p
+                        new_ids += 1
+
+                report.append({
+                    "tile": res["tile"],
+                    "depth": res["depth"],
+                    "south": res["bbox"][0],
+                    "west": res["bbox"][1],
+                    "north": res["bbox"][2],
+                    "east": res["bbox"][3],
+                    "queries": "|".join(q for q, _ in res["queries"]),
+                    "calls": res["calls"],
+                    "results": len(res["places"]),
+                    "new_places": new_ids,
+                    "subdivided": "|".join(q for q, _ in res["full"]),
+                })
+
+                if res["full"]:
+                    for i, child in enumerate(split(res["bbox"])):
+                        next_level.append((f"{res['tile']}{i}", child, res["depth"] + 1, res["full"]))
+
+            level = next_level
+
+    total_calls = sum(r["calls"] for r in report)
+    print(f"🗺️ 查詢區塊 {len(report)} 個，API 呼叫 {total_calls} 次，地點 {len(all_places_by_id)} 個")
+
+    if report_path:
+        with open(report_path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=list(report[0].keys()))
+            writer.writeheader()
+            writer.writerows(report)
+        print(f"📁 區塊報告：{report_path}")
+
+    return all_places_by_id
@@ -0,0 +1,151 @@
+"""
+爬完之後的批次後處理：衍生欄位整欄一起算（pandas / NumPy），不逐筆跑 Python。
+
+衍生欄位（all_museums_derived.csv，用 exhibition_id 跟主 CSV 對）：
+    duration_days    展期天數（含頭尾；沒有結束日期是空的）
+    days_remaining   到結束日還有幾天（已結束是負數）
+    is_current       今天是否在展
+    is_upcoming      還沒開始
+    venue_key        館別正規化後的 join key（跟 venue_join.normalize_name 一樣）
+    place_id         venue_join 對到的館（沒有 taipei_museums_info.csv 就是空的）
+    title_norm       標題：全半形統一、去頭尾空白、連續空白合成一個
+    link_url         展覽連結：補成絕對網址並 percent-encode
+    image_url        展覽圖片：同上，相對網址以展覽連結為基準
+
+是否在展跟 calendar_view 的規則一致：常設展沒有結束日期就一直算在展，
+其他沒有結束日期的展覽只算 OPEN_ENDED_DAYS 天；
+完全沒有日期的常設展也算在展（這種 calendar_view 放不進日曆）。
+
+還是逐筆處理的只有：
+- 館別 -> venue_key / place_id：每個不同的館別算一次（全部只有幾個），再用 factorize 的編號展開；
+  place_id 用 venue_join.resolve_mapping 比對（結果有快取，只有新的館別才真的比對）
+- 網址修正：先用字串遮罩挑出需要修的列（相對網址、含空白或非 ASCII），只對那幾列跑 urljoin / requote_uri
+主 CSV 的欄位與內容不變（content_hash 不受影響）。
+"""
+import os
+from datetime import date
+from urllib.parse import urljoin
+
+import numpy as np
+import pandas as pd
+from requests.utils import requote_uri
+
+import calendar_view
+import change_feed
+import venue_join
+
+DERIVED_PATH = "all_museums_derived.csv"
+DERIVED_FIELDS = [
+    "duration_days", "days_remaining", "is_current", "is_upcoming",
+    "venue_key", "place_id", "title_norm", "link_url", "image_url",
+]
+
+_NEEDS_QUOTING = r"[^\x21-\x7e]"  # 空白、非 ASCII
+
+
+def to_frame(rows) -> pd.DataFrame:
+    """CSV 的列（dict）-> DataFrame；全部當 object，數字 / None 保持原樣"""
+    return pd.DataFrame(list(rows), dtype=object)
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].fillna("").astype(str)
+
+
+def _dates(df: pd.DataFrame, column: str) -> pd.Series:
+    return pd.to_datetime(_text(df, column).str[:10], format="%Y-%m-%d", errors="coerce")
+
+
+def fix_urls(urls: pd.Series, bases: pd.Series) -> pd.Series:
+    """相對網址以 bases 補成絕對網址，含空白 / 非 ASCII 的 percent-encode；其他列原樣"""
+    urls = urls.fillna("").astype(str).str.strip()
+    out = urls.copy()
+    relative = (urls != "") & ~urls.str.match(r"(?i)^(https?:)?//")
+    if relative.any():
+        out[relative] = [urljoin(b, u) for b, u in zip(bases[relative], urls[relative])]
+    protocol_relative = out.str.startswith("//")
+    out[protocol_relative] = "https:" + out[protocol_relative]
+    needs_quoting = out.str.contains(_NEEDS_QUOTING, regex=True)
+    if needs_quoting.any():
+        out[needs_quoting] = [requote_uri(u) for u in out[needs_quoting]]
+    return out
+
+
+def venue_keys(museums: pd.Series) -> pd.Series:
+    """館別 -> venue_key：不同的館別只正規化一次"""
+    codes, uniques = pd.factorize(museums.fillna("").astype(str))
+    keys = np.array([venue_join.normalize_name(u) for u in uniques] + [""], dtype=object)
+    return pd.Series(keys[codes], index=museums.index, dtype=object)  # codes = -1 -> 最後的 ""
+
+
+def resolve_place_ids(museums: pd.Series) -> dict:
+    """館別 -> place_id；沒有館資料檔（museums_info.py 還沒跑過）就全部空白"""
+    if not os.path.exists(venue_join.VENUES_PATH):
+        return {}
+    return venue_join.resolve_mapping(museums.unique())
+
+
+def derive(df: pd.DataFrame, today=None, place_ids=None) -> pd.DataFrame:
+    """
+    df：to_frame 的結果（CSV 欄位）。回傳 exhibition_id + DERIVED_FIELDS。
+    place_ids：館別 -> place_id（預設用 venue_join 比對館資料檔）。
+    """
+    today = pd.Timestamp(today or date.today())
+    start = _dates(df, "start_date")
+    end = _dates(df, "end_date")
+    permanent = _text(df, "is_permanent").isin(["1", "True", "true"])
+
+    # 跟 calendar_view.exhibition_span 一樣：只有一邊有日期就當單日，顛倒的起訖對調
+    start = start.fillna(end)
+    swapped = end < start
+    start, end = start.where(~swapped, end), end.where(~swapped, start)
+    open_ended = end.isna() & start.notna() & ~permanent
+    effective_end = end.where(~open_ended, start + pd.Timedelta(days=calendar_view.OPEN_ENDED_DAYS - 1))
+
+    dated = start.notna()
+    started = dated & (start <= today)
+    not_ended = (effective_end >= today) | (effective_end.isna() & permanent)
+
+    out = pd.DataFrame(index=df.index)
+    out[change_feed.ID_FIELD] = _text(df, change_feed.ID_FIELD)
+    out["duration_days"] = ((end - start).dt.days + 1).astype("Int64")
+    out["days_remaining"] = (end - today).dt.days.astype("Int64")
+    out["is_current"] = ((started & not_ended) | (~dated & permanent)).astype(np.int8)
+    out["is_upcoming"] = (dated & (start > today)).astype(np.int8)
+
+    museums = _text(df, "館別")
+    out["venue_key"] = venue_keys(museums)
+    if place_ids is None:
+        place_ids = resolve_place_ids(museums)
+    out["place_id"] = museums.map(place_ids).fillna("")
+
+    out["title_norm"] = (
+        _text(df, "展覽名稱").str.normalize("NFKC").str.replace(r"\s+", " ", regex=True).str.strip()
+    )
+    links = fix_urls(_text(df, "展覽連結"), pd.Series("", index=df.index))
+    out["link_url"] = links
+    out["image_url"] = fix_urls(_text(df, "展覽圖片"), links)
+    return out
+
+
+def run(rows, path=DERIVED_PATH, today=None) -> pd.DataFrame:
+    """app.py 寫完 CSV 後呼叫：算衍生欄位並寫出 DERIVED_PATH"""
+    derived = derive(to_frame(rows), today=today)
+    derived.to_csv(path, index=False, encoding="utf-8-sig")
+    print(f"🧮 衍生欄位：{len(derived)} 筆，今天在展 {int(derived['is_current'].sum())} 檔 -> {path}")
+    return derived
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="從 CSV 重算衍生欄位")
+    parser.add_argument("csv", nargs="?", default="all_museums_exhibitions.csv")
+    parser.add_argument("--out", default=DERIVED_PATH)
+    parser.add_argument("--today", type=date.fromisoformat, help="以哪一天計算（預設今天）")
+    args = parser.parse_args()
+
+    frame = pd.read_csv(args.csv, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    run(frame.to_dict("records"), args.out, today=args.today)
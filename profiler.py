@@ -0,0 +1,171 @@
+"""
+爬蟲效能分析（app.py --profile）。
+
+每個 fetch_*_exhibitions 會同時跑兩種分析：
+- cProfile（決定性）：輸出 <館>.prof，可用 snakeviz / pstats 查看
+- 取樣：另開一條執行緒定時抓主執行緒的呼叫堆疊，輸出 <館>.collapsed，
+  可直接餵給 flamegraph.pl 或 speedscope
+  分析期間開出來的執行緒（pagination 的分頁執行緒池）也一起取樣，
+  堆疊第二層標 <worker>；閒著等工作的 worker 不計
+
+每個取樣的最底層會標上：
+- [net]     正在等 HTTP 回應（http_client.session）
+- [browser] 正在等 Selenium / chromedriver
+- [wait]    在等其他執行緒 / 行程（pool.map、future、Event），實際工作記在 worker 的取樣裡
+- [cpu]     其餘時間，例如 BeautifulSoup 解析、regex 解析日期
+
+cProfile 只看得到主執行緒；worker 的時間只在取樣結果（worker_samples）裡。
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import http_client
+
+SAMPLE_INTERVAL = 0.005  # 秒
+
+
+def _is_idle_worker(frame) -> bool:
+    """執行緒池裡沒有工作、正在等 work queue 的 worker"""
+    names = set()
+    while frame is not None:
+        code = frame.f_code
+        names.add((os.path.basename(code.co_filename), code.co_name))
+        frame = frame.f_back
+    return ("thread.py", "_worker") in names and ("thread.py", "run") not in names
+
+
+def _is_blocked(frame) -> bool:
+    """最內層停在 threading 的 wait / join（等 future、Event、其他執行緒）"""
+    code = frame.f_code
+    return (
+        os.path.basename(code.co_filename) == "threading.py"
+        and code.co_name in ("wait", "join", "_wait_for_tstate_lock")
+    )
+
+
+class StackSampler(threading.Thread):
+    """定時取樣指定執行緒，以及取樣開始後才開出來的執行緒的呼叫堆疊"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.kinds = Counter()         # 主執行緒
+        self.worker_kinds = Counter()  # 其他執行緒合計
+        self._existing = set()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        # 取樣前就在的執行緒（資源監控等）不是這個館的工作，不取樣
+        self._existing = set(sys._current_frames()) - {self.thread_id}
+        super().start()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == self.ident or tid in self._existing:
+                    continue
+                if tid != self.thread_id and _is_idle_worker(frame):
+                    continue
+                self._sample(tid, frame)
+
+    def _sample(self, tid: int, frame):
+        blocked = _is_blocked(frame)
+        names = []
+        in_selenium = False
+        while frame is not None:
+            code = frame.f_code
+            if "selenium" in code.co_filename:
+                in_selenium = True
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+
+        if http_client.is_waiting_on_network(tid):
+            kind = "[net]"
+        elif in_selenium:
+            kind = "[browser]"
+        elif blocked:
+            kind = "[wait]"
+        else:
+            kind = "[cpu]"
+
+        if tid == self.thread_id:
+            self.kinds[kind] += 1
+            self.stacks[";".join([kind] + names)] += 1
+        else:
+            self.worker_kinds[kind] += 1
+            self.stacks[";".join([kind, "<worker>"] + names)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profile_fetch(key: str, fetch, out_dir: str):
+    """
+    在分析器底下執行一個 fetch_*_exhibitions，回傳 (results, summary)。
+
+    summary 內容：
+    - wall_seconds：總耗時
+    - cpu_seconds：本行程 CPU 時間
+    - net_wait_seconds / requests：每個請求等回應的時間加總與次數
+      （分頁同時抓時加總可能超過 wall_seconds）
+    - net_busy_seconds：至少有一個請求在等回應的時間（不超過 wall_seconds）
+    - samples / worker_samples：主執行緒 / 其他執行緒的取樣依 [net] / [browser] / [wait] / [cpu] 分類的次數
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    http_client.reset_net_stats()
+    sampler = StackSampler(threading.get_ident())
+    prof = cProfile.Profile()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    sampler.start()
+    prof.enable()
+    try:
+        results = fetch()
+    finally:
+        prof.disable()
+        sampler.stop()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        net = http_client.reset_net_stats()
+
+        prof.dump_stats(os.path.join(out_dir, f"{key}.prof"))
+        sampler.write_collapsed(os.path.join(out_dir, f"{key}.collapsed"))
+
+    summary = {
+        "records": len(results),
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "net_wait_seconds": round(net["seconds"], 4),
+        "net_busy_seconds": round(net["busy_seconds"], 4),
+        "requests": net["requests"],
+        "samples": dict(sampler.kinds),
+        "worker_samples": dict(sampler.worker_kinds),
+    }
+    print(
+        f"   ⏱ {key}：總計 {wall:.2f}s，CPU {cpu:.2f}s，"
+        f"等網路 {net['busy_seconds']:.2f}s（{net['requests']} 次請求，各請求合計 {net['seconds']:.2f}s）"
+    )
+    return results, summary
+
+
+def write_summary(out_dir: str, summaries: dict):
+    path = os.path.join(out_dir, "summary.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summaries, f, ensure_ascii=False, indent=2)
+    print(f"📁 效能分析結果：{out_dir}")
@@ -0,0 +1,124 @@
+"""
+展覽變動的推播伺服器（Server-Sent Events）。
+
+客戶端不用再定時整份下載 CSV，改成連上 /events 保持連線，
+爬蟲每爬完一個館、event_log 寫入事件後，這裡就馬上推出去。
+
+    python push_server.py --port 8765
+    curl -N http://localhost:8765/events
+    curl -N "http://localhost:8765/events?cursor=120&museum=國立臺灣師範大學-師大美術館"
+
+- 每個事件帶 id；瀏覽器的 EventSource 斷線重連時會自動送 Last-Event-ID，
+  伺服器從那之後補送（也可以用 ?cursor= 指定）
+- 每 HEARTBEAT_SECONDS 秒送一行註解，避免代理伺服器把閒置連線切掉
+- GET /events/latest 回傳最新的事件 id，給只想知道「有沒有新東西」的客戶端
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from event_log import EVENTS_PATH, EventLog
+
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 3000
+
+
+def format_event(ev: dict) -> bytes:
+    data = json.dumps(ev, ensure_ascii=False)
+    return f"id: {ev['id']}\nevent: {ev['type']}\ndata: {data}\n\n".encode("utf-8")
+
+
+class EventStreamHandler(BaseHTTPRequestHandler):
+    event_log = None  # serve() 設定
+
+    def log_message(self, fmt, *args):
+        print(f"🌐 {self.address_string()} {fmt % args}")
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/events":
+            self._stream(query)
+        elif url.path == "/events/latest":
+            self._send_json(200, {"last_id": EventLog(self.event_log.path).last_id})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream(self, query):
+        try:
+            cursor = int(self.headers.get("Last-Event-ID") or query.get("cursor", ["0"])[0])
+        except ValueError:
+            self._send_json(400, {"error": "cursor 必須是整數"})
+            return
+        museums = set(query.get("museum", []))
+        types = set(query.get("type", []))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "keep-alive")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        offset = 0
+        last_write = time.monotonic()
+        try:
+            self.wfile.write(f"retry: {RETRY_MS}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            while True:
+                events, offset = self.event_log.read_after(cursor, offset)
+                for ev in events:
+                    cursor = ev["id"]
+                    if museums and ev.get("museum") not in museums:
+                        continue
+                    if types and ev.get("type") not in types:
+                        continue
+                    self.wfile.write(format_event(ev))
+                if events:
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+                elif time.monotonic() - last_write >= HEARTBEAT_SECONDS:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    last_write = time.monotonic()
+                time.sleep(POLL_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客戶端斷線
+
+
+def serve(host="127.0.0.1", port=8765, events_path=EVENTS_PATH):
+    EventStreamHandler.event_log = EventLog(events_path)
+    server = ThreadingHTTPServer((host, port), EventStreamHandler)
+    server.daemon_threads = True
+    print(f"📡 推播伺服器：http://{host}:{port}/events（事件檔 {events_path}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="用 Server-Sent Events 推送展覽變動")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events", default=EVENTS_PATH, help="事件記錄檔")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(args.host, args.port, args.events)
@@ -0,0 +1,95 @@
+"""
+邊爬邊輸出 NDJSON（一行一筆 JSON），下游不用等整份 CSV 寫完。
+
+- 每個館爬完就把那個館的資料寫出去並 flush，下游讀到一行就能處理一行
+- --gzip（或檔名以 .gz 結尾）：每個館寫完做一次 sync flush，
+  下游用 zcat / gzip.open 邊收邊解壓，不用等檔案結束
+- 路徑用 - 表示寫到 stdout，可以直接接 pipe：
+      python app.py --ndjson - --gzip | zcat | our_loader
+  這時 stdout 只放資料，程式的所有訊息都改印到 stderr
+- 下游提早結束（BrokenPipe）不影響爬蟲本身，只是不再輸出
+"""
+import gzip
+import json
+import os
+import sys
+
+STDOUT = "-"
+
+
+def stdout_requested(argv) -> bool:
+    """命令列是不是要求 --ndjson -（在 argparse 之前判斷，import 時的訊息也要改印到 stderr）"""
+    for i, arg in enumerate(argv):
+        if arg == "--ndjson=-" or (arg == "--ndjson" and i + 1 < len(argv) and argv[i + 1] == STDOUT):
+            return True
+    return False
+
+
+class RecordStream:
+    def __init__(self, path: str, compress=False, fields=None):
+        self.path = path
+        self.fields = fields
+        self.records = 0
+        self.closed = False
+        compress = compress or path.endswith(".gz")
+        if path == STDOUT:
+            # 用原始的 stdout：app 在 pipe 模式會把 sys.stdout 換成 stderr
+            self._raw = sys.__stdout__.buffer
+            self._owns_raw = False
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._raw = open(path, "wb")
+            self._owns_raw = True
+        # mtime=0：內容一樣時 gzip 檔也一樣
+        self._out = gzip.GzipFile(fileobj=self._raw, mode="wb", mtime=0) if compress else self._raw
+
+    def write(self, rows):
+        """寫出一批（通常是一個館的結果）並 flush"""
+        if self.closed:
+            return 0
+        lines = []
+        for row in rows:
+            record = row if self.fields is None else {f: row.get(f, "") for f in self.fields}
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if not lines:
+            return 0
+        try:
+            self._out.write(("\n".join(lines) + "\n").encode("utf-8"))
+            self._out.flush()  # GzipFile.flush 是 Z_SYNC_FLUSH，已寫的部分可以先解壓
+            if self._out is not self._raw:
+                self._raw.flush()
+        except BrokenPipeError:
+            print("⚠️ NDJSON 的讀取端已關閉，之後不再輸出")
+            self._abandon()
+            return 0
+        self.records += len(lines)
+        return len(lines)
+
+    def _abandon(self):
+        self.closed = True
+        if self.path == STDOUT:
+            # 之後 Python 結束時 flush stdout 不要再丟 BrokenPipeError
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.__stdout__.fileno())
+            os.close(devnull)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._out is not self._raw:
+                self._out.close()  # 寫 gzip 結尾；fileobj 不會被關掉
+            self._raw.flush()
+        except BrokenPipeError:
+            self._abandon()
+        if self._owns_raw:
+            self._raw.close()
+        where = "stdout" if self.path == STDOUT else self.path
+        print(f"📤 NDJSON 輸出 {self.records} 筆 -> {where}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,320 @@
+"""
+Selenium / Chrome 資源監控。
+
+- 每個館爬取期間，背景執行緒定時量 Python 本身與所有 Chrome 行程樹的 RSS，
+  記錄峰值，結果寫進 run report
+- 超過記憶體上限（MEMORY_LIMIT_MB）時直接砍掉 Chrome，避免小 VM 被 OOM killer 整台清掉
+- driver.quit() 卡住或爬蟲中途出錯時，把殘留的 chromedriver / Chrome 行程收掉
+- 每次啟動的 chromedriver pid 會寫到 PID_DIR/<本行程 pid>.json，
+  之後（這次或下次執行）可收掉當掉的行程留下的瀏覽器
+
+同一台機器上可能同時有好幾個爬蟲行程（crawl_queue 的 worker），
+所以只收「主人已經不在」的瀏覽器：Chrome 的命令列帶著主人的 pid（chrome_marker()），
+PID 檔也是每個行程各一份；主人還活著的一律不動。
+
+需要 psutil 才能量 Chrome 行程樹；沒有安裝時只記錄 Python 本身的 RSS。
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 加在 Chrome 啟動參數上，用來辨認「我們開的」瀏覽器行程與它的主人（Chrome 會忽略不認得的參數）
+CHROME_MARKER = "--exhibitions-crawler"
+
+PID_DIR = ".crawler_browsers"
+SAMPLE_INTERVAL = 0.5  # 秒
+QUIT_TIMEOUT = 15      # driver.quit() 最多等幾秒
+
+# 記憶體上限（MB，Python + Chrome 合計）；None = 不限制
+MEMORY_LIMIT_MB = None
+
+_lock = threading.Lock()
+_browsers = {}  # chromedriver pid -> driver
+_warned_no_psutil = False
+
+
+def set_memory_limit(mb):
+    global MEMORY_LIMIT_MB
+    MEMORY_LIMIT_MB = mb
+
+
+def _warn_no_psutil():
+    global _warned_no_psutil
+    if psutil is None and not _warned_no_psutil:
+        print("⚠️ 沒有安裝 psutil，無法量測 / 回收 Chrome 行程")
+        _warned_no_psutil = True
+
+
+# --------------------
+# 記憶體量測
+# --------------------
+def python_rss() -> int:
+    """目前 Python 行程的 RSS（bytes）"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _tree(pid: int):
+    """pid 本身 + 所有子孫行程"""
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return []
+
+
+def browser_usage():
+    """所有登記中的瀏覽器行程樹：(RSS 合計 bytes, 行程數)"""
+    if psutil is None:
+        return 0, 0
+    with _lock:
+        pids = list(_browsers)
+
+    total, count = 0, 0
+    for pid in pids:
+        for p in _tree(pid):
+            try:
+                total += p.memory_info().rss
+                count += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+    return total, count
+
+
+# --------------------
+# 瀏覽器登記 / 關閉
+# --------------------
+def _driver_pid(driver):
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def chrome_marker() -> str:
+    """這個行程開的 Chrome 要帶的參數（fork 出來的 worker 要在自己行程裡呼叫，pid 才會對）"""
+    return f"{CHROME_MARKER}={os.getpid()}"
+
+
+def _owner_of(cmdline):
+    """Chrome 命令列 -> 主人的 pid；不是我們開的回傳 None"""
+    for arg in cmdline:
+        if arg.startswith(CHROME_MARKER + "="):
+            value = arg.split("=", 1)[1]
+            return int(value) if value.isdigit() else None
+    return None
+
+
+def _pid_file(owner: int) -> str:
+    return os.path.join(PID_DIR, f"{owner}.json")
+
+
+def _save_pid_file():
+    with _lock:
+        pids = list(_browsers)
+    path = _pid_file(os.getpid())
+    try:
+        if not pids:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(PID_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(pids, f)
+    except OSError:
+        pass
+
+
+def register_browser(driver):
+    """get_driver() 成功後呼叫，之後這個 driver 的行程樹會被量測"""
+    _warn_no_psutil()
+    pid = _driver_pid(driver)
+    if pid is None:
+        return
+    with _lock:
+        _browsers[pid] = driver
+    _save_pid_file()
+
+
+def kill_tree(pid: int) -> int:
+    """砍掉 pid 與所有子孫行程，回傳砍掉的數量"""
+    if psutil is None:
+        return 0
+    procs = _tree(pid)
+    for p in procs:
+        try:
+            p.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    psutil.wait_procs(procs, timeout=5)
+    return len(procs)
+
+
+def quit_driver(driver):
+    """
+    取代 driver.quit()：
+    quit 最多等 QUIT_TIMEOUT 秒，之後不論成功與否都把整棵行程樹收乾淨
+    """
+    pid = _driver_pid(driver)
+
+    t = threading.Thread(target=_quiet_quit, args=(driver,), daemon=True)
+    t.start()
+    t.join(QUIT_TIMEOUT)
+    if t.is_alive():
+        print(f"⚠️ driver.quit() 超過 {QUIT_TIMEOUT} 秒沒有回應，強制結束")
+
+    if pid is not None:
+        leftover = kill_tree(pid)
+        if leftover:
+            print(f"🧹 收掉殘留的瀏覽器行程 {leftover} 個")
+        with _lock:
+            _browsers.pop(pid, None)
+        _save_pid_file()
+
+
+def _quiet_quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def kill_all_browsers() -> int:
+    with _lock:
+        pids = list(_browsers)
+    return sum(kill_tree(pid) for pid in pids)
+
+
+def _is_orphaned(owner: int, me: int) -> bool:
+    """主人是別的行程而且還活著 -> 不是孤兒（那是其他 worker 正在用的瀏覽器）"""
+    return owner == me or not psutil.pid_exists(owner)
+
+
+def reap_orphans() -> int:
+    """
+    收掉沒有主人的殘留行程：
+    - PID_DIR 裡主人已經結束的 PID 檔所列的 chromedriver（收完刪掉那個檔）
+    - 命令列帶有 chrome_marker() 的 Chrome：主人已經結束的，
+      或主人是自己、但不在任何登記中行程樹底下的（quit 沒收乾淨）
+    其他還活著的行程開的瀏覽器一律不動。
+    """
+    _warn_no_psutil()
+    if psutil is None:
+        return 0
+
+    me = os.getpid()
+    with _lock:
+        live = set(_browsers)
+    owned = set()
+    for pid in live:
+        owned.update(p.pid for p in _tree(pid))
+
+    reaped = 0
+    try:
+        names = os.listdir(PID_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        owner = name[:-len(".json")]
+        if not (name.endswith(".json") and owner.isdigit()):
+            continue
+        owner = int(owner)
+        if owner == me or psutil.pid_exists(owner):
+            continue
+        try:
+            with open(_pid_file(owner), encoding="utf-8") as f:
+                old_pids = json.load(f)
+        except (OSError, ValueError):
+            old_pids = []
+        for pid in old_pids:
+            try:
+                if "chromedriver" in psutil.Process(pid).name().lower():
+                    reaped += kill_tree(pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        try:
+            os.remove(_pid_file(owner))
+        except OSError:
+            pass
+
+    for p in psutil.process_iter(["pid", "cmdline"]):
+        owner = _owner_of(p.info.get("cmdline") or [])
+        if owner is None or p.info["pid"] in owned or not _is_orphaned(owner, me):
+            continue
+        try:
+            p.kill()
+            reaped += 1
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+
+    if reaped:
+        print(f"🧹 回收孤兒瀏覽器行程 {reaped} 個")
+    _save_pid_file()
+    return reaped
+
+
+# --------------------
+# 每個館的資源統計
+# --------------------
+class _Monitor(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak_python = python_rss()
+        self.peak_browser = 0
+        self.peak_browser_procs = 0
+        self.ceiling_hit = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            self.sample()
+
+    def sample(self):
+        py = python_rss()
+        browser, procs = browser_usage()
+        self.peak_python = max(self.peak_python, py)
+        self.peak_browser = max(self.peak_browser, browser)
+        self.peak_browser_procs = max(self.peak_browser_procs, procs)
+
+        if MEMORY_LIMIT_MB and (py + browser) > MEMORY_LIMIT_MB * 1024 * 1024:
+            if browser and not self.ceiling_hit:
+                print(f"⚠️ 記憶體超過上限 {MEMORY_LIMIT_MB} MB，強制關閉瀏覽器")
+                kill_all_browsers()
+            self.ceiling_hit = True
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+@contextmanager
+def track(stats: dict):
+    """
+    量測 with 區塊內的資源使用，結束後把結果填進 stats：
+    peak_python_rss_mb / peak_browser_rss_mb / peak_browser_procs /
+    memory_ceiling_hit / orphans_reaped
+    """
+    monitor = _Monitor()
+    monitor.start()
+    try:
+        yield stats
+    finally:
+        monitor.stop()
+        stats["peak_python_rss_mb"] = round(monitor.peak_python / 1024 / 1024, 1)
+        stats["peak_browser_rss_mb"] = round(monitor.peak_browser / 1024 / 1024, 1)
+        stats["peak_browser_procs"] = monitor.peak_browser_procs
+        stats["memory_ceiling_hit"] = monitor.ceiling_hit
+        stats["orphans_reaped"] = reap_orphans()
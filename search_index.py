@@ -0,0 +1,255 @@
+"""
+展覽的全文搜尋索引（展覽名稱 / 展覽主題 / 展覽地點）。
+
+- 斷詞：中文用相鄰兩字（bigram），英文 / 數字用整個單字（轉小寫）
+- 倒排索引：詞 -> {文件編號: 加權詞頻}，名稱的權重比主題、地點高
+- 排序：先看查詢的詞命中幾個，再用 BM25 分數
+- 增量更新：每次爬完只對新增 / 內容有變 / 消失的展覽動索引
+- 存檔：文件編號差分編碼後 gzip 壓縮的 JSON
+
+用法：
+    index = SearchIndex.load("search_index.json.gz")
+    index.search("印象派 monet")
+"""
+import gzip
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+INDEX_PATH = "search_index.json.gz"
+
+# 欄位權重
+FIELD_WEIGHTS = {"展覽名稱": 3, "展覽主題": 2, "展覽地點": 1}
+# 搜尋結果要帶的欄位
+DISPLAY_FIELDS = ["館別", "展覽名稱", "展覽日期", "展覽連結"]
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_CJK = r"㐀-䶿一-鿿豈-﫿"
+_TOKEN = re.compile(rf"[{_CJK}]+|[a-z0-9]+")
+
+
+def tokenize(text: str):
+    """中文 bigram + 英數單字；單獨一個中文字就用單字"""
+    if not text:
+        return []
+    s = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for run in _TOKEN.findall(s):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def doc_key(row: dict) -> str:
+    """一筆展覽的識別：館別 + exhibition_id（舊資料沒有 ID 時用連結或名稱）"""
+    ident = row.get("exhibition_id") or row.get("展覽連結") or row.get("展覽名稱", "")
+    return f"{row.get('館別', '')}|{ident}"
+
+
+def _weighted_terms(row: dict) -> Counter:
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for t in tokenize(row.get(field, "") or ""):
+            terms[t] += weight
+    return terms
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {doc_id: weighted tf}
+        self.docs = {}                     # doc_id -> {"key", "len", "sig", "row", "terms"}
+        self.key_to_id = {}
+        self.next_id = 0
+        self.total_len = 0
+        self._char_terms = None            # 單一中文字 -> 含有這個字的 bigram（查單字時用）
+
+    # --------------------
+    # 建立 / 更新
+    # --------------------
+    def _add(self, key: str, row: dict, sig: str):
+        terms = _weighted_terms(row)
+        doc_id = self.next_id
+        self.next_id += 1
+        length = sum(terms.values())
+        self.docs[doc_id] = {
+            "key": key,
+            "len": length,
+            "sig": sig,
+            "row": {f: row.get(f, "") for f in DISPLAY_FIELDS},
+            "terms": list(terms),  # 移除時只需要動這些詞的 posting
+        }
+        self.key_to_id[key] = doc_id
+        self.total_len += length
+        for t, tf in terms.items():
+            self.postings[t][doc_id] = tf
+        self._char_terms = None
+
+    def _remove(self, key: str):
+        doc_id = self.key_to_id.pop(key)
+        doc = self.docs.pop(doc_id)
+        self.total_len -= doc["len"]
+        for t in doc["terms"]:
+            postings = self.postings.get(t)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[t]
+        self._char_terms = None
+
+    def update(self, rows) -> dict:
+        """
+        用這次爬取的完整結果更新索引：
+        新出現的加進來、內容有變的重建、這次沒出現的移除。
+        只會移除「這次有抓到資料的館」底下消失的展覽，
+        某個館這次抓取失敗（0 筆）時保留它原本的索引。
+        """
+        seen = set()
+        added = changed = 0
+        for row in rows:
+            key = doc_key(row)
+            if key in seen:
+                continue
+            seen.add(key)
+            sig = "\x1f".join(str(row.get(f, "") or "") for f in list(FIELD_WEIGHTS) + DISPLAY_FIELDS)
+            if key in self.key_to_id:
+                if self.docs[self.key_to_id[key]]["sig"] == sig:
+                    continue
+                self._remove(key)
+                changed += 1
+            else:
+                added += 1
+            self._add(key, row, sig)
+
+        museums = {row.get("館別", "") for row in rows}
+        removed_keys = [
+            k for k in self.key_to_id
+            if k not in seen and k.split("|", 1)[0] in museums
+        ]
+        for key in removed_keys:
+            self._remove(key)
+        return {"added": added, "changed": changed, "removed": len(removed_keys)}
+
+    # --------------------
+    # 查詢
+    # --------------------
+    def _postings_for(self, term: str) -> dict:
+        """
+        一般詞直接查；單獨一個中文字（例如「貓」）則合併所有含這個字的 bigram，
+        同一份文件取最大的詞頻
+        """
+        if len(term) != 1 or term.isascii():
+            return self.postings.get(term, {})
+        if self._char_terms is None:
+            self._char_terms = defaultdict(list)
+            for t in self.postings:
+                if len(t) == 2 and not t.isascii():
+                    self._char_terms[t[0]].append(t)
+                    if t[1] != t[0]:
+                        self._char_terms[t[1]].append(t)
+        merged = dict(self.postings.get(term, {}))
+        for t in self._char_terms.get(term, ()):
+            for doc_id, tf in self.postings[t].items():
+                if tf > merged.get(doc_id, 0):
+                    merged[doc_id] = tf
+        return merged
+
+    def search(self, query: str, limit: int = 20):
+        """回傳 [(分數, 展覽資料), ...]，分數高的在前"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.docs:
+            return []
+
+        n = len(self.docs)
+        avg_len = self.total_len / n if n else 1.0
+        scores = defaultdict(float)
+        hits = Counter()
+        for t in terms:
+            postings = self._postings_for(t)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.docs[doc_id]["len"] / avg_len)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                hits[doc_id] += 1
+
+        ranked = sorted(scores, key=lambda d: (hits[d], scores[d]), reverse=True)[:limit]
+        return [(round(scores[d], 4), self.docs[d]["row"]) for d in ranked]
+
+    # --------------------
+    # 存檔（文件編號差分編碼 + gzip）
+    # --------------------
+    def save(self, path=INDEX_PATH):
+        ids = sorted(self.docs)
+        remap = {old: new for new, old in enumerate(ids)}
+        postings = {}
+        for t, plist in self.postings.items():
+            new_ids = sorted((remap[d], tf) for d, tf in plist.items())
+            deltas, prev = [], 0
+            for d, _ in new_ids:
+                deltas.append(d - prev)
+                prev = d
+            postings[t] = [deltas, [tf for _, tf in new_ids]]
+
+        data = {
+            "version": 1,
+            "docs": [[self.docs[d]["key"], self.docs[d]["len"], self.docs[d]["sig"],
+                      [self.docs[d]["row"].get(f, "") for f in DISPLAY_FIELDS]] for d in ids],
+            "postings": postings,
+        }
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for doc_id, (key, length, sig, row) in enumerate(data["docs"]):
+            index.docs[doc_id] = {
+                "key": key, "len": length, "sig": sig,
+                "row": dict(zip(DISPLAY_FIELDS, row)), "terms": [],
+            }
+            index.key_to_id[key] = doc_id
+            index.total_len += length
+        index.next_id = len(data["docs"])
+
+        for t, (deltas, tfs) in data["postings"].items():
+            plist, d = {}, 0
+            for delta, tf in zip(deltas, tfs):
+                d += delta
+                plist[d] = tf
+                index.docs[d]["terms"].append(t)
+            index.postings[t] = plist
+        return index
+
+
+def refresh(rows, path=INDEX_PATH) -> dict:
+    """讀既有索引、用這次的結果增量更新、存回去"""
+    index = SearchIndex.load(path)
+    stats = index.update(rows)
+    index.save(path)
+    print(f"🔍 搜尋索引更新：新增 {stats['added']}、變更 {stats['changed']}、移除 {stats['removed']}")
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+
+    idx = SearchIndex.load()
+    for score, row in idx.search(" ".join(sys.argv[1:]) or "展"):
+        print(f"{score:7.3f}  {row['館別']}  {row['展覽名稱']}")
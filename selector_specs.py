@@ -0,0 +1,620 @@
+"""
+每個館的擷取規則改成宣告式的 spec，編譯成 lxml 的 XPath（CSS 也先轉成 XPath），只編譯一次。
+
+spec 格式：
+    {
+        "museum": 館名,
+        "base_url": 相對網址的基準,
+        "date_profile": 用哪個館的 parse_*_date 解析 date 欄位（None = 不解析）,
+        "listing": {
+            "render": "http" 或 "browser"（要 Selenium 開完頁面再拿 page_source）,
+            "items": 每一筆的選擇器,
+            "fields": {欄位: 欄位規則},
+            "require": 這些欄位是空的就略過這筆,
+            "require_any": 所有欄位都空才略過,
+            "yields": "records"（直接是展覽資料）/ "links"（內頁連結）/ "items"（給內頁補資料）,
+        },
+        "detail": {"fields": {...}},
+        "copy": {"time": "date"},   組成展覽資料時，把某欄複製到另一欄
+        "missing": 欄位找不到時的值（預設 ""）,
+    }
+
+欄位規則（依序套用）：
+    css / xpath / first（多個選擇器，取第一個找得到的）/ self（item 本身）
+    index：取第幾個符合的節點（預設第一個）
+    all + join + limit：所有符合節點的文字，取前 limit 個用 join 接起來
+    attr（有這個屬性就取，可能是空字串）/ attrs（取第一個非空的屬性）/ text（分隔字元，預設 ""）
+    regex + group、match（不符合就當作沒有）、reject_contains、slice、format、
+    urljoin、cut（取分隔字元前的部分）、requote
+
+文字的取法跟 BeautifulSoup 的 get_text(sep, strip=True) 一樣：
+每段文字各自 strip、空的丟掉，再用 sep 接起來；<script> / <style> 不算。
+
+class 比對跟 bs4 的 find(class_=...) 一致：單一 class 用 cls()（比對其中一個 class），
+多個 class 的字串用 cls_exact()（整串相同）。
+
+用法：
+    python selector_specs.py --verify                    # 用內建 fixture 跟 bs4 版逐欄比對
+    python selector_specs.py --verify --record-dir recordings
+    python selector_specs.py --benchmark 2000            # bs4 vs lxml 解析速度
+"""
+import argparse
+import re
+import time
+from urllib.parse import urljoin
+
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+from requests.utils import requote_uri
+
+import fubon
+import huashan
+import moca
+import npm_museum
+import ntnu
+import songshan
+import tfam
+
+DATE_PROFILES = {
+    "songshan": songshan.parse_songshan_date,
+    "npm": npm_museum.parse_npm_date,
+    "moca": moca.parse_moca_date,
+    "huashan": huashan.parse_huashan_date,
+    "fubon": fubon.parse_fubon_date,
+    "tfam": tfam.parse_tfam_date,
+    "ntnu": ntnu.parse_ntnu_date,
+}
+
+RECORD_FIELDS = ["museum", "title", "date", "start_date", "end_date", "is_permanent",
+                 "topic", "url", "image_url", "location", "time", "category", "extra"]
+
+
+def cls(name: str) -> str:
+    """XPath 條件：class 裡有 name 這一個"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def cls_exact(value: str) -> str:
+    """XPath 條件：class 整串等於 value（bs4 的 class_="a b"）"""
+    return f"normalize-space(@class) = '{value}'"
+
+
+# --------------------
+# 七個館的 spec
+# --------------------
+SPECS = {
+    "songshan": {
+        "museum": songshan.MUSEUM_NAME,
+        "base_url": songshan.BASE_URL,
+        "date_profile": "songshan",
+        "listing": {
+            "url": songshan.EXHIBITIONS_URL,
+            "items": {"css": "div.rows"},
+            "fields": {"url": {"xpath": ".//a", "attr": "href", "urljoin": True}},
+            "require": ["url"],
+            "yields": "links",
+        },
+        "detail": {
+            "fields": {
+                "title": {"css": "p.inner_title"},
+                "date": {"xpath": f".//p[{cls_exact('date montsrt')}]"},
+                "location": {"css": "p.place"},
+                "image_url": {"css": "img.big_img", "attr": "src", "urljoin": True},
+            },
+        },
+    },
+    "npm": {
+        "museum": npm_museum.MUSEUM_NAME,
+        "base_url": npm_museum.BASE_URL,
+        "date_profile": "npm",
+        "listing": {
+            "url": npm_museum.EXHIBITIONS_URL,
+            "items": {"css": "li.mb-8"},
+            "fields": {
+                "title": {"first": [
+                    {"css": "h3.font-medium"},
+                    {"xpath": f".//h3[{cls_exact('card-title h5')}]"},
+                ]},
+                "date": {"first": [
+                    {"css": "div.exhibition-list-date"},
+                    {"xpath": f"(.//div[{cls('card-content-top')}])[1]/div[not(@class)]"},
+                ]},
+                "topic": {"first": [{"css": "div.mt-2"}, {"css": "div.card-tags"}]},
+                "location": {"css": "div.card-content-bottom"},
+                "url": {"xpath": ".//a", "attr": "href", "urljoin": True},
+                "image_url": {
+                    "xpath": ".//img", "attrs": ["data-src", "src"],
+                    "reject_contains": "loader.gif", "urljoin": True, "cut": "&",
+                },
+            },
+            "yields": "records",
+        },
+        "copy": {"category": "topic"},
+    },
+    "moca": {
+        "museum": moca.MUSEUM_NAME,
+        "base_url": moca.BASE_URL,
+        "date_profile": "moca",
+        "listing": {
+            "url": moca.EXHIBITIONS_URL,
+            "items": {"xpath": f"//div[{cls_exact('list show')}]"},
+            "fields": {
+                "url": {"css": "a.link", "attr": "href", "requote": True},
+                "title": {"css": "h3.imgTitle"},
+                "date": {"css": "p.day", "all": True, "join": " - ", "limit": 2},
+                "image_url": {"css": "img.img", "attrs": ["data-src"], "urljoin": True},
+                "location": {"css": "h4.imgSubTitle"},
+            },
+            "yields": "records",
+        },
+    },
+    "huashan": {
+        "museum": huashan.MUSEUM_NAME,
+        "base_url": huashan.BASE_URL,
+        "date_profile": "huashan",
+        "listing": {
+            # 列表是 JavaScript 輪播，要用 Selenium 開完後的 page_source
+            "render": "browser",
+            "url": huashan.EXHIBITIONS_URL,
+            # 跟 active 同一個輪播的每一張（loop 模式的 duplicate 不算）
+            "items": {"xpath": (
+                f"(//*[{cls('swiper-slide')} and {cls('swiper-slide-active')}])[1]"
+                f"/../*[{cls('swiper-slide')} and not({cls('swiper-slide-duplicate')})]/div"
+            )},
+            "fields": {
+                "url": {"xpath": "./img", "attr": "onclick", "regex": r"'(/[^']+)'", "group": 1, "urljoin": True},
+            },
+            "require": ["url"],
+            "yields": "links",
+        },
+        "detail": {
+            "fields": {
+                "title": {"xpath": f".//div[{cls_exact('article-title page')}]"},
+                "date": {"css": "div.card-date", "all": True, "join": " - ", "limit": 2},
+                "time": {"css": "div.card-time", "text": " ", "match": r"^\d"},
+                "image_url": {"css": "span[rel] img", "attrs": ["src"], "urljoin": True, "requote": True},
+                "location": {"css": "a.openMap"},
+            },
+        },
+    },
+    "fubon": {
+        "museum": fubon.MUSEUM_NAME,
+        "base_url": fubon.BASE_URL,
+        "date_profile": "fubon",
+        "listing": {
+            "url": fubon.EXHIBITIONS_URL,
+            "items": {"css": "a.fb-exhibitions-card"},
+            "fields": {
+                "url": {"self": True, "attr": "href", "missing": "", "urljoin": True},
+                "title": {"xpath": f"(.//div[{cls('info_group')}])[1]//h2[{cls_exact('font-h2 font-bold')}]"},
+                "date": {"xpath": f"(.//div[{cls('info_group')}])[3]//p", "index": 0},
+                "location": {"xpath": f"(.//div[{cls('info_group')}])[3]//p", "index": 1},
+                "image_url": {"xpath": ".//img", "attr": "src", "requote": True},
+            },
+            "yields": "records",
+        },
+    },
+    "tfam": {
+        "museum": "臺北市立美術館",
+        "base_url": "https://www.tfam.museum/",
+        "date_profile": "tfam",
+        "listing": {
+            # 列表由 JavaScript 產生，要用 Selenium 開完後的 page_source
+            "render": "browser",
+            "url": "https://www.tfam.museum/Exhibition/Exhibition.aspx?ddlLang=zh-tw",
+            "items": {"xpath": "/html/body/form/div[3]/div[3]/div/div[2]/div"},
+            "fields": {
+                "image_url": {"xpath": "./div[1]/img", "attr": "src", "urljoin": True},
+                "title": {"xpath": "./div[2]/h3/a", "text": " "},
+                "date": {"xpath": "./div[2]/p[1]", "text": " "},
+                "location": {"xpath": "./div[2]/p[2]", "text": " "},
+                "url": {
+                    "xpath": "./div[2]/div", "attr": "id", "slice": [-3, None],
+                    "format": "https://www.tfam.museum/Exhibition/Exhibition_Special.aspx?ddlLang=zh-tw&id={}",
+                },
+            },
+            "require_any": True,
+            "yields": "records",
+        },
+        "copy": {"time": "date"},
+    },
+    "ntnu": {
+        "museum": ntnu.MUSEUM_NAME,
+        "base_url": ntnu.BASE_URL,
+        "date_profile": "ntnu",
+        "missing": None,
+        "listing": {
+            "url": ntnu.BASE_URL,
+            "items": {"css": "figure.wp-caption"},
+            "fields": {
+                "title": {"xpath": ".//figcaption"},
+                "url": {"xpath": ".//a", "attr": "href"},
+                "image_url": {"xpath": ".//img", "attr": "src"},
+            },
+            "yields": "items",
+        },
+        "detail": {
+            "fields": {
+                "time": {"xpath": f".//div[{cls_exact('entry clr')}]", "text": "\n",
+                         "regex": r"(展覽時間|時間)[:：]\s*([^\n。]+)", "group": 2},
+                "location": {"xpath": f".//div[{cls_exact('entry clr')}]", "text": "\n",
+                             "regex": r"(展覽地點|地點)[:：]\s*([^\n。]+)", "group": 2},
+            },
+        },
+        "copy": {"date": "time"},
+    },
+}
+
+
+# --------------------
+# 編譯
+# --------------------
+_SKIP_TEXT = {"script", "style"}
+
+
+def _strings(el):
+    """跟 bs4 一樣依文件順序列出文字節點，略過註解與 <script> / <style> 的內容"""
+    if isinstance(el.tag, str) and el.tag not in _SKIP_TEXT:
+        if el.text:
+            yield el.text
+        for child in el:
+            yield from _strings(child)
+            if child.tail:
+                yield child.tail
+    # 註解 / script：內容不算，但後面的 tail 由上層處理
+
+
+def get_text(el, sep="") -> str:
+    """= bs4 的 el.get_text(sep, strip=True)"""
+    return sep.join(s for s in (t.strip() for t in _strings(el)) if s)
+
+
+def _compile_selector(sel: dict):
+    if "css" in sel:
+        # 相對於 item 的 CSS：轉成 descendant-or-self 的 XPath
+        return etree.XPath(CSSSelector(sel["css"]).path.replace("descendant-or-self::", ".//", 1))
+    if "xpath" in sel:
+        return etree.XPath(sel["xpath"])
+    return None
+
+
+class CompiledField:
+    def __init__(self, name, rule, base_url, missing):
+        self.name = name
+        self.rule = rule
+        self.base_url = base_url
+        self.missing = rule.get("missing", missing)
+        if "first" in rule:
+            self.selectors = [_compile_selector(s) for s in rule["first"]]
+        elif rule.get("self"):
+            self.selectors = None
+        else:
+            self.selectors = [_compile_selector(rule)]
+        self.regex = re.compile(rule["regex"]) if "regex" in rule else None
+        self.match = re.compile(rule["match"]) if "match" in rule else None
+
+    def _nodes(self, item):
+        if self.selectors is None:
+            return [item]
+        for xp in self.selectors:
+            nodes = xp(item)
+            if nodes:
+                return nodes
+        return []
+
+    def _value_of(self, node):
+        rule = self.rule
+        if "attr" in rule:
+            return node.get(rule["attr"])
+        if "attrs" in rule:
+            for name in rule["attrs"]:
+                if node.get(name):
+                    return node.get(name)
+            return None
+        return get_text(node, rule.get("text", ""))
+
+    def extract(self, item):
+        rule = self.rule
+        nodes = self._nodes(item)
+        if rule.get("all"):
+            texts = [self._value_of(n) for n in nodes]
+            texts = [t for t in texts if t is not None][: rule.get("limit")]
+            value = rule.get("join", "").join(texts) if texts else None
+        else:
+            index = rule.get("index", 0)
+            value = self._value_of(nodes[index]) if len(nodes) > index else None
+
+        if value is None:
+            value = self.missing
+            if value is None or not rule.get("self"):
+                return value
+        if self.regex is not None:
+            m = self.regex.search(value)
+            if not m:
+                return self.missing
+            value = m.group(rule.get("group", 0)).strip()
+        if self.match is not None and not self.match.search(value):
+            return self.missing
+        if "reject_contains" in rule and rule["reject_contains"] in value:
+            return self.missing
+        if "slice" in rule:
+            value = value[slice(*rule["slice"])]
+        if "format" in rule:
+            value = rule["format"].format(value)
+        if rule.get("urljoin"):
+            value = urljoin(self.base_url, value)
+        if "cut" in rule:
+            value = value.split(rule["cut"])[0]
+        if rule.get("requote"):
+            value = requote_uri(value)
+        return value
+
+
+def _parse_html(text):
+    if isinstance(text, str) and text.lstrip().startswith("<?xml"):
+        text = text.encode("utf-8")  # lxml 不接受帶 encoding 宣告的 str
+    return lxml_html.document_fromstring(text)
+
+
+class CompiledSpec:
+    def __init__(self, key: str, spec: dict):
+        self.key = key
+        self.spec = spec
+        self.missing = spec.get("missing", "")
+        base = spec.get("base_url", "")
+        self.listing = spec.get("listing")
+        self.detail = spec.get("detail")
+        if self.listing:
+            self.items_xpath = _compile_selector(self.listing["items"])
+            self.listing_fields = [CompiledField(n, r, base, self.missing) for n, r in self.listing["fields"].items()]
+        if self.detail:
+            self.detail_fields = [CompiledField(n, r, base, self.missing) for n, r in self.detail["fields"].items()]
+        self.date_parser = DATE_PROFILES.get(spec.get("date_profile"))
+
+    def parse_listing(self, text):
+        """列表頁 -> [{欄位: 值}, ...]"""
+        root = _parse_html(text)
+        items = []
+        for node in self.items_xpath(root):
+            fields = {f.name: f.extract(node) for f in self.listing_fields}
+            if any(not fields.get(name) for name in self.listing.get("require", ())):
+                continue
+            if self.listing.get("require_any") and not any(fields.values()):
+                continue
+            items.append(fields)
+        return items
+
+    def parse_detail(self, text):
+        root = _parse_html(text)
+        return {f.name: f.extract(root) for f in self.detail_fields}
+
+    def build_record(self, fields: dict, url=None) -> dict:
+        """欄位 -> 跟 fetch_* 一樣格式的展覽資料"""
+        record = {name: "" for name in RECORD_FIELDS}
+        record["museum"] = self.spec["museum"]
+        for name in ("title", "date", "topic", "url", "image_url", "location", "time", "category"):
+            if name in fields:
+                record[name] = fields[name]
+        if url is not None:
+            record["url"] = url
+        for dst, src in self.spec.get("copy", {}).items():
+            record[dst] = record[src]
+        if self.date_parser is not None:
+            record["start_date"], record["end_date"], record["is_permanent"] = self.date_parser(record["date"] or "")
+        return record
+
+    # 給 fetch 流程直接用的幾個入口
+    def listing_records(self, text):
+        return [self.build_record(f) for f in self.parse_listing(text)]
+
+    def listing_links(self, text):
+        return [f["url"] for f in self.parse_listing(text)]
+
+    def detail_record(self, text, url):
+        return self.build_record(self.parse_detail(text), url=url)
+
+
+_compiled = {}
+
+
+def compiled(key: str) -> CompiledSpec:
+    """同一個 spec 只編譯一次"""
+    if key not in _compiled:
+        _compiled[key] = CompiledSpec(key, SPECS[key])
+    return _compiled[key]
+
+
+# --------------------
+# 驗證 fixture：每個館一份最小的列表 / 內頁，涵蓋各種備援寫法
+# --------------------
+FIXTURES = {
+    "songshan": {
+        "listing": """<html><body>
+            <div class="rows"><a href="/exhibition/1">一</a></div>
+            <div class="rows other"><a href="https://www.songshanculturalpark.org/exhibition/2">二</a></div>
+            <div class="rows"><span>沒有連結</span></div>
+        </body></html>""",
+        "details": {
+            "https://www.songshanculturalpark.org/exhibition/1": """<html><body>
+                <p class="inner_title"> 松菸 <b>測試展</b> </p>
+                <p class="date montsrt">2025-11-01 - 2025-11-30</p>
+                <p class="place">五號倉庫<!-- 註解 --></p>
+                <img class="big_img" src="/gallery/a.jpg"><script>var x = 1;</script>
+            </body></html>""",
+            "https://www.songshanculturalpark.org/exhibition/2": """<html><body>
+                <p class="inner_title">只有開始日</p><p class="date">錯的 class</p>
+                <p class="date montsrt">2025-12-11</p>
+            </body></html>""",
+        },
+    },
+    "npm": {
+        "listing": """<html><body><ul>
+            <li class="mb-8"><a href="/Exhibition-Content.aspx?sno=1"><img data-src="/NewFileAtt.ashx?name=a.jpg&w=1" src="/loader.gif"></a>
+              <h3 class="font-medium">新版標題</h3><div class="exhibition-list-date">2025-10-10~2026-01-07</div>
+              <div class="mt-2">書畫</div><div class="card-content-bottom">北部院區 <span>202</span></div></li>
+            <li class="mb-8"><a href="/x2"><img src="/images/loader.gif"></a>
+              <h3 class="card-title h5">舊版標題</h3>
+              <div class="card-content-top"><div class="x">不是這個</div><div>2023-12-01~</div></div>
+              <div class="card-tags">器物</div></li>
+            <li class="mb-8"><h3 class="card-title">常設展</h3><div class="exhibition-list-date">常設展</div></li>
+        </ul></body></html>""",
+    },
+    "moca": {
+        "listing": """<html><body>
+            <div class="list show"><a class="link" href="https://www.moca.taipei/tw/展覽/1">x</a>
+              <img class="img" data-src="/upload/a.jpg"><h3 class="imgTitle">當代 展</h3>
+              <h4 class="imgSubTitle">一樓</h4><p class="day">10 / 04Sat.</p><p class="day">01 / 11Sun.</p><p class="day">多的</p></div>
+            <div class="list"><h3 class="imgTitle">沒顯示</h3></div>
+            <div class="list show"><img class="img" src="/no-data-src.jpg"><h3 class="imgTitle">無連結</h3></div>
+        </body></html>""",
+    },
+    "huashan": {
+        "listing": """<html><body><div class="swiper-slide swiper-slide-active">
+            <div><img onclick="location.href='/w/huashan1914/exhibition_23_123'"></div>
+            <div><img onclick="void(0)"></div>
+            <div><span>no image</span></div>
+        </div><div class="swiper-slide"><div><img onclick="x('/w/other')"></div></div></body></html>""",
+        "details": {
+            "https://www.huashan1914.com/w/huashan1914/exhibition_23_123": """<html><body>
+                <div class="article-title page">華山 測試</div>
+                <div class="card-date">202510.03(五)</div><div class="card-date">202511.30(日)</div>
+                <div class="card-time"> 11:00 <span>-</span> 20:00 </div>
+                <span rel="x"><img src="/uploads/展 覽 圖.jpg"></span>
+                <a class="openMap">中4B</a>
+            </body></html>""",
+            "https://www.huashan1914.com/w/huashan1914/exhibition_23_124": """<html><body>
+                <div class="article-title">不是標題</div><div class="card-time">依現場公告</div>
+            </body></html>""",
+        },
+    },
+    "fubon": {
+        "listing": """<html><body>
+            <a class="fb-exhibitions-card" href="/Exhibitions/1">
+              <div class="info_group"><h2 class="font-h2 font-bold">富邦 展</h2></div>
+              <div class="info_group"><p>分類</p></div>
+              <div class="info_group"><p>2025.10.23 - 2026.4.20</p><p>A 展廳</p></div>
+              <img src="https://backend.fubonartmuseum.org/Images/2_2592 x 1458.jpg"></a>
+            <a class="fb-exhibitions-card"><div class="info_group"><h2 class="font-h2">少一個 class</h2></div></a>
+        </body></html>""",
+    },
+    "ntnu": {
+        "listing": """<html><body>
+            <figure class="wp-caption"><a href="https://www.artmuse.ntnu.edu.tw/index.php/a/"><img src="/a.jpg"></a>
+              <figcaption>師大 <em>展</em></figcaption></figure>
+            <figure class="wp-caption"><img src="/b.jpg"></figure>
+        </body></html>""",
+        "details": {
+            "https://www.artmuse.ntnu.edu.tw/index.php/a/": """<html><body><div class="entry clr">
+                <p>展覽時間：2025/09/23 Tue.－2025/12/31</p><p>展覽地點：<b>B1 展廳</b>。其他</p></div></body></html>""",
+            "https://www.artmuse.ntnu.edu.tw/index.php/b/": "<html><body><div class='entry'>沒有</div></body></html>",
+        },
+    },
+}
+
+
+def bs4_parse(key: str, kind: str, text: str, url=None):
+    """同一份 HTML 用原本 bs4 版解析的結果"""
+    if kind == "listing":
+        return {
+            "songshan": lambda: songshan.parse_songshan_listing(text),
+            "npm": lambda: npm_museum.parse_npm_listing(text),
+            "moca": lambda: moca.parse_moca_listing(text),
+            "fubon": lambda: fubon.parse_fubon_listing(text),
+            "ntnu": lambda: ntnu.parse_ntnu_listing(text),
+        }[key]()
+    return {
+        "songshan": lambda: songshan.parse_songshan_detail(text, url),
+        "huashan": lambda: huashan.parse_huashan_detail(text, url),
+        "ntnu": lambda: ntnu.parse_ntnu_detail(text),
+    }[key]()
+
+
+def spec_parse(key: str, kind: str, text: str, url=None):
+    spec = compiled(key)
+    if kind == "listing":
+        yields = spec.listing["yields"]
+        if yields == "links":
+            return spec.listing_links(text)
+        if yields == "items":
+            return spec.parse_listing(text)
+        return spec.listing_records(text)
+    if key == "ntnu":
+        fields = spec.parse_detail(text)
+        return fields["time"], fields["location"]
+    return spec.detail_record(text, url)
+
+
+def verify_page(key: str, kind: str, text: str, url=None) -> list:
+    """比對 spec 跟 bs4 的結果，回傳差異說明（空 list = 一樣）"""
+    expected = bs4_parse(key, kind, text, url)
+    actual = spec_parse(key, kind, text, url)
+    if expected == actual:
+        return []
+    return [f"{key} {kind} {url or ''}\n    bs4 : {expected!r}\n    spec: {actual!r}"]
+
+
+def verify_fixtures() -> list:
+    problems = []
+    for key, fx in FIXTURES.items():
+        if "listing" in fx and SPECS[key]["listing"].get("render") != "browser":
+            problems += verify_page(key, "listing", fx["listing"])
+        for url, text in fx.get("details", {}).items():
+            problems += verify_page(key, "detail", text, url)
+    return problems
+
+
+def verify_recorded(record_dir: str) -> list:
+    """用錄製下來的真實頁面比對（parse_stage 認得的頁面）"""
+    import parse_stage
+
+    problems, checked = [], 0
+    for parser, content, encoding, url in parse_stage.load_recorded_jobs(record_dir):
+        key, kind = parser.split("_", 1)
+        if kind == "detail" and key not in ("songshan", "huashan", "ntnu"):
+            continue
+        text = content.decode(encoding or "utf-8", errors="replace")
+        problems += verify_page(key, kind, text, url)
+        checked += 1
+    print(f"🔍 比對了 {checked} 個錄製頁面")
+    return problems
+
+
+def benchmark(n: int):
+    """同樣的 fixture 頁面用 bs4 與編譯後的 spec 各解析 n 次"""
+    pages = []
+    for key, fx in FIXTURES.items():
+        if "listing" in fx and SPECS[key]["listing"].get("render") != "browser":
+            pages.append((key, "listing", fx["listing"], None))
+        pages += [(key, "detail", text, url) for url, text in fx.get("details", {}).items()]
+    filler = "<div class='nav'>" + "".join(f"<a href='/p{i}'>選單 {i}</a>" for i in range(300)) + "</div>"
+    pages = [(k, kind, text.replace("<body>", "<body>" + filler, 1), url) for k, kind, text, url in pages]
+
+    for label, fn in (("bs4 html.parser", bs4_parse), ("lxml spec", spec_parse)):
+        start = time.perf_counter()
+        for i in range(n):
+            key, kind, text, url = pages[i % len(pages)]
+            fn(key, kind, text, url)
+        seconds = time.perf_counter() - start
+        print(f"   {label:>16}：{n / seconds:8.1f} 頁/秒")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="宣告式擷取規則：驗證與 benchmark")
+    parser.add_argument("--verify", action="store_true", help="跟 bs4 版逐欄比對")
+    parser.add_argument("--record-dir", help="用錄製的頁面驗證（app.py --record）")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="解析 N 頁比較速度")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.verify or not args.benchmark:
+        problems = verify_fixtures()
+        if args.record_dir:
+            problems += verify_recorded(args.record_dir)
+        for p in problems:
+            print("❌", p)
+        print("✅ spec 與 bs4 結果一致" if not problems else f"⚠️ {len(problems)} 處不一致")
+    if args.benchmark:
+        benchmark(args.benchmark)
@@ -0,0 +1,357 @@
+"""
+每次爬取結果的歷史封存，可以查「某天的完整資料」與「某個展覽的變動歷史」。
+
+archive/
+  index.json            每個 segment 的時間、種類、用哪個字典、大小
+  ids.json              exhibition_id -> 有動到它的 segment 編號（查歷史時只解壓這些）
+  seg-000000.zst        keyframe：整份資料
+  seg-000001.zst        delta：跟上一次比的 added / changed（只存有變的欄位）/ removed
+  dict-000000.bin       zstd 壓縮字典（訓練一次，之後的 keyframe / delta 都共用）
+  raw/ab/abcdef....zst  原始 HTML（選用；http_client 錄下來的回應，用內容雜湊去重）
+
+- 每 KEYFRAME_EVERY 次存一份 keyframe，中間都是 delta
+- 壓縮：有 zstandard 而且資料夠多（至少 MIN_DICT_SAMPLES 筆）才訓練字典，
+  字典只訓練一次、之後一直沿用；訓練不了（或沒有 zstandard 改用 zlib）就不用字典直接壓
+- 結果不完整的館（失敗、略過、partial）沿用上一次的資料，不會被記成下架
+- as_of(D)：找 D 當天結束前最後一次爬取，只解壓它之前最近的 keyframe 到它本身
+- history(id)：只解壓 ids.json 記錄有動到這個展覽的 segment
+"""
+import hashlib
+import json
+import os
+import zlib
+from datetime import date, datetime
+
+try:
+    import zstandard
+except ImportError:  # zstandard 是選用的
+    zstandard = None
+
+import change_feed
+
+ARCHIVE_DIR = "archive"
+KEYFRAME_EVERY = 30
+DICT_SIZE = 32 * 1024
+MIN_DICT_SAMPLES = 100       # 筆數太少時 zstd 訓練不出有用的字典
+ZSTD_LEVEL = 19
+ZLIB_LEVEL = 9
+
+
+# --------------------
+# 壓縮（zstd 或 zlib；有訓練好的字典才用）
+# --------------------
+def _codec():
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def train_dictionary(samples):
+    """用這次的資料訓練 zstd 字典；沒有 zstandard 或樣本太少訓練不起來時回傳 None"""
+    samples = [s for s in samples if s]
+    if zstandard is None or len(samples) < MIN_DICT_SAMPLES:
+        return None
+    try:
+        return zstandard.train_dictionary(DICT_SIZE, samples).as_bytes()
+    except zstandard.ZstdError:
+        return None
+
+
+def compress(data: bytes, dictionary: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not dictionary:
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        d = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_AUTO)
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=d).compress(data)
+    obj = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(ZLIB_LEVEL)
+    return obj.compress(data) + obj.flush()
+
+
+def decompress(data: bytes, dictionary: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("這個封存用 zstd 壓縮，需要安裝 zstandard")
+        if not dictionary:
+            return zstandard.ZstdDecompressor().decompress(data)
+        d = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_AUTO)
+        return zstandard.ZstdDecompressor(dict_data=d).decompress(data)
+    obj = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return obj.decompress(data) + obj.flush()
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+# --------------------
+# 封存
+# --------------------
+class SnapshotArchive:
+    def __init__(self, path=ARCHIVE_DIR, keyframe_every=KEYFRAME_EVERY):
+        self.path = path
+        self.keyframe_every = keyframe_every
+        os.makedirs(path, exist_ok=True)
+        self.index = self._load_json("index.json", {"segments": []})
+        self.ids = self._load_json("ids.json", {})
+        self._dicts = {}
+
+    def _load_json(self, name, default):
+        p = os.path.join(self.path, name)
+        if not os.path.exists(p):
+            return default
+        with open(p, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_json(self, name, obj):
+        p = os.path.join(self.path, name)
+        tmp = p + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, p)
+
+    def _dictionary(self, seq) -> bytes:
+        """第 seq 個 segment 存的字典；seq = None 表示沒用字典"""
+        if seq is None:
+            return b""
+        if seq not in self._dicts:
+            with open(os.path.join(self.path, f"dict-{seq:06d}.bin"), "rb") as f:
+                self._dicts[seq] = f.read()
+        return self._dicts[seq]
+
+    @property
+    def segments(self):
+        return self.index["segments"]
+
+    def read_segment(self, seg: dict) -> dict:
+        with open(os.path.join(self.path, seg["file"]), "rb") as f:
+            data = f.read()
+        return json.loads(decompress(data, self._dictionary(seg["dict"]), seg["codec"]))
+
+    # ---------- 寫入 ----------
+    def _state_at(self, pos: int) -> dict:
+        """第 pos 個 segment（含）之後的完整資料"""
+        start = pos
+        while self.segments[start]["kind"] != "key":
+            start -= 1
+        state = {}
+        for seg in self.segments[start:pos + 1]:
+            payload = self.read_segment(seg)
+            if seg["kind"] == "key":
+                state = payload["rows"]
+                continue
+            for eid in payload["removed"]:
+                state.pop(eid, None)
+            state.update(payload["added"])
+            for eid, fields in payload["changed"].items():
+                state[eid] = {**state[eid], **fields}
+        return state
+
+    def append(self, rows, taken_at=None, raw_dir=None, complete=None) -> dict:
+        """
+        存一次爬取的結果（rows 需要有 exhibition_id）。
+        raw_dir：http_client --record 的資料夾，原始回應也一起存（相同內容只存一份）。
+        complete：結果完整的館別；不在裡面的館沿用上一次的資料（跟 change_feed.merge_state 一樣）。
+                  None = rows 就是完整的資料。
+        """
+        taken_at = taken_at or datetime.now().isoformat(timespec="seconds")
+        seq = len(self.segments)
+        is_key = seq == 0 or seq - self._last_key_seq() >= self.keyframe_every
+
+        prev = self._state_at(seq - 1) if seq else {}
+        if complete is None:
+            current = {row[change_feed.ID_FIELD]: dict(row) for row in rows}
+        else:
+            current = change_feed.merge_state(prev, [dict(row) for row in rows], museums=complete)
+        if is_key:
+            payload = {"rows": current}
+            # 只記錄跟上一次不同的展覽，查歷史時沒變的 keyframe 不用解壓
+            touched = [eid for eid, row in current.items() if prev.get(eid) != row]
+            touched += [eid for eid in prev if eid not in current]
+            dict_seq = self._dict_seq()
+            if dict_seq is None:
+                trained = train_dictionary([_dumps(r) for r in current.values()])
+                if trained is not None:
+                    with open(os.path.join(self.path, f"dict-{seq:06d}.bin"), "wb") as f:
+                        f.write(trained)
+                    self._dicts[seq] = trained
+                    dict_seq = seq
+            dictionary = self._dictionary(dict_seq)
+            counts = {"rows": len(current)}
+        else:
+            added = {eid: row for eid, row in current.items() if eid not in prev}
+            removed = [eid for eid in prev if eid not in current]
+            changed = {}
+            for eid, row in current.items():
+                old = prev.get(eid)
+                if old is None or old.get(change_feed.HASH_FIELD) == row.get(change_feed.HASH_FIELD):
+                    continue
+                diff = {k: v for k, v in row.items() if old.get(k) != v}
+                if diff:
+                    changed[eid] = diff
+            payload = {"added": added, "changed": changed, "removed": removed}
+            touched = list(added) + list(changed) + removed
+            dict_seq = self._dict_seq()
+            dictionary = self._dictionary(dict_seq)
+            counts = {"rows": len(current), "added": len(added), "changed": len(changed), "removed": len(removed)}
+
+        if raw_dir:
+            payload["raw"] = self._store_raw(raw_dir)
+
+        raw = _dumps(payload)
+        codec = _codec()
+        data = compress(raw, dictionary, codec)
+        name = f"seg-{seq:06d}.{'zst' if codec == 'zstd' else 'zz'}"
+        with open(os.path.join(self.path, name), "wb") as f:
+            f.write(data)
+
+        seg = {
+            "seq": seq, "kind": "key" if is_key else "delta", "taken_at": taken_at,
+            "file": name, "dict": dict_seq, "codec": codec,
+            "raw_bytes": len(raw), "bytes": len(data), **counts,
+        }
+        self.segments.append(seg)
+        for eid in touched:
+            self.ids.setdefault(eid, []).append(seq)
+        self._save_json("index.json", self.index)
+        self._save_json("ids.json", self.ids)
+        return seg
+
+    def _dict_seq(self):
+        """目前沿用的字典：最後一個 segment 用的（zstd 才有；之前沒訓練成功是 None）"""
+        if not self.segments or self.segments[-1]["codec"] != _codec():
+            return None
+        return self.segments[-1]["dict"]
+
+    def _last_key_seq(self) -> int:
+        for seg in reversed(self.segments):
+            if seg["kind"] == "key":
+                return seg["seq"]
+        return -1
+
+    def _store_raw(self, raw_dir: str) -> dict:
+        """錄下來的回應 -> {網址: 內容雜湊}；內容存到 raw/，已經有的不重存"""
+        refs = {}
+        if not os.path.isdir(raw_dir):
+            return refs
+        for name in sorted(os.listdir(raw_dir)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(raw_dir, name), "rb") as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()
+            path = os.path.join(self.path, "raw", digest[:2], digest + ".z")
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(zlib.compress(body, ZLIB_LEVEL))
+            refs[json.loads(body).get("url", name)] = digest
+        return refs
+
+    def raw_response(self, digest: str) -> dict:
+        """讀回一個原始回應（http_client 的錄製格式）"""
+        with open(os.path.join(self.path, "raw", digest[:2], digest + ".z"), "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    # ---------- 查詢 ----------
+    def as_of(self, when) -> dict:
+        """
+        when（date / datetime / ISO 字串）當時最新的一份資料：{exhibition_id: row}。
+        只給日期時，算到當天結束。
+        """
+        if isinstance(when, datetime):
+            limit = when.isoformat(timespec="seconds")
+        elif isinstance(when, date):
+            limit = f"{when.isoformat()}T23:59:59"
+        else:
+            limit = when if "T" in when else f"{when}T23:59:59"
+        pos = None
+        for i, seg in enumerate(self.segments):
+            if seg["taken_at"] <= limit:
+                pos = i
+        return {} if pos is None else self._state_at(pos)
+
+    def history(self, exhibition_id: str):
+        """
+        某個展覽每次有變動的版本：[(時間, 事件, 當時的完整資料 或 None), ...]
+        事件：added / changed / removed
+        """
+        events = []
+        row = None
+        for seq in self.ids.get(exhibition_id, []):
+            seg = self.segments[seq]
+            payload = self.read_segment(seg)
+            if seg["kind"] == "key":
+                new = payload["rows"].get(exhibition_id)
+                if new is None:
+                    kind = "removed"
+                else:
+                    kind = "changed" if row is not None else "added"
+                row = new
+            elif exhibition_id in payload["added"]:
+                kind, row = "added", payload["added"][exhibition_id]
+            elif exhibition_id in payload["changed"]:
+                kind = "changed"
+                row = {**(row or {}), **payload["changed"][exhibition_id]}
+            elif exhibition_id in payload["removed"]:
+                kind, row = "removed", None
+            else:
+                continue
+            events.append((seg["taken_at"], kind, row))
+        return events
+
+    def stats(self) -> dict:
+        """stored_bytes 含字典檔（壓縮比要算進字典本身的大小）"""
+        raw = sum(s["raw_bytes"] for s in self.segments)
+        dict_bytes = sum(
+            os.path.getsize(os.path.join(self.path, f"dict-{seq:06d}.bin"))
+            for seq in {s["dict"] for s in self.segments if s["dict"] is not None}
+        )
+        stored = sum(s["bytes"] for s in self.segments) + dict_bytes
+        return {
+            "snapshots": len(self.segments),
+            "keyframes": sum(1 for s in self.segments if s["kind"] == "key"),
+            "raw_bytes": raw,
+            "dict_bytes": dict_bytes,
+            "stored_bytes": stored,
+            "ratio": round(raw / stored, 1) if stored else None,
+        }
+
+
+def archive_run(rows, path=ARCHIVE_DIR, raw_dir=None, complete=None) -> dict:
+    archive = SnapshotArchive(path)
+    seg = archive.append(rows, raw_dir=raw_dir, complete=complete)
+    s = archive.stats()
+    print(
+        f"🗄️ 封存第 {seg['seq']} 次（{'keyframe' if seg['kind'] == 'key' else 'delta'}，"
+        f"{seg['bytes']:,} bytes）；累計 {s['snapshots']} 次、壓縮比 {s['ratio']}x"
+    )
+    return seg
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查詢歷史封存")
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("as-of", help="某天的完整資料（輸出 CSV 到 stdout）")
+    p.add_argument("date")
+    p = sub.add_parser("history", help="某個展覽的變動歷史")
+    p.add_argument("exhibition_id")
+    sub.add_parser("stats")
+    args = parser.parse_args()
+
+    archive = SnapshotArchive(args.archive)
+    if args.command == "as-of":
+        import csv
+        import sys
+
+        rows = list(archive.as_of(args.date).values())
+        if rows:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    elif args.command == "history":
+        for taken_at, kind, row in archive.history(args.exhibition_id):
+            title = row.get("展覽名稱", "") if row else ""
+            print(f"{taken_at}  {kind:<8}  {title}")
+    else:
+        print(json.dumps(archive.stats(), ensure_ascii=False))
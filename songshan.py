@@ -1,11 +1,10 @@
 import requests as req
 from bs4 import BeautifulSoup as bs
 from urllib.parse import urljoin
-import urllib3
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+from http_client import session, DeadlineExceeded
+import checkpoint
+import pagination
 
 
 def parse_songshan_date(raw: str):
@@ -53,73 +52,112 @@ def parse_songshan_date(raw: str):
     return None, None, 0
 
 
-def fetch_songshan_exhibitions():
-    base_url = "https://www.songshanculturalpark.org/"
-    exhs_url = "https://www.songshanculturalpark.org/exhibition"
-    museum_name = "松山文創園區"
+BASE_URL = "https://www.songshanculturalpark.org/"
+EXHIBITIONS_URL = "https://www.songshanculturalpark.org/exhibition"
+MUSEUM_NAME = "松山文創園區"
 
-    resp = session.get(exhs_url, timeout=20)
-    resp.raise_for_status()
-    html = bs(resp.text, "html.parser")
-    exhs = html.find_all("div", class_="rows")
 
-    results = []
+def parse_songshan_listing(text: str):
+    """列表頁 HTML -> 所有展覽內頁的連結（純解析，不連網）"""
+    html = bs(text, "html.parser")
 
-    for exh in exhs:
-        # 展覽連結
-        link = ""
+    links = []
+    for exh in html.find_all("div", class_="rows"):
         a = exh.find("a")
         if a and a.has_attr("href"):
-            link = urljoin(base_url, a["href"])
+            links.append(urljoin(BASE_URL, a["href"]))
+    return links
+
+
+def list_songshan_links():
+    """列表頁（所有分頁同時抓）-> 所有展覽內頁的連結，已去重"""
+    return pagination.fetch_all(EXHIBITIONS_URL, parse_songshan_listing)
+
+
+def parse_songshan_detail(text: str, link: str):
+    """內頁 HTML -> 展覽資料（純解析，不連網）"""
+    ex_html = bs(text, "html.parser")
+
+    # 展覽名稱
+    title = ""
+    ex_title = ex_html.find("p", class_="inner_title")
+    if ex_title:
+        title = ex_title.get_text(strip=True)
+
+    # 展覽日期（原始字串）
+    ex_date = ""
+    date_tag = ex_html.find("p", class_="date montsrt")
+    if date_tag:
+        ex_date = date_tag.get_text(strip=True)
+
+    # 解析成 start_date / end_date / is_permanent
+    start_date, end_date, is_permanent = parse_songshan_date(ex_date)
+
+    # 展覽地點
+    place = ""
+    place_tag = ex_html.find("p", class_="place")
+    if place_tag:
+        place = place_tag.get_text(strip=True)
+
+    # 展覽圖片
+    img = ""
+    img_tag = ex_html.find("img", class_="big_img")
+    if img_tag and img_tag.has_attr("src"):
+        img = urljoin(BASE_URL, img_tag["src"])
+
+    return {
+        "museum": MUSEUM_NAME,
+        "title": title,
+        "date": ex_date,           # 原始日期字串
+        "start_date": start_date,  # 解析後開始日期
+        "end_date": end_date,      # 解析後結束日期
+        "is_permanent": is_permanent,  # 0: 一般展期, 1: 常設/長期展
+        "topic": "",
+        "url": link,
+        "image_url": img,
+        "location": place,
+        "time": "",
+        "category": "",
+        "extra": "",
+    }
+
+
+def fetch_songshan_detail(link: str):
+    """抓一個展覽內頁，回傳展覽資料（連線錯誤直接往外丟）"""
+    ex_resp = session.get(link, timeout=20)
+    ex_resp.raise_for_status()
+    return parse_songshan_detail(ex_resp.text, link)
+
+
+def fetch_songshan_exhibitions():
+    # 循環 import：parse_stage 註冊解析器時需要這個模組
+    import parse_stage
+
+    links = list_songshan_links()
+    records, pages = {}, []
+
+    # 先下載所有內頁，解析統一交給 parse_stage 的 process pool
+    for link in links:
+        # 上次中斷前已經抓過的內頁（--resume）
+        cached = checkpoint.load_detail(link)
+        if cached is not None:
+            records[link] = cached
+            continue
 
-        if not link:
+        try:
+            ex_resp = session.get(link, timeout=20)
+            ex_resp.raise_for_status()
+        except DeadlineExceeded:
+            print("⏰ 時間預算用完，松山只回傳已抓到的部分")
+            break
+        except req.RequestException as e:
+            print(f"⚠️ 松山展覽頁抓取失敗，略過：{link}（{e!r}）")
+            checkpoint.note_skipped(link)
             continue
+        pages.append((link, ex_resp.content, ex_resp.encoding))
+
+    for link, record in parse_stage.parse_pages("songshan_detail", pages):
+        checkpoint.save_detail(link, record)
+        records[link] = record
 
-        ex_resp = session.get(link, timeout=20)
-        ex_resp.raise_for_status()
-        ex_html = bs(ex_resp.text, "html.parser")
-
-        # 展覽名稱
-        title = ""
-        ex_title = ex_html.find("p", class_="inner_title")
-        if ex_title:
-            title = ex_title.get_text(strip=True)
-
-        # 展覽日期（原始字串）
-        ex_date = ""
-        date_tag = ex_html.find("p", class_="date montsrt")
-        if date_tag:
-            ex_date = date_tag.get_text(strip=True)
-
-        # 解析成 start_date / end_date / is_permanent
-        start_date, end_date, is_permanent = parse_songshan_date(ex_date)
-
-        # 展覽地點
-        place = ""
-        place_tag = ex_html.find("p", class_="place")
-        if place_tag:
-            place = place_tag.get_text(strip=True)
-
-        # 展覽圖片
-        img = ""
-        img_tag = ex_html.find("img", class_="big_img")
-        if img_tag and img_tag.has_attr("src"):
-            img = urljoin(base_url, img_tag["src"])
-
-        results.append({
-            "museum": museum_name,
-            "title": title,
-            "date": ex_date,           # 原始日期字串
-            "start_date": start_date,  # 解析後開始日期
-            "end_date": end_date,      # 解析後結束日期
-            "is_permanent": is_permanent,  # 0: 一般展期, 1: 常設/長期展
-            "topic": "",
-            "url": link,
-            "image_url": img,
-            "location": place,
-            "time": "",
-            "category": "",
-            "extra": "",
-        })
-
-    return results
+    return [records[link] for link in links if link in records]
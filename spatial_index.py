@@ -0,0 +1,197 @@
+"""
+taipei_museums_info.csv 的空間索引：找最近的 k 個館、找半徑內的館。
+
+- 經緯度先投影成以資料中心為原點的平面座標（公尺，等距圓柱投影，
+  雙北範圍內誤差遠小於 0.1%）
+- 單點查詢用均勻網格（grid）：只看查詢點附近的格子
+- 大量查詢（地圖每次平移都有很多使用者位置）用 NumPy 一次算整批
+
+用法：
+    index = VenueIndex.from_csv("taipei_museums_info.csv")
+    idx, dist = index.nearest(25.0478, 121.5170, k=5)
+    index.rows(idx)
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_CELL_M = 500.0
+BATCH_CHUNK = 2048  # 一批查詢切成幾個一組算，控制記憶體
+
+
+class VenueIndex:
+    def __init__(self, df: pd.DataFrame, lat_col="緯度", lng_col="經度", cell_m=DEFAULT_CELL_M):
+        df = df.dropna(subset=[lat_col, lng_col]).reset_index(drop=True)
+        self.df = df
+        lat = df[lat_col].to_numpy(dtype=np.float64)
+        lng = df[lng_col].to_numpy(dtype=np.float64)
+
+        # 投影原點 = 資料中心
+        self.lat0 = float(lat.mean()) if len(lat) else 25.0
+        self.lng0 = float(lng.mean()) if len(lng) else 121.5
+        self._kx = EARTH_RADIUS_M * math.cos(math.radians(self.lat0)) * math.pi / 180
+        self._ky = EARTH_RADIUS_M * math.pi / 180
+        self.xy = self.project(lat, lng)
+
+        # 網格：每個點所在格子 -> 依格子排序後記錄每格的起訖位置
+        self.cell_m = cell_m
+        cells = np.floor(self.xy / cell_m).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        self._order = order
+        self._cells = {}
+        if len(order):
+            sorted_cells = cells[order]
+            change = np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)
+            starts = np.concatenate(([0], np.nonzero(change)[0] + 1))
+            ends = np.concatenate((starts[1:], [len(order)]))
+            for s, e in zip(starts, ends):
+                cx, cy = sorted_cells[s]
+                self._cells[(int(cx), int(cy))] = (s, e)
+        if len(cells):
+            self._cell_min = cells.min(axis=0)
+            self._cell_max = cells.max(axis=0)
+
+    @classmethod
+    def from_csv(cls, path="taipei_museums_info.csv", **kwargs):
+        return cls(pd.read_csv(path, encoding="utf-8-sig"), **kwargs)
+
+    def __len__(self):
+        return len(self.xy)
+
+    # --------------------
+    # 座標
+    # --------------------
+    def project(self, lat, lng) -> np.ndarray:
+        """經緯度 -> 平面座標（公尺），支援純量或陣列"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        return np.stack(((lng - self.lng0) * self._kx, (lat - self.lat0) * self._ky), axis=-1)
+
+    def rows(self, idx):
+        """索引 -> 館的資料（list of dict）"""
+        return self.df.iloc[np.asarray(idx, dtype=np.int64)].to_dict("records")
+
+    # --------------------
+    # 單點查詢（網格）
+    # --------------------
+    def _ring(self, cx: int, cy: int, r: int):
+        """以 (cx, cy) 為中心、第 r 圈的格子裡的點"""
+        if r == 0:
+            keys = [(cx, cy)]
+        else:
+            keys = [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in (-r, r)]
+            keys += [(cx + dx, cy + dy) for dx in (-r, r) for dy in range(-r + 1, r)]
+        parts = [self._order[s:e] for s, e in (self._cells.get(k, (0, 0)) for k in keys)]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def nearest(self, lat: float, lng: float, k: int = 1):
+        """最近的 k 個館：回傳 (索引陣列, 距離公尺陣列)，由近到遠"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        q = self.project(lat, lng)
+        cx, cy = (int(v) for v in np.floor(q / self.cell_m))
+        max_r = int(max(
+            abs(cx - self._cell_min[0]), abs(cx - self._cell_max[0]),
+            abs(cy - self._cell_min[1]), abs(cy - self._cell_max[1]),
+        ))
+
+        found = []
+        count = 0
+        r = 0
+        while r <= max_r:
+            ring = self._ring(cx, cy, r)
+            if len(ring):
+                found.append(ring)
+                count += len(ring)
+            # 已經有 k 個，而且下一圈不可能比目前第 k 近的更近
+            if count >= k:
+                cand = np.concatenate(found)
+                d = np.hypot(*(self.xy[cand] - q).T)
+                kth = np.partition(d, k - 1)[k - 1]
+                if kth <= r * self.cell_m:
+                    break
+            r += 1
+
+        cand = np.concatenate(found)
+        d = np.hypot(*(self.xy[cand] - q).T)
+        top = np.argsort(d, kind="stable")[:k]
+        return cand[top], d[top]
+
+    def within(self, lat: float, lng: float, radius_m: float):
+        """半徑內的館：回傳 (索引陣列, 距離公尺陣列)，由近到遠"""
+        q = self.project(lat, lng)
+        lo = np.floor((q - radius_m) / self.cell_m).astype(np.int64)
+        hi = np.floor((q + radius_m) / self.cell_m).astype(np.int64)
+
+        parts = []
+        for cx in range(lo[0], hi[0] + 1):
+            for cy in range(lo[1], hi[1] + 1):
+                span = self._cells.get((cx, cy))
+                if span:
+                    parts.append(self._order[span[0]:span[1]])
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        cand = np.concatenate(parts)
+        d = np.hypot(*(self.xy[cand] - q).T)
+        keep = d <= radius_m
+        cand, d = cand[keep], d[keep]
+        order = np.argsort(d, kind="stable")
+        return cand[order], d[order]
+
+    # --------------------
+    # 批次查詢（NumPy 向量化）
+    # --------------------
+    def _sq_distance_chunks(self, lats, lngs):
+        """|q - p|^2 = |q|^2 + |p|^2 - 2 q·p，用矩陣乘法一次算一整塊"""
+        q = self.project(lats, lngs).reshape(-1, 2)
+        p_sq = np.einsum("ij,ij->i", self.xy, self.xy)
+        for s in range(0, len(q), BATCH_CHUNK):
+            chunk = q[s:s + BATCH_CHUNK]
+            d2 = np.einsum("ij,ij->i", chunk, chunk)[:, None] + p_sq[None, :] - 2.0 * (chunk @ self.xy.T)
+            np.maximum(d2, 0.0, out=d2)
+            yield s, d2
+
+    def nearest_batch(self, lats, lngs, k: int = 1):
+        """
+        很多個位置一起查最近的 k 個館。
+        回傳 (索引 shape=(M, k), 距離 shape=(M, k))，每列由近到遠。
+        """
+        k = min(k, len(self))
+        m = np.asarray(lats).size
+        idx_out = np.empty((m, k), dtype=np.int64)
+        dist_out = np.empty((m, k))
+        for s, d2 in self._sq_distance_chunks(lats, lngs):
+            if k < d2.shape[1]:
+                part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            else:
+                part = np.broadcast_to(np.arange(d2.shape[1]), d2.shape).copy()
+            part_d2 = np.take_along_axis(d2, part, axis=1)
+            order = np.argsort(part_d2, axis=1, kind="stable")
+            idx_out[s:s + len(d2)] = np.take_along_axis(part, order, axis=1)
+            dist_out[s:s + len(d2)] = np.sqrt(np.take_along_axis(part_d2, order, axis=1))
+        return idx_out, dist_out
+
+    def within_batch(self, lats, lngs, radius_m: float):
+        """很多個位置一起查半徑內的館，回傳每個位置的 (索引陣列, 距離陣列) list"""
+        out = []
+        r2 = radius_m * radius_m
+        for _, d2 in self._sq_distance_chunks(lats, lngs):
+            rows, cols = np.nonzero(d2 <= r2)
+            splits = np.searchsorted(rows, np.arange(1, len(d2)))
+            for row, hit in zip(d2, np.split(cols, splits)):
+                dist = np.sqrt(row[hit])
+                order = np.argsort(dist, kind="stable")
+                out.append((hit[order], dist[order]))
+        return out
+
+
+if __name__ == "__main__":
+    index = VenueIndex.from_csv()
+    idx, dist = index.nearest(25.0478, 121.5170, k=5)  # 台北車站
+    for row, d in zip(index.rows(idx), dist):
+        print(f"{d:8.0f} m  {row['館名']}")
@@ -0,0 +1,229 @@
+"""
+把展覽輸出成靜態 JSON 分片，直接丟到 CDN / 靜態主機，讀取不需要跑任何程式。
+
+static/
+  manifest.json              每個分片的 sha256、筆數、大小（客戶端先看這個決定要不要重抓）
+  museums/<slug>.json        每個館一份
+  months/YYYY-MM.json        每個月一份：start_date ~ end_date 跟該月有重疊的展覽
+  months/permanent.json      常設展
+  months/undated.json        沒有日期的展覽
+  _headers                   快取標頭（Netlify / Cloudflare Pages 格式）
+
+每份分片另外預先壓好 .json.gz（有安裝 brotli 的話還有 .json.br），
+內容沒變的分片不重寫，檔案時間不變，CDN 與客戶端的快取都不會失效。
+分片內容跟 CSV 一致：這次沒有資料的館 / 月份，舊分片會被移除。
+只有結果完整的館（complete）才這樣處理；失敗、略過或 partial 的館沿用舊分片裡的資料，
+不會因為一次抓取失敗就把整館從靜態分片拿掉。
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import date
+
+try:
+    import brotli
+except ImportError:  # brotli 是選用的
+    brotli = None
+
+import change_feed
+
+EXPORT_DIR = "static"
+# 沒有結束日期的展覽，最多只往後列幾個月
+OPEN_ENDED_MONTHS = 12
+# 月份分片只涵蓋今天前後這段期間；期間很長的展覽（例如 2000 ~ 2099）截到這個範圍內，
+# 還在展的月份一定會列到
+MONTHS_BEFORE = 24
+MONTHS_AFTER = 36
+# brotli 11 比 9 只小幾 %，卻慢 10 倍以上（benchmark.py：大量資料時 9 成時間都在壓縮）
+BROTLI_QUALITY = 9
+
+HEADERS = """/manifest.json
+  Cache-Control: no-cache
+/museums/*
+  Cache-Control: public, max-age=300, stale-while-revalidate=86400
+/months/*
+  Cache-Control: public, max-age=300, stale-while-revalidate=86400
+"""
+
+
+def museum_slug(name: str) -> str:
+    """館別 -> 網址安全的檔名"""
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:10]
+
+
+def _parse_month(value):
+    try:
+        d = date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+    return d.year, d.month
+
+
+def _add_months(ym, n):
+    y, m = ym
+    total = y * 12 + (m - 1) + n
+    return total // 12, total % 12 + 1
+
+
+def month_window(today=None):
+    """月份分片的範圍：(最早的月, 最晚的月)"""
+    today = today or date.today()
+    ym = (today.year, today.month)
+    return _add_months(ym, -MONTHS_BEFORE), _add_months(ym, MONTHS_AFTER)
+
+
+def month_keys(row: dict, today=None):
+    """這筆展覽屬於哪些月份分片（只列 month_window 裡的月份）"""
+    if str(row.get("is_permanent", "")) in ("1", "True", "true"):
+        return ["permanent"]
+    start = _parse_month(row.get("start_date") or "")
+    end = _parse_month(row.get("end_date") or "")
+    if start is None and end is None:
+        return ["undated"]
+    if start is None:
+        start = end
+    if end is None:
+        end = _add_months(start, OPEN_ENDED_MONTHS - 1)
+    if end < start:
+        start, end = end, start
+    first, last = month_window(today)
+    start, end = max(start, first), min(end, last)
+
+    keys = []
+    ym = start
+    while ym <= end:
+        keys.append(f"{ym[0]:04d}-{ym[1]:02d}")
+        ym = _add_months(ym, 1)
+    return keys
+
+
+def _encode(fields, rows) -> bytes:
+    """欄位名稱只寫一次，每筆資料是一個 list，比 list of dict 小很多"""
+    body = {"fields": fields, "rows": [[r.get(f, "") for f in fields] for r in rows]}
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write(path, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_shard(out_dir, rel, data: bytes) -> dict:
+    path = os.path.join(out_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write(path, data)
+    # mtime=0：內容一樣時 gzip 結果也一樣
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    _write(path + ".gz", gz)
+    info = {"bytes": len(data), "gzip_bytes": len(gz)}
+    if brotli is not None:
+        br = brotli.compress(data, quality=BROTLI_QUALITY)
+        _write(path + ".br", br)
+        info["br_bytes"] = len(br)
+    return info
+
+
+def _load_manifest(out_dir) -> dict:
+    path = os.path.join(out_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("shards", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _remove_shard(out_dir, rel):
+    for suffix in ("", ".gz", ".br"):
+        path = os.path.join(out_dir, rel + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _read_shard(out_dir, rel):
+    """讀回舊分片的資料（list of dict）；讀不到回傳 []"""
+    try:
+        with open(os.path.join(out_dir, rel), encoding="utf-8") as f:
+            body = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [dict(zip(body["fields"], values)) for values in body["rows"]]
+
+
+def carry_forward(rows, complete, out_dir=EXPORT_DIR):
+    """
+    不在 complete 裡的館：舊分片的資料 + 這次抓到的（同一個 exhibition_id 用這次的）。
+    complete 是 None 時 rows 就是完整的資料，原樣回傳。
+    """
+    if complete is None:
+        return list(rows)
+    key = change_feed.ID_FIELD
+    current = {row.get(key) for row in rows}
+    kept = []
+    for rel, info in _load_manifest(out_dir).items():
+        if "museum" not in info or info["museum"] in complete:
+            continue
+        kept.extend(r for r in _read_shard(out_dir, rel) if r.get(key) not in current)
+    if kept:
+        print(f"   ↪️ 沿用上一次的靜態分片 {len(kept)} 筆（結果不完整的館）")
+    return kept + list(rows)
+
+
+def export(rows, fields, out_dir=EXPORT_DIR, complete=None) -> dict:
+    """
+    依 rows 寫出所有分片與 manifest，回傳 {written, unchanged, removed}。
+    complete：結果完整的館別（見 carry_forward）；None = rows 就是完整的資料。
+    """
+    rows = carry_forward(rows, complete, out_dir)
+    shards = {}
+    for row in rows:
+        name = row.get("館別", "")
+        shards.setdefault(f"museums/{museum_slug(name)}.json", {"museum": name, "rows": []})["rows"].append(row)
+        for key in month_keys(row):
+            shards.setdefault(f"months/{key}.json", {"rows": []})["rows"].append(row)
+
+    previous = _load_manifest(out_dir)
+    manifest = {}
+    written = unchanged = 0
+    for rel in sorted(shards):
+        data = _encode(fields, shards[rel]["rows"])
+        digest = hashlib.sha256(data).hexdigest()
+        old = previous.get(rel)
+        if old and old.get("sha256") == digest and os.path.exists(os.path.join(out_dir, rel)):
+            manifest[rel] = old
+            unchanged += 1
+            continue
+        info = _write_shard(out_dir, rel, data)
+        info.update({"sha256": digest, "records": len(shards[rel]["rows"])})
+        if "museum" in shards[rel]:
+            info["museum"] = shards[rel]["museum"]
+        manifest[rel] = info
+        written += 1
+
+    removed = [rel for rel in previous if rel not in manifest]
+    for rel in removed:
+        _remove_shard(out_dir, rel)
+
+    os.makedirs(out_dir, exist_ok=True)
+    if written or removed or not os.path.exists(os.path.join(out_dir, "manifest.json")):
+        body = {"version": 1, "fields": fields, "shards": manifest}
+        _write(os.path.join(out_dir, "manifest.json"),
+               json.dumps(body, ensure_ascii=False, indent=1).encode("utf-8"))
+    headers_path = os.path.join(out_dir, "_headers")
+    if not os.path.exists(headers_path):
+        _write(headers_path, HEADERS.encode("utf-8"))
+
+    print(f"🗂️ 靜態分片：寫入 {written}、未變 {unchanged}、移除 {len(removed)}（{out_dir}/）")
+    return {"written": written, "unchanged": unchanged, "removed": len(removed)}
+
+
+if __name__ == "__main__":
+    import csv
+
+    with open("all_museums_exhibitions.csv", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        export(list(reader), reader.fieldnames)
@@ -0,0 +1,121 @@
+"""
+museums_info.py / places_tiling.py 對著本機假 Places 伺服器（fake_places_server.py）跑：
+翻頁、回應快取、地理切塊。
+
+    python -m pytest tests
+"""
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import museums_info
+import places_tiling
+from fake_places_server import MAX_RESULTS, FakePlacesServer, synthetic_places
+
+
+class PlacesHarvestTest(unittest.TestCase):
+    places = synthetic_places(300)
+
+    def setUp(self):
+        self.server = FakePlacesServer(self.places).start()
+        self.tmp = tempfile.mkdtemp(prefix="places-test-")
+        self._saved = (museums_info.BASE_URL, museums_info.CACHE_DIR, dict(museums_info.call_stats))
+        museums_info.BASE_URL = self.server.url
+        museums_info.CACHE_DIR = os.path.join(self.tmp, "cache")
+        museums_info.call_stats.update(api_calls=0, cache_hits=0)
+
+    def tearDown(self):
+        museums_info.BASE_URL, museums_info.CACHE_DIR, stats = self._saved
+        museums_info.call_stats.update(stats)
+        self.server.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    # --------------------
+    # 翻頁
+    # --------------------
+    def test_follows_next_page_token(self):
+        places = museums_info.search_text_all_pages("博物館", use_cache=False,
+                                                    extra_body={"includedType": "museum"})
+        self.assertEqual(len(places), MAX_RESULTS)
+        self.assertEqual(len({p["id"] for p in places}), MAX_RESULTS)
+        self.assertTrue(all("museum" in p["types"] for p in places))
+
+        # 第一頁不帶 token，之後每頁都帶上一頁的 token
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertNotIn("pageToken", self.server.requests[0])
+        self.assertTrue(all("pageToken" in r for r in self.server.requests[1:]))
+
+    def test_last_page_without_token(self):
+        body = {"textQuery": "博物館", "includedType": "museum", "pageSize": 20,
+                "locationRestriction": places_tiling._rectangle((24.67, 121.28, 25.0, 121.65))}
+        res = museums_info.search_all_pages(body, use_cache=False)
+        expected = len(self.server.matches(dict(body)))
+        self.assertLess(expected, MAX_RESULTS)
+        self.assertEqual(len(res["places"]), expected)
+        self.assertEqual(res["calls"], -(-expected // 20))
+
+    # --------------------
+    # 快取
+    # --------------------
+    def test_cached_harvest_makes_no_calls(self):
+        queries = ["博物館", "美術館", "museum in Taipei City"]
+        first = museums_info.harvest(queries, workers=3)
+        calls = len(self.server.requests)
+        self.assertEqual(calls, museums_info.call_stats["api_calls"])
+        self.assertEqual([q for q, _ in first], queries)
+
+        second = museums_info.harvest(queries, workers=3)
+        self.assertEqual(len(self.server.requests), calls)
+        self.assertEqual(museums_info.call_stats["cache_hits"], len(queries))
+        self.assertEqual(first, second)
+
+    def test_no_cache_always_calls(self):
+        museums_info.harvest(["博物館"], use_cache=False)
+        museums_info.harvest(["博物館"], use_cache=False)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertFalse(os.path.exists(museums_info.CACHE_DIR))
+
+    def test_page_token_requests_are_not_cached(self):
+        museums_info.search_text_all_pages("博物館")
+        # 只有整串結果寫進快取，帶 token 的各頁沒有
+        self.assertEqual(len(os.listdir(museums_info.CACHE_DIR)), 1)
+
+    # --------------------
+    # 地理切塊
+    # --------------------
+    def test_tiles_find_every_place(self):
+        report = os.path.join(self.tmp, "tiles.csv")
+        found = places_tiling.harvest_tiles(workers=4, report_path=report)
+
+        # 關鍵字查詢最多 60 筆；切塊會一直切到每塊都拿得完
+        self.assertEqual(set(found), {p["id"] for p in self.places})
+        with open(report, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows[0]["tile"], "r")
+        self.assertEqual(rows[0]["subdivided"], "博物館|美術館")
+        self.assertGreater(max(int(r["depth"]) for r in rows), 0)
+        self.assertEqual(sum(int(r["calls"]) for r in rows), len(self.server.requests))
+
+        calls = len(self.server.requests)
+        again = places_tiling.harvest_tiles(workers=4, report_path=report)
+        self.assertEqual(set(again), set(found))
+        self.assertEqual(len(self.server.requests), calls)
+
+    def test_tiles_only_requery_full_queries(self):
+        # 美術館只有 10 個（第一頁就拿完），子塊不應該再查美術館
+        places = [p for p in self.places if "museum" in p["types"]] + \
+                 [p for p in self.places if "art_gallery" in p["types"]][:10]
+        self.server.places = places
+        found = places_tiling.harvest_tiles(workers=4, use_cache=False,
+                                            report_path=os.path.join(self.tmp, "tiles.csv"))
+        self.assertEqual(set(found), {p["id"] for p in places})
+        root = places_tiling._rectangle(places_tiling.BBOX)
+        children = [r for r in self.server.requests if r["locationRestriction"] != root]
+        self.assertTrue(children)
+        self.assertTrue(all(r["includedType"] == "museum" for r in children))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,20 +2,21 @@ import re
 from urllib.parse import urljoin
 
 import requests as req
-from bs4 import BeautifulSoup as bs
-import urllib3
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-session = req.Session()
-session.verify = False
+from http_client import get_document, is_offline, venue_metadata, DeadlineExceeded
+import resources
 
 
 def get_driver(headless=True):
+    if is_offline():
+        print("⚠️ 離線重播模式無法使用 Selenium，略過北美館")
+        return None
+
     from selenium.webdriver.chrome.options import Options
     opts = Options()
     if headless:
@@ -25,12 +26,16 @@ def get_driver(headless=True):
     opts.add_argument("--disable-gpu")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument(resources.chrome_marker())
     try:
-        return webdriver.Chrome(options=opts)
+        driver = webdriver.Chrome(options=opts)
     except Exception as e:
         print("⚠️ 無法啟動 Selenium driver，略過北美館：", repr(e))
         return None
 
+    resources.register_browser(driver)
+    return driver
+
 
 def parse_tfam_date(raw: str):
     """
@@ -95,23 +100,31 @@ def parse_tfam_date(raw: str):
     return None, None, 0
 
 
+def fetch_tfam_museum_name(home_url: str, default: str) -> str:
+    """首頁頁尾的館名；找不到就用 default"""
+    html = get_document(home_url, timeout=20)
+    tfam = html.find("div", class_="footer-info-container")
+    if tfam:
+        m = re.search(r"臺北市立美術館", tfam.get_text(" ", strip=True))
+        if m:
+            return m.group()
+    return default
+
+
 def fetch_tfam_exhibitions():
     BASE = "https://www.tfam.museum/"
     HOME = "https://www.tfam.museum/index.aspx?ddlLang=zh-tw"
     EXH = "https://www.tfam.museum/Exhibition/Exhibition.aspx?ddlLang=zh-tw"
     CONTAINER_XPATH = '/html/body/form/div[3]/div[3]/div/div[2]'
 
-    # 抓館名（保留你原本的寫法）
+    # 抓館名（保留你原本的寫法）；館名幾乎不會變，一週內直接用快取，不用每次抓首頁
     museum_name = "臺北市立美術館"
-    r = session.get(HOME, timeout=20)
-    r.raise_for_status()
-    html = bs(r.text, "html.parser")
-    tfam = html.find("div", class_="footer-info-container")
-    if tfam:
-        tfam_text = tfam.get_text(" ", strip=True)
-        m = re.search(r"臺北市立美術館", tfam_text)
-        if m:
-            museum_name = m.group()
+    try:
+        museum_name = venue_metadata("tfam", lambda: fetch_tfam_museum_name(HOME, museum_name))
+    except DeadlineExceeded:
+        raise
+    except req.RequestException as e:
+        print(f"⚠️ 北美館首頁抓取失敗，使用預設館名：{e!r}")
 
     driver = get_driver(headless=True)
     if driver is None:
@@ -185,7 +198,10 @@ def fetch_tfam_exhibitions():
                     "extra": "",
                 })
     finally:
-        driver.quit()
+        resources.quit_driver(driver)
 
     return results
-print(fetch_tfam_exhibitions())
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    print(fetch_tfam_exhibitions())
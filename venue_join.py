@@ -0,0 +1,194 @@
+"""
+把展覽（all_museums_exhibitions.csv 的 館別）對到館的資料
+（taipei_museums_info.csv 的 館名 / place_id），一次幫所有展覽補上
+place_id、緯度、經度、營業時間。
+
+比對順序：
+1. 正規化後完全相同（全半形、臺/台、空白標點、大小寫都不計）
+2. 別名表 VENUE_ALIASES
+3. 模糊比對：先用字元 bigram 的倒排索引挑候選，再用 difflib 算相似度
+
+同一個 館別 只會解析一次；解析結果存在 CACHE_PATH，
+館資料檔沒變的話下次直接沿用。
+"""
+import csv
+import difflib
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+VENUES_PATH = "taipei_museums_info.csv"
+CACHE_PATH = "venue_join_cache.json"
+FUZZY_THRESHOLD = 0.6
+
+# 常見簡稱 / 爬蟲用的館別 -> Google 上的館名
+VENUE_ALIASES = {
+    "故宮": "國立故宮博物院",
+    "故宮博物院": "國立故宮博物院",
+    "北美館": "臺北市立美術館",
+    "當代館": "台北當代藝術館",
+    "師大美術館": "國立臺灣師範大學-師大美術館",
+    "松菸": "松山文創園區",
+    "華山": "華山1914文化創意產業園區",
+    "華山文創園區": "華山1914文化創意產業園區",
+}
+
+# 要補到展覽上的欄位
+VENUE_FIELDS = ["place_id", "緯度", "經度", "營業時間"]
+
+
+def normalize_name(name: str) -> str:
+    """全形轉半形、臺 -> 台、去掉空白與標點、英文轉小寫"""
+    if not name:
+        return ""
+    s = unicodedata.normalize("NFKC", name)
+    s = s.replace("臺", "台").lower()
+    return re.sub(r"[\s\-_/·・,.()（）「」【】|]+", "", s)
+
+
+def _bigrams(s: str):
+    return {s[i:i + 2] for i in range(len(s) - 1)} or {s}
+
+
+class VenueNameIndex:
+    """館名的正規化索引 + bigram 倒排索引（只建一次）"""
+
+    def __init__(self, venues):
+        self.venues = venues
+        self.by_norm = {}
+        self.by_bigram = defaultdict(set)
+        for i, v in enumerate(venues):
+            norm = normalize_name(v.get("館名", ""))
+            if not norm:
+                continue
+            self.by_norm.setdefault(norm, i)
+            for g in _bigrams(norm):
+                self.by_bigram[g].add(i)
+        self.aliases = {normalize_name(k): normalize_name(v) for k, v in VENUE_ALIASES.items()}
+
+    @classmethod
+    def from_csv(cls, path=VENUES_PATH):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def resolve(self, name: str):
+        """館別 -> (venue 在清單中的位置 或 None, 比對方式)"""
+        norm = normalize_name(name)
+        if not norm:
+            return None, "empty"
+        if norm in self.by_norm:
+            return self.by_norm[norm], "exact"
+
+        alias = self.aliases.get(norm)
+        if alias and alias in self.by_norm:
+            return self.by_norm[alias], "alias"
+
+        # 模糊比對：共同 bigram 最多的前幾名再算相似度
+        votes = Counter()
+        for g in _bigrams(norm):
+            for i in self.by_bigram.get(g, ()):
+                votes[i] += 1
+        best, best_score = None, 0.0
+        for i, _ in votes.most_common(10):
+            cand = normalize_name(self.venues[i]["館名"])
+            score = difflib.SequenceMatcher(None, norm, cand).ratio()
+            # 一邊完整包含另一邊（例如「師大美術館」in「國立臺灣師範大學師大美術館」）加分
+            if norm in cand or cand in norm:
+                score = max(score, 0.8)
+            if score > best_score:
+                best, best_score = i, score
+        if best is not None and best_score >= FUZZY_THRESHOLD:
+            return best, "fuzzy"
+        return None, "unmatched"
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_mapping(venues_path=VENUES_PATH, cache_path=CACHE_PATH) -> dict:
+    """讀快取的 館別 -> place_id；館資料檔有變就作廢"""
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("venues_hash") != _file_hash(venues_path):
+        return {}
+    return data.get("mapping", {})
+
+
+def save_mapping(mapping: dict, venues_path=VENUES_PATH, cache_path=CACHE_PATH):
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"venues_hash": _file_hash(venues_path), "mapping": mapping},
+            f, ensure_ascii=False, indent=2,
+        )
+
+
+def resolve_mapping(names, venues_path=VENUES_PATH, cache_path=CACHE_PATH, index=None) -> dict:
+    """
+    館別們 -> {館別: place_id 或 None}（含快取裡原本就有的）。
+    只有快取裡沒有的館別才需要比對，比對完寫回快取。
+    """
+    mapping = load_mapping(venues_path, cache_path)
+    missing = set(names) - set(mapping)
+    if not missing:
+        return mapping
+    index = index or VenueNameIndex.from_csv(venues_path)
+    for name in missing:
+        i, how = index.resolve(name)
+        mapping[name] = index.venues[i]["place_id"] if i is not None else None
+        if how == "fuzzy":
+            print(f"🔎 模糊比對：{name} -> {index.venues[i]['館名']}")
+        elif how == "unmatched":
+            print(f"⚠️ 找不到對應的館：{name}")
+    save_mapping(mapping, venues_path, cache_path)
+    return mapping
+
+
+def attach_venues(rows, venues_path=VENUES_PATH, cache_path=CACHE_PATH, name_field="館別"):
+    """
+    幫每一筆展覽補上 VENUE_FIELDS（直接改 rows 裡的 dict，也回傳 rows）。
+    rows 可以是 CSV 的列（館別）或爬蟲原始資料（name_field="museum"）。
+    """
+    index = VenueNameIndex.from_csv(venues_path)
+    by_place_id = {v["place_id"]: v for v in index.venues}
+    mapping = resolve_mapping({r.get(name_field, "") for r in rows}, venues_path, cache_path, index)
+
+    for r in rows:
+        venue = by_place_id.get(mapping.get(r.get(name_field, "")), {})
+        for field in VENUE_FIELDS:
+            r[field] = venue.get(field, "")
+    return rows
+
+
+def join_exhibitions(exhibitions_path="all_museums_exhibitions.csv",
+                     out_path="exhibitions_with_venues.csv",
+                     venues_path=VENUES_PATH):
+    with open(exhibitions_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames)
+        rows = list(reader)
+
+    attach_venues(rows, venues_path)
+
+    fieldnames += [f for f in VENUE_FIELDS if f not in fieldnames]
+    with open(out_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"📁 已輸出：{out_path}（共 {len(rows)} 筆）")
+
+
+if __name__ == "__main__":
+    join_exhibitions()